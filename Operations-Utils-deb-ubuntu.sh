@@ -39,7 +39,7 @@ sudo chmod +x /usr/local/bin/docker-compose
 #install K9S
 wget -P /tmp https://github.com/derailed/k9s/releases/download/v0.32.6/k9s_linux_amd64.deb
 
-sudo apt install /tmp/k9s_linux_amd64.deb
+sudo apt install -y /tmp/k9s_linux_amd64.deb
 sudo rm -f /tmp/k9s_linux_amd64.deb
 
 
@@ -82,7 +82,7 @@ sudo mv helm-stable-debian.list /etc/apt/sources.list.d/helm-stable-debian.list
 sudo apt-get update
 sleep 5s
 sudo apt-get install apt-transport-https --yes
-sudo apt-get install helm
+sudo apt-get install -y helm
 
 #terraform install
 wget -O hashicorp.gpg https://apt.releases.hashicorp.com/gpg
@@ -94,7 +94,7 @@ sudo mv hashicorp.list /etc/apt/sources.list.d/hashicorp.list
 
 sudo apt update
 sleep 5s
-sudo apt install terraform
+sudo apt install -y terraform
 
 #install ansible
 sudo apt install software-properties-common -y
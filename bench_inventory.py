@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Scaling benchmark for the inventory generator scripts.
+
+Builds synthetic hosts / inventory.xml fixtures in a temporary root (passed
+to the scripts through INVENTORY_ANSIBLE_DIR), times add, patch and rerun
+(no-op) operations, and prints one JSON object per measurement:
+
+    python3 bench_inventory.py --sizes 1000,10000 --output bench.jsonl
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from inventory_xml import XML_FOOTER, XML_HEADER, format_node, node_attributes
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+GROUP_SIZE = 1000
+
+
+def node_ip(i):
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def build_fixture(root, size):
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, "hosts"), "w") as f:
+        f.write("[mylocal]\nrundeck ansible_host=localhost ansible_user=rundeck ansible_password=rundeck ansible_become_password=rundeck\n")
+        for i in range(size):
+            if i % GROUP_SIZE == 0:
+                f.write(f"\n[group-{i // GROUP_SIZE:04d}]\n")
+            f.write(f"node-{i:07d} ansible_host={node_ip(i)} ansible_user=user{i % 50}\n")
+    with open(os.path.join(root, "inventory.xml"), "w") as f:
+        f.write(XML_HEADER)
+        for i in range(size):
+            f.write(format_node(node_attributes(f"node-{i:07d}", node_ip(i), f"user{i % 50}",
+                                                "privatesshkey", "keys/bench")))
+        f.write(XML_FOOTER)
+
+
+def write_batch(path, size, batch, offset, role=None):
+    with open(path, "w") as f:
+        f.write("ip,username,node_name" + (",role\n" if role else "\n"))
+        for i in range(offset, offset + batch):
+            # Kube batches alternate masters and workers
+            row = f"{node_ip(size + i)},bench,new-{i:07d}"
+            if role:
+                row += ",master" if i % 2 else ",worker"
+            f.write(row + "\n")
+
+
+def scenarios(size, batch, workdir):
+    """(script, operation, argv) for every measured run against a fixture of `size` nodes."""
+    add_csv = os.path.join(workdir, "add.csv")
+    patch_csv = os.path.join(workdir, "patch.csv")
+    kube_csv = os.path.join(workdir, "kube.csv")
+    write_batch(add_csv, size, batch, 0)
+    write_batch(kube_csv, size, batch, batch, role=True)
+    # Patch moves existing nodes of group-0000 to new addresses
+    with open(patch_csv, "w") as f:
+        f.write("ip,username,node_name\n")
+        for i in range(min(batch, size)):
+            f.write(f"{node_ip(size + 2 * batch + i)},patched,node-{i:07d}\n")
+
+    common = ["--access_method", "privatesshkey", "--ssh_key_storage_path", "keys/bench"]
+    add = common + ["--infra_groupname", "bench-add", "--input", add_csv]
+    patch = common + ["--infra_groupname", "group-0000", "--input", patch_csv]
+    kube = common + ["--infra_groupname_K8S_Master", "k8s-master-data-plane",
+                     "--infra_groupname_K8S_Slave", "k8s-worker-data-plane", "--input", kube_csv]
+    for script in ("generate_inventory.py", "generate_inventory_mutiple.py"):
+        yield script, "add", add
+        yield script, "rerun", add
+    yield "generate_inventory_Patch.py", "patch", patch
+    yield "generate_inventory_Patch.py", "rerun", patch
+    yield "generate_inventory_Kube.py", "add", kube
+    yield "generate_inventory_Kube.py", "rerun", kube
+
+
+def snapshot(root):
+    state = {}
+    for name in os.listdir(root):
+        st = os.stat(os.path.join(root, name))
+        state[name] = (st.st_ino, st.st_mtime_ns, st.st_size)
+    return state
+
+
+def run_script(root, script, argv):
+    env = dict(os.environ, INVENTORY_ANSIBLE_DIR=root)
+    before = snapshot(root)
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, script)] + argv, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    stderr = proc.stderr.read().decode(errors="replace")
+    proc.stderr.close()
+    after = snapshot(root)
+    written = sum(meta[2] for name, meta in after.items() if before.get(name) != meta)
+    return {
+        "wall_s": round(wall, 4),
+        "peak_rss_kb": rusage.ru_maxrss,
+        "bytes_written": written,
+        "exit_code": proc.returncode,
+        "stderr": stderr[-500:] if proc.returncode else "",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the inventory generators against growing inventories.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated fixture sizes (nodes)")
+    parser.add_argument("--batch", type=int, default=100, help="Nodes added or patched per run")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario")
+    parser.add_argument("--scripts", default="", help="Comma-separated subset of scripts to run")
+    parser.add_argument("--output", default="-", help="JSON lines output file ('-' for stdout)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary root")
+    args = parser.parse_args()
+
+    selected = {s.strip() for s in args.scripts.split(",") if s.strip()}
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    base = tempfile.mkdtemp(prefix="inventory-bench-")
+    try:
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            fixture = os.path.join(base, f"fixture-{size}")
+            start = time.perf_counter()
+            build_fixture(fixture, size)
+            print(f"Built {size}-node fixture in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            workdir = os.path.join(base, f"work-{size}")
+            os.makedirs(workdir, exist_ok=True)
+            for repeat in range(args.repeat):
+                root = None
+                for script, operation, argv in scenarios(size, args.batch, workdir):
+                    if selected and script not in selected:
+                        continue
+                    # Every script starts from the pristine fixture; rerun reuses the add/patch result
+                    if operation != "rerun":
+                        root = os.path.join(base, "root")
+                        shutil.rmtree(root, ignore_errors=True)
+                        shutil.copytree(fixture, root)
+                    result = {"script": script, "operation": operation, "nodes": size,
+                              "batch": args.batch, "repeat": repeat}
+                    result.update(run_script(root, script, argv))
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+            shutil.rmtree(fixture, ignore_errors=True)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if args.keep:
+            print(f"Benchmark root kept at {base}", file=sys.stderr)
+        else:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
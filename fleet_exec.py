@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""Run one of the repo's install scripts on every host of the generated groups, in parallel.
+
+Hosts come from the hosts file the generators maintain. Each host gets the
+script for its OS family (from the facts cache written by inventory_facts.py,
+or probed with --probe_facts), copied over ssh to a temporary file and run
+with `sudo -n bash` and stdin closed:
+
+    fleet_exec.py --groups MvmNode --task sshlog --concurrency 64 --rate 20
+    fleet_exec.py --groups k8s-worker-data-plane --script install-SSHlog-ALL-OS.sh --script_args=--docker=true
+    fleet_exec.py --groups MvmNode --task utils --transport_command "./fake_ssh.sh {host}" --dry_run
+
+A bounded pool of workers takes hosts family by family, connections are
+started at most --rate per second, and ssh connection failures (exit 255)
+are retried with exponential backoff. Progress is printed while the run
+goes, then a summary with p50/p95 latency per family.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shlex
+import sys
+import time
+
+from inventory_bulk import NodeSelector, split_list
+from inventory_facts import (FactProber, add_probe_arguments, cached_facts, check_command_template, load_facts_cache,
+                             run_process, ssh_command)
+from inventory_metrics import RunMetrics, add_metrics_arguments
+from inventory_model import HOSTS_PATH, Inventory, parse_host_line
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Script per OS family for each --task
+TASKS = {
+    "sshlog": {"debian": "install-SSHlog-ALL-OS.sh", "rhel": "install-sshlog-forRHELV8.sh"},
+    "utils": {"debian": "Operations-Utils-deb-ubuntu.sh", "rhel": "Operations-Utils-RHEL.sh"},
+}
+FAMILIES = ("debian", "rhel")
+
+# Same checks as install-SSHlog-ALL-OS.sh, plus the distribution IDs themselves
+DEBIAN_IDS = {"debian", "ubuntu"}
+RHEL_IDS = {"rhel", "centos", "fedora", "rocky", "almalinux", "ol"}
+
+SSH_CONNECTION_ERROR = 255
+
+# Run on the host with the script on stdin: it is saved first and run with stdin closed, so a command
+# in it that reads stdin (an apt install without -y) cannot swallow the rest of the script
+REMOTE_WRAPPER = 'f=$(mktemp) && cat > "$f" && {command} "$f"{args} < /dev/null; rc=$?; rm -f "$f"; exit $rc'
+
+
+def os_family(facts):
+    """"debian", "rhel" or None from the distribution details kept in the facts cache."""
+    if not facts:
+        return None
+    distribution = facts.get("distribution", "")
+    like = facts.get("distribution_like", "").split()
+    if distribution in DEBIAN_IDS or "debian" in like:
+        return "debian"
+    if distribution in RHEL_IDS or RHEL_IDS.intersection(like):
+        return "rhel"
+    return None
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+def load_targets(hosts_path, groups, selector=None, ssh_key=None):
+    """Hosts of the given groups, once each, as targets for ssh_command (in group then file order)."""
+    inventory = Inventory.load(hosts_path)
+    targets, seen = [], set()
+    for group_name in groups:
+        group = inventory.groups.get(group_name)
+        if group is None:
+            print(f"⚠️ Group [{group_name}] not found in {hosts_path}")
+            continue
+        for name, position in group.hosts.items():
+            _, host_vars = parse_host_line(group.lines[position])
+            host = host_vars.get("ansible_host", name)
+            if name in seen or host == "localhost" or (selector and not selector.matches(name, host)):
+                continue
+            seen.add(name)
+            targets.append({"name": name, "host": host, "user": host_vars.get("ansible_user"),
+                            "key": ssh_key, "group": group_name})
+    return targets
+
+
+class RateLimiter:
+    """Spaces connection starts at most `rate` per second (no limit when rate is falsy)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class FleetExecutor:
+    """Bounded worker pool that streams a script to each host, with rate limiting and retries."""
+
+    def __init__(self, concurrency=16, rate=0, retries=2, backoff=2.0, timeout=1800.0, transport_command=None,
+                 remote_command="sudo -n bash", retry_any_failure=False, log_dir=None, progress_interval=2.0):
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.transport_command = transport_command
+        self.remote_command = remote_command
+        self.retry_any_failure = retry_any_failure
+        self.log_dir = log_dir
+        self.progress_interval = progress_interval
+        self.results = []
+        self.retrying = 0
+
+    def should_retry(self, returncode):
+        if returncode is None:
+            return False  # timed out: the script may be half way through, do not start it again
+        return returncode == SSH_CONNECTION_ERROR or (self.retry_any_failure and returncode != 0)
+
+    async def _attempt(self, job):
+        remote = REMOTE_WRAPPER.format(command=self.remote_command,
+                                       args="".join(" " + shlex.quote(arg) for arg in job["args"]))
+        argv = ssh_command(job["target"], remote, self.timeout, self.transport_command)
+        await self.limiter.wait()
+        start = time.perf_counter()
+        try:
+            returncode, stdout, stderr = await run_process(argv, self.timeout, job["script"])
+            error = None if returncode == 0 else (stderr.decode("utf-8", "replace").strip().splitlines() or [f"exit {returncode}"])[-1]
+        except asyncio.TimeoutError:
+            returncode, stdout, stderr, error = None, b"", b"", f"timed out after {self.timeout:g}s"
+        except OSError as e:
+            returncode, stdout, stderr, error = None, b"", b"", str(e)
+        job["attempts"] += 1
+        job["seconds"] += time.perf_counter() - start
+        return returncode, stdout, stderr, error
+
+    def _record(self, job, returncode, stdout, stderr, error):
+        target = job["target"]
+        result = {"name": target["name"], "host": target["host"], "group": target["group"], "family": job["family"],
+                  "script": os.path.basename(job["script_path"]), "ok": returncode == 0, "returncode": returncode,
+                  "attempts": job["attempts"], "seconds": round(job["seconds"], 3), "error": error}
+        self.results.append(result)
+        if self.log_dir:
+            try:
+                with open(os.path.join(self.log_dir, f"{target['name']}.log"), "wb") as f:
+                    f.write(stdout)
+                    if stderr:
+                        f.write(b"\n--- stderr ---\n" + stderr)
+            except OSError as e:
+                print(f"⚠️ Could not write the log of {target['name']}: {e}", flush=True)
+        if not result["ok"]:
+            print(f"❌ {target['name']} ({target['host']}): {error} after {job['attempts']} attempt(s)", flush=True)
+
+    async def _requeue(self, queue, job, delay):
+        # The job stays unfinished while it waits, so queue.join() cannot return early
+        self.retrying += 1
+        await asyncio.sleep(delay)
+        self.retrying -= 1
+        queue.put_nowait(job)
+        queue.task_done()
+
+    async def _worker(self, queue):
+        while True:
+            job = await queue.get()
+            try:
+                returncode, stdout, stderr, error = await self._attempt(job)
+                if returncode != 0 and self.should_retry(returncode) and job["attempts"] <= self.retries:
+                    delay = self.backoff * 2 ** (job["attempts"] - 1) * random.uniform(0.5, 1.5)
+                    asyncio.create_task(self._requeue(queue, job, delay))
+                    continue
+            except Exception as e:
+                # The host fails, not the worker: queue.join() waits for a task_done() per job
+                job["attempts"] += 1
+                returncode, stdout, stderr, error = None, b"", b"", f"{type(e).__name__}: {e}"
+            self._record(job, returncode, stdout, stderr, error)
+            queue.task_done()
+
+    async def _progress(self, total, started):
+        tty = sys.stderr.isatty()
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            done = len(self.results)
+            failed = sum(1 for result in self.results if not result["ok"])
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            line = (f"⏳ {done}/{total} done ({done - failed} ok, {failed} failed, {self.retrying} waiting to retry) "
+                    f"{rate:.1f} hosts/s")
+            print(f"\r{line}" if tty else line, end="" if tty else "\n", file=sys.stderr, flush=True)
+
+    async def _run(self, jobs):
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+        started = time.perf_counter()
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(min(self.concurrency, len(jobs)))]
+        progress = asyncio.create_task(self._progress(len(jobs), started))
+        try:
+            await queue.join()
+        finally:
+            for task in workers + [progress]:
+                task.cancel()
+            await asyncio.gather(*workers, progress, return_exceptions=True)
+        if sys.stderr.isatty():
+            print(file=sys.stderr)
+
+    def run(self, batches, script_args=()):
+        """Run {family: (script_path, targets)} batch after batch through one pool; returns the per-host results."""
+        jobs = []
+        for family, (script_path, targets) in batches.items():
+            with open(script_path, "rb") as f:
+                script = f.read()
+            jobs += [{"target": target, "family": family, "script_path": script_path, "script": script,
+                      "args": list(script_args), "attempts": 0, "seconds": 0.0} for target in targets]
+        if self.log_dir:
+            os.makedirs(self.log_dir, exist_ok=True)
+        if jobs:
+            asyncio.run(self._run(jobs))
+        return self.results
+
+
+def summarize(results):
+    """Per-family counts and p50/p95 latency (seconds, over all attempts of a host)."""
+    summary = {}
+    for family in sorted({result["family"] for result in results}):
+        rows = [result for result in results if result["family"] == family]
+        seconds = sorted(result["seconds"] for result in rows)
+        summary[family] = {
+            "hosts": len(rows),
+            "ok": sum(1 for result in rows if result["ok"]),
+            "failed": sum(1 for result in rows if not result["ok"]),
+            "retried": sum(1 for result in rows if result["attempts"] > 1),
+            "p50_seconds": round(percentile(seconds, 0.50), 3),
+            "p95_seconds": round(percentile(seconds, 0.95), 3),
+            "max_seconds": round(seconds[-1], 3) if seconds else 0.0,
+        }
+    return summary
+
+
+def resolve_scripts(args):
+    """Map each OS family to the script it runs."""
+    if args.script:
+        return {family: args.script for family in FAMILIES}
+    scripts = {family: os.path.join(SCRIPT_DIR, name) for family, name in TASKS[args.task].items()}
+    if args.debian_script:
+        scripts["debian"] = args.debian_script
+    if args.rhel_script:
+        scripts["rhel"] = args.rhel_script
+    return scripts
+
+
+def plan_batches(targets, scripts, args):
+    """Split targets into {family: (script, targets)}; returns (batches, hosts of unknown family)."""
+    families = {}
+    if args.family:
+        families = {target["name"]: args.family for target in targets}
+    else:
+        cache = load_facts_cache()
+        unknown = []
+        for target in targets:
+            family = os_family(cached_facts(target["host"], cache, args.probe_ttl))
+            if family:
+                families[target["name"]] = family
+            else:
+                unknown.append(target)
+        if unknown and args.probe_facts:
+            probed = FactProber.from_args(args).probe(unknown)
+            families.update({name: os_family(facts) for name, facts in probed.items()})
+        for target in targets:
+            if not families.get(target["name"]) and args.default_family:
+                families[target["name"]] = args.default_family
+
+    batches, skipped = {}, []
+    for target in targets:
+        family = families.get(target["name"])
+        if family is None:
+            skipped.append(target)
+            continue
+        batches.setdefault(family, (scripts[family], []))[1].append(target)
+    return batches, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an install script on every host of inventory groups, in parallel.")
+    parser.add_argument("--groups", type=str, required=True, help="Comma-separated list of groups from the hosts file")
+    parser.add_argument("--node_names", type=str, required=False, help="Only these node names")
+    parser.add_argument("--cidr", type=str, required=False, help="Only hosts in these comma-separated networks")
+    parser.add_argument("--task", choices=sorted(TASKS), default="sshlog",
+                        help="Script pair to run: " + "; ".join(f"{task}: {', '.join(f'{k}={v}' for k, v in s.items())}"
+                                                                for task, s in TASKS.items()))
+    parser.add_argument("--script", type=str, required=False, help="Run this script on every host whatever its OS family")
+    parser.add_argument("--debian_script", type=str, required=False, help="Script for Debian/Ubuntu hosts instead of the task's")
+    parser.add_argument("--rhel_script", type=str, required=False, help="Script for RHEL-like hosts instead of the task's")
+    parser.add_argument("--script_args", type=str, default="", help="Arguments passed to the script, e.g. --docker=true")
+    parser.add_argument("--family", choices=FAMILIES, required=False, help="Treat every host as this OS family")
+    parser.add_argument("--default_family", choices=FAMILIES, required=False,
+                        help="OS family for hosts without (probed) facts; they are skipped otherwise")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of hosts worked on at the same time")
+    parser.add_argument("--rate", type=float, default=0, help="Maximum new connections per second (0: no limit)")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per host after an ssh connection failure (exit 255)")
+    parser.add_argument("--retry_any_failure", action="store_true", help="Also retry hosts where the script exited non-zero")
+    parser.add_argument("--backoff", type=float, default=2.0, help="Base delay in seconds before a retry, doubled each time")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="Seconds allowed per host and attempt")
+    parser.add_argument("--ssh_key", type=str, required=False, help="Local private key file for ssh")
+    parser.add_argument("--transport_command", type=str, required=False,
+                        help="Command template used instead of ssh ({host}, {user}, {name}, {key}); the remote "
+                             "command is appended and the script is written to its stdin")
+    parser.add_argument("--remote_command", type=str, default="sudo -n bash",
+                        help="Command running the script file on the host (given its path, then --script_args)")
+    parser.add_argument("--log_dir", type=str, required=False, help="Write each host's output to <log_dir>/<node>.log")
+    parser.add_argument("--progress_interval", type=float, default=2.0, help="Seconds between progress lines")
+    parser.add_argument("--report", type=str, required=False, help="Write the per-host results and summary as JSON ('-' for stdout)")
+    parser.add_argument("--hosts_path", type=str, default=HOSTS_PATH, help="Ansible hosts file to read the groups from")
+    parser.add_argument("--dry_run", action="store_true", help="Print which script each group of hosts would get and exit")
+    add_probe_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = RunMetrics("fleet_exec")
+    for option in ("transport_command", "probe_command"):
+        try:
+            if getattr(args, option):
+                check_command_template(getattr(args, option))
+        except ValueError as e:
+            print(f"❌ ERROR: --{option}: {e}")
+            sys.exit(1)
+
+    selector = NodeSelector(split_list(args.node_names), (), split_list(args.cidr))
+    with metrics.phase("load"):
+        targets = load_targets(args.hosts_path, split_list(args.groups), selector, args.ssh_key)
+    scripts = resolve_scripts(args)
+    for path in set(scripts.values()):
+        if not os.path.isfile(path):
+            print(f"❌ ERROR: script {path} not found.")
+            sys.exit(1)
+
+    with metrics.phase("plan"):
+        batches, skipped = plan_batches(targets, scripts, args)
+    for family, (script_path, family_targets) in batches.items():
+        print(f"ℹ️ {family}: {len(family_targets)} host(s) -> {os.path.basename(script_path)}")
+    if skipped:
+        print(f"⚠️ Skipping {len(skipped)} host(s) with unknown OS family (use --probe_facts, --family or --default_family): "
+              + ", ".join(target["name"] for target in skipped[:10]) + (" ..." if len(skipped) > 10 else ""))
+    if args.dry_run or not batches:
+        return
+
+    executor = FleetExecutor(args.concurrency, args.rate, args.retries, args.backoff, args.timeout, args.transport_command,
+                             args.remote_command, args.retry_any_failure, args.log_dir, args.progress_interval)
+    start = time.perf_counter()
+    with metrics.phase("execute"):
+        results = executor.run(batches, shlex.split(args.script_args))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(results)
+    for family, row in summary.items():
+        print(f"{'✅' if not row['failed'] else '⚠️'} {family}: {row['ok']}/{row['hosts']} ok, {row['failed']} failed, "
+              f"{row['retried']} retried, p50 {row['p50_seconds']:.1f}s, p95 {row['p95_seconds']:.1f}s, max {row['max_seconds']:.1f}s")
+    failed = [result for result in results if not result["ok"]]
+    print(f"{'✅' if not failed else '❌'} {len(results) - len(failed)}/{len(results)} host(s) ok in {elapsed:.1f}s")
+
+    if args.report:
+        body = json.dumps({"summary": summary, "skipped": [t["name"] for t in skipped], "hosts": results}, indent=2)
+        if args.report == "-":
+            print(body)
+        else:
+            with open(args.report, "w") as f:
+                f.write(body + "\n")
+    metrics.set("hosts_ok", len(results) - len(failed))
+    metrics.set("hosts_failed", len(failed))
+    metrics.set("hosts_skipped", len(skipped))
+    if args.metrics:
+        metrics.emit(args.metrics, args.metrics_textfile_dir)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,38 @@ import os
 import argparse
 import traceback
 
+from inventory_api import add_mylocal, apply_add_records, mylocal_entry
+from inventory_diff import add_dry_run_arguments, report_changes
+from inventory_facts import FactProber, add_probe_arguments, known_node_names, probe_nodes
+from inventory_input import (add_input_arguments, add_range_arguments, check_input_argument, iter_list_records,
+                             iter_range_records, iter_records, range_spec, DEFAULT_CHUNK_SIZE)
+from inventory_journal import add_journal_arguments, inventory_lock, journal_records, submit
+from inventory_metrics import RunMetrics, add_metrics_arguments
+from inventory_model import ANSIBLE_DIR, HOSTS_PATH, INVENTORY_PATH, Inventory
+from inventory_shards import add_shard_arguments, shard_paths, write_group_shard
+from inventory_validate import FleetIndex, add_validate_arguments
+from inventory_xml import merge_nodes
+
 def generate_files(access_method, ip_addresses, usernames, ssh_password_storage_path,
                    infra_groupname, ssh_key_storage_path, node_names):
     if len(ip_addresses) != len(usernames) or len(usernames) != len(node_names):
         print("ERROR: The number of IP addresses, usernames, and node names must be the same.")
         return
 
-    hosts_path = "/etc/ansible/hosts"
-    inventory_path = "/etc/ansible/inventory.xml"
+    generate_files_from_records(
+        access_method=access_method,
+        records=iter_list_records(ip_addresses, usernames, node_names),
+        ssh_password_storage_path=ssh_password_storage_path,
+        infra_groupname=infra_groupname,
+        ssh_key_storage_path=ssh_key_storage_path
+    )
+
+def generate_files_from_records(access_method, records, ssh_password_storage_path,
+                                infra_groupname, ssh_key_storage_path, chunk_size=DEFAULT_CHUNK_SIZE,
+                                shard_dir=None, metrics=None, dry_run=False, prober=None, validator=None):
+    hosts_path = HOSTS_PATH
+    metrics = metrics or RunMetrics("generate_inventory")
+    inventory_path = INVENTORY_PATH
 
     print(f"Generating files with:")
     print(f" Access Method: {access_method}")
@@ -24,107 +48,168 @@ def generate_files(access_method, ip_addresses, usernames, ssh_password_storage_
             ssh_key_storage_path = ""
     else:
         print("ERROR: Invalid access method. Use 'password' or 'privatesshkey'.")
-        return
-
-    os.makedirs("/etc/ansible", exist_ok=True)
-
-    try:
-        # === Handle inventory.xml ===
-        if os.path.exists(inventory_path):
-            with open(inventory_path, "r") as f:
-                content = f.read()
-            if "</project>" in content:
-                content = content.replace("</project>", "")  # Remove closing tag to insert nodes
-        else:
-            content = '<?xml version="1.0" ?>\n<project>\n'
-
-        for ip, user, node in zip(ip_addresses, usernames, node_names):
-            if f'name="{node}"' not in content:
-                content += f'''  <node name="{node}"
-        description="Server at {ip}"
-        tags="linux, server"
-        hostname="{ip}"
-        osArch=""
-        osFamily=""
-        osName=""
-        osVersion=""
-        username="{user}"\n'''
-                if access_method == "privatesshkey":
-                    content += f'''        ssh-key-storage-path="{ssh_key_storage_path}"\n        ssh-authentication="privateKey"'''
-                elif access_method == "password":
-                    content += f'''        ssh-password-storage-path="{ssh_password_storage_path}"\n        ssh-authentication="password"'''
-                content += " />\n"
-
-        content += "</project>\n"
-
-        with open(inventory_path, "w") as f:
-            f.write(content)
-
-        # === Handle /etc/ansible/hosts ===
-        container_hostname = os.uname()[1]
-        if os.path.exists(hosts_path):
-            with open(hosts_path, "r") as f:
-                existing_hosts = f.read()
-        else:
-            existing_hosts = ""
-
-        hosts_lines = []
-
-        # Write [mylocal] once
-        if "[mylocal]" not in existing_hosts:
-            hosts_lines.append(f"[mylocal]\n{container_hostname} ansible_host=localhost ansible_user=rundeck ansible_password=rundeck ansible_become_password=rundeck\n")
-
-        # Add or append group section
-        group_section_header = f"\n[{infra_groupname}]\n"
-        if f"[{infra_groupname}]" not in existing_hosts:
-            hosts_lines.append(group_section_header)
-
-        for ip, user, node in zip(ip_addresses, usernames, node_names):
-            entry = f"{node} ansible_host={ip} ansible_user={user}"
-            if entry not in existing_hosts:
-                hosts_lines.append(f"{entry}\n")
-
-        with open(hosts_path, "a") as f:
-            f.writelines(hosts_lines)
-
-        print(f"✅ Files successfully updated or created:")
-        print(f" - {inventory_path}")
-        print(f" - {hosts_path}")
-    except Exception as e:
-        print("❌ Error writing files:")
-        traceback.print_exc()
+        return False
+
+    if not dry_run:
+        os.makedirs(ANSIBLE_DIR, exist_ok=True)
+
+    with inventory_lock(not dry_run):
+        try:
+            if shard_dir:
+                # Only this group's shard is read and rewritten: collect its lines in memory
+                inventory = Inventory()
+            else:
+                with metrics.phase("load"):
+                    inventory = Inventory.load(hosts_path, dry_run=dry_run)
+
+                # === Handle /etc/ansible/hosts ===
+                add_mylocal(inventory)
+
+            if validator is not None:
+                with metrics.phase("validate"):
+                    validator.load(hosts_path, inventory_path, shard_dir, None if shard_dir else inventory)
+
+            # Add or append group section
+            new_nodes = {}
+            with metrics.phase("apply"):
+                apply_add_records(inventory, infra_groupname, records, new_nodes, access_method, ssh_key_storage_path,
+                                  ssh_password_storage_path, chunk_size, validator, metrics)
+
+            # === Nothing is written if a new node conflicts with the inventory ===
+            if validator is not None:
+                metrics.set("conflicts", len(validator.conflicts))
+                if not validator.report():
+                    return False
+
+            if prober is not None:
+                # Existing nodes are never rewritten here, so only the new ones are worth probing
+                with metrics.phase("probe"):
+                    known = known_node_names(shard_paths(shard_dir, infra_groupname)[1] if shard_dir else inventory_path)
+                    probe_nodes(prober, new_nodes, ssh_key_storage_path, ssh_password_storage_path,
+                                only={name for name in new_nodes if name not in known})
+
+            if shard_dir:
+                with metrics.phase("write_shard"):
+                    if not os.path.exists(shard_paths(shard_dir, "mylocal")[0]):
+                        write_group_shard(shard_dir, "mylocal", [mylocal_entry()], dry_run=dry_run)
+                    entries = [line for line in inventory.groups[infra_groupname].lines if line is not None]
+                    hosts_path, inventory_path = write_group_shard(shard_dir, infra_groupname, entries, new_nodes,
+                                                                   upsert=False, xml_replace=False, dry_run=dry_run)
+                metrics.set("groups", 1)
+            else:
+                # === Handle inventory.xml ===
+                # Existing nodes are kept as they are, only unknown names are added
+                xml_changes = []
+                with metrics.phase("write_xml"):
+                    added, _ = merge_nodes(inventory_path, new_nodes, replace=False, changes=xml_changes, dry_run=dry_run)
+                metrics.set("xml_nodes_added", added)
+
+                ini_changes = list(inventory.changes)
+                with metrics.phase("write_ini"):
+                    if not inventory.write_ini(hosts_path, dry_run=dry_run):
+                        ini_changes = []
+                metrics.set("groups", len(inventory.groups))
+
+                report_changes(inventory_path, xml_changes, dry_run)
+                report_changes(hosts_path, ini_changes, dry_run)
+
+            if dry_run:
+                return
+
+            print(f"✅ Files successfully updated or created:")
+            print(f" - {inventory_path}")
+            print(f" - {hosts_path}")
+        except Exception as e:
+            print("❌ Error writing files:")
+            traceback.print_exc()
+            return False
 
 # === CLI Argument Parser ===
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate inventory and hosts files for multiple nodes.")
     parser.add_argument("--access_method", type=str, required=True, choices=["password", "privatesshkey"],
                         help="Access method: 'password' or 'privatesshkey'")
-    parser.add_argument("--ip_addresses", type=str, required=True, help="Comma-separated list of server IP addresses")
-    parser.add_argument("--usernames", type=str, required=True, help="Comma-separated list of usernames for access")
+    parser.add_argument("--ip_addresses", type=str, required=False, help="Comma-separated list of server IP addresses")
+    parser.add_argument("--usernames", type=str, required=False, help="Comma-separated list of usernames for access")
     parser.add_argument("--ssh_password_storage_path", type=str, required=False,
                         help="Path to SSH password storage file (required for password method)")
     parser.add_argument("--ssh_key_storage_path", type=str, required=False,
                         help="Path to SSH private key storage file (required for privatesshkey method)")
     parser.add_argument("--infra_groupname", type=str, required=True, help="Infrastructure group name")
-    parser.add_argument("--node_names", type=str, required=True, help="Comma-separated list of node names (hostnames)")
+    parser.add_argument("--node_names", type=str, required=False, help="Comma-separated list of node names (hostnames)")
+    add_input_arguments(parser)
+    add_range_arguments(parser)
+    add_shard_arguments(parser)
+    add_metrics_arguments(parser)
+    add_dry_run_arguments(parser)
+    add_journal_arguments(parser)
+    add_probe_arguments(parser)
+    add_validate_arguments(parser)
     args = parser.parse_args()
-
-# Split and sanitize input
-ip_addresses = [ip.strip() for ip in args.ip_addresses.split(',') if ip.strip()]
-usernames = [u.strip() for u in args.usernames.split(',') if u.strip()]
-node_names = [n.strip() for n in args.node_names.split(',') if n.strip()]
-
-# Skip if any part of node data is missing
-if not ip_addresses or not usernames or not node_names:
-    print("⚠️ Skipping update: no valid node data provided.")
-    exit(0)
-
-generate_files(
-    access_method=args.access_method,
-    ip_addresses=ip_addresses,
-    usernames=usernames,
-    ssh_password_storage_path=args.ssh_password_storage_path,
-    infra_groupname=args.infra_groupname,
-    ssh_key_storage_path=args.ssh_key_storage_path,
-    node_names=node_names
-)
+    metrics = RunMetrics(os.path.splitext(os.path.basename(__file__))[0])
+
+    spec = None
+    if args.ip_range:
+        if args.input or args.ip_addresses:
+            parser.error("--ip_range cannot be combined with --input or --ip_addresses")
+        try:
+            spec = range_spec(args)
+        except ValueError as e:
+            parser.error(str(e))
+        records = iter_range_records(spec)
+    elif args.input:
+        check_input_argument(parser, args)
+        records = iter_records(args.input, args.input_format)
+    else:
+        if not (args.ip_addresses and args.usernames and args.node_names):
+            parser.error("--ip_addresses, --usernames and --node_names are required unless --input or --ip_range is given")
+
+        # Split and sanitize input
+        ip_addresses = [ip.strip() for ip in args.ip_addresses.split(',') if ip.strip()]
+        usernames = [u.strip() for u in args.usernames.split(',') if u.strip()]
+        node_names = [n.strip() for n in args.node_names.split(',') if n.strip()]
+
+        # Skip if any part of node data is missing
+        if not ip_addresses or not usernames or not node_names:
+            print("⚠️ Skipping update: no valid node data provided.")
+            exit(0)
+
+        if len(ip_addresses) != len(usernames) or len(usernames) != len(node_names):
+            print("ERROR: The number of IP addresses, usernames, and node names must be the same.")
+            exit(1)
+
+        records = iter_list_records(ip_addresses, usernames, node_names)
+
+    if args.journal or args.journal_wait:
+        if args.shard_dir or args.dry_run or args.probe_facts:
+            parser.error("--journal cannot be combined with --shard_dir, --dry_run or --probe_facts")
+        operation = {
+            "op": "add",
+            "group": args.infra_groupname,
+            "access_method": args.access_method,
+            "ssh_key_storage_path": args.ssh_key_storage_path or "",
+            "ssh_password_storage_path": args.ssh_password_storage_path or "",
+            "nodes": spec or journal_records(records),
+        }
+        if args.skip_validation or args.allow_conflicts:
+            operation["skip_validation"] = True
+        exit(0 if submit([operation], wait=args.journal_wait, source=os.path.basename(__file__)) else 1)
+
+    written = generate_files_from_records(
+        access_method=args.access_method,
+        records=records,
+        ssh_password_storage_path=args.ssh_password_storage_path,
+        infra_groupname=args.infra_groupname,
+        ssh_key_storage_path=args.ssh_key_storage_path,
+        chunk_size=args.chunk_size,
+        shard_dir=args.shard_dir,
+        metrics=metrics,
+        dry_run=args.dry_run,
+        prober=FactProber.from_args(args) if args.probe_facts else None,
+        validator=FleetIndex.from_args(args)
+    )
+
+    if args.metrics:
+        metrics.emit(args.metrics, args.metrics_textfile_dir)
+    if written is False:
+        exit(1)
@@ -2,8 +2,24 @@
 
 import argparse
 import sys
+from itertools import chain
 from pathlib import Path
-from xml.etree.ElementTree import Element, SubElement, ElementTree, parse
+
+from inventory_api import DEFAULT_XML_NODES, K8S_NODE_ATTRIBUTES, apply_k8s_records
+from inventory_diff import add_dry_run_arguments, report_changes
+from inventory_facts import FactProber, add_probe_arguments, apply_facts, known_node_names, probe_nodes
+from inventory_input import (add_input_arguments, add_range_arguments, check_input_argument, iter_list_records,
+                             iter_range_records, iter_records, iter_valid_chunks, range_spec)
+from inventory_journal import add_journal_arguments, inventory_lock, submit
+from inventory_metrics import RunMetrics, add_metrics_arguments
+from inventory_model import HOSTS_PATH, INVENTORY_PATH, Inventory
+from inventory_shards import add_shard_arguments, shard_paths, write_group_shard
+from inventory_validate import FleetIndex, add_validate_arguments
+from inventory_xml import merge_nodes
+
+
+# Record role -> option suffix of its side
+SIDES = {"master": "_K8S_Master", "worker": "_K8S_Slave"}
 
 
 def parse_args():
@@ -22,129 +38,197 @@ def parse_args():
     parser.add_argument('--node_names_K8S_Slave', default='')
     parser.add_argument('--infra_groupname_K8S_Slave', default='')
 
-    return parser.parse_args()
+    # Compact mode: --ip_range_K8S_Master 10.0.0.0/29 --node_pattern_K8S_Master master-{} --username_K8S_Master root
+    for suffix in SIDES.values():
+        add_range_arguments(parser, suffix)
+
+    # Bulk mode: records carry a "role" column (master, slave or worker)
+    add_input_arguments(parser)
+    add_shard_arguments(parser)
+    add_metrics_arguments(parser)
+    add_dry_run_arguments(parser)
+    add_journal_arguments(parser)
+    add_probe_arguments(parser)
+    add_validate_arguments(parser)
+
+    args = parser.parse_args()
+    check_input_argument(parser, args)
+    return args
 
 
 def split_and_clean(arg):
     return [x.strip() for x in arg.split(',') if x.strip()]
 
 
-def insert_into_group(existing_lines, group, new_entries):
-    group_header = f"[{group}]"
-    updated_lines = []
-    inserted = False
-    i = 0
-
-    while i < len(existing_lines):
-        line = existing_lines[i]
-        updated_lines.append(line)
-        if line.strip() == group_header:
-            i += 1
-            # Add new entries right after the group header or existing content
-            while i < len(existing_lines) and not existing_lines[i].startswith('['):
-                updated_lines.append(existing_lines[i])
-                i += 1
-            updated_lines.extend(new_entries)
-            inserted = True
-            continue
-        i += 1
-
-    if not inserted:
-        updated_lines.append("")
-        updated_lines.append(group_header)
-        updated_lines.extend(new_entries)
-
-    return updated_lines
-
-
-def generate_xml_node(parent, name, ip, user, tag, ssh_key_path=None):
-    node = SubElement(parent, "node", {
-        "name": name,
-        "hostname": ip,
-        "username": user,
-        "tags": tag,
-        "osFamily": "unix"
-    })
-    if ssh_key_path:
-        node.set("ssh-keypath", ssh_key_path)
-
-
-def read_existing_ini(path):
-    return path.read_text().splitlines() if path.exists() else []
-
-
-def read_existing_xml(path):
-    if path.exists():
-        return parse(path).getroot()
-    else:
-        root = Element("project")
-        SubElement(root, "node", {
-            "name": "rundeck",
-            "hostname": "localhost",
-            "username": "rundeck",
-            "ssh-password": "*******",
-            "ssh-become-password": "********",
-            "tags": "mylocal",
-            "osFamily": "unix"
-        })
-        return root
+def side_records(args, role):
+    """Records of one side from --ip_range (expanded lazily) or from the comma-separated lists, None if incomplete."""
+    suffix = SIDES[role]
+    if not getattr(args, f"infra_groupname{suffix}"):
+        print(f"No --infra_groupname{suffix} — skipping {role} section.")
+        return None
+    spec = range_spec(args, suffix)
+    if spec:
+        return iter_range_records(spec, role)
+    lists = [split_and_clean(getattr(args, f"{field}{suffix}")) for field in ("ip_addresses", "usernames", "node_names")]
+    if not all(lists):
+        print(f"Incomplete {role} input — skipping {role} section.")
+        return None
+    if not len(lists[0]) == len(lists[1]) == len(lists[2]):
+        print(f"{role.capitalize()} node field count mismatch — skipping {role} section.")
+        return None
+    return iter_list_records(*lists, role=role)
+
+
+def uses_ranges(args):
+    return any(getattr(args, f"ip_range{suffix}") for suffix in SIDES.values())
+
+
+def role_groups(args):
+    """Record role -> group, for the sides that have an --infra_groupname_K8S_*."""
+    groups = {
+        "master": args.infra_groupname_K8S_Master,
+        "slave": args.infra_groupname_K8S_Slave,
+        "worker": args.infra_groupname_K8S_Slave,
+    }
+    return {role: group for role, group in groups.items() if group}
+
+
+def range_records(args):
+    """Both sides' records in one stream, for --ip_range runs."""
+    return chain.from_iterable(records for records in (side_records(args, role) for role in SIDES) if records)
+
+
+def journal_operation(args):
+    """The run as an inventory_batch.py "k8s" operation, for --journal."""
+    operation = {"op": "k8s", "ssh_key_storage_path": args.ssh_key_storage_path,
+                 "master_group": args.infra_groupname_K8S_Master, "worker_group": args.infra_groupname_K8S_Slave,
+                 "masters": [], "workers": []}
+    if uses_ranges(args):
+        # Keep the compact spec: the journal entry stays small whatever the range
+        for role, suffix in SIDES.items():
+            records = side_records(args, role)
+            operation[f"{role}s"] = range_spec(args, suffix) or [
+                {key: value for key, value in record.items() if key != "role"} for record in records or ()]
+        return operation
+    # Every record goes to its own side, also a node listed as both master and worker
+    records = iter_records(args.input, args.input_format) if args.input else range_records(args)
+    for chunk in iter_valid_chunks(records, args.chunk_size, set(role_groups(args))):
+        for record in chunk:
+            operation["masters" if record["role"] == "master" else "workers"].append(
+                {key: record[key] for key in ("ip", "username", "node_name")})
+    return operation
+
+
+def generate_files(args, metrics, hosts_path, xml_path):
+    """Apply the run to both files (or their shards) under the lock. Returns False if nothing was written."""
+    with inventory_lock(not args.dry_run):
+        if args.shard_dir:
+            # Collect per group in memory, then touch only those groups' shards
+            inventory = Inventory()
+        else:
+            if not args.dry_run:
+                hosts_path.parent.mkdir(parents=True, exist_ok=True)
+            with metrics.phase("load"):
+                inventory = Inventory.load(hosts_path, dry_run=args.dry_run)
+
+        # A node listed as master and worker is one node in inventory.xml but goes to both groups' shards
+        xml_nodes, group_nodes = {}, {}
+        validator = FleetIndex.from_args(args)
+        if validator is not None:
+            with metrics.phase("validate"):
+                validator.load(hosts_path, xml_path, args.shard_dir, None if args.shard_dir else inventory)
+
+        # Every side in one stream: the --input rows, or the ranges and comma-separated lists
+        groups = role_groups(args)
+        if not groups:
+            print("No infra group names given — nothing to do.")
+            records = ()
+        elif args.input:
+            records = iter_records(args.input, args.input_format)
+        else:
+            records = range_records(args)
+        with metrics.phase("apply"):
+            apply_k8s_records(inventory, groups, records, xml_nodes, args.ssh_key_storage_path, args.chunk_size,
+                              validator, metrics, group_nodes)
+
+        # Nothing is written if a new node conflicts with the inventory
+        if validator is not None:
+            metrics.set("conflicts", len(validator.conflicts))
+            if not validator.report():
+                return False
+
+        if args.probe_facts:
+            # Nodes already in inventory.xml keep the facts they have (update= below): only new ones are probed
+            with metrics.phase("probe"):
+                known = set()
+                for path in ([shard_paths(args.shard_dir, group)[1] for group in inventory.groups]
+                             if args.shard_dir else [xml_path]):
+                    known |= known_node_names(path)
+                probe_nodes(FactProber.from_args(args), xml_nodes, args.ssh_key_storage_path,
+                            args.ssh_password_storage_path, only={name for name in xml_nodes if name not in known})
+                for nodes in group_nodes.values():
+                    for name, attrs in nodes.items():
+                        apply_facts(attrs, xml_nodes[name])
+
+        if args.shard_dir:
+            with metrics.phase("write_shard"):
+                for group in inventory.groups.values():
+                    entries = [line for line in group.lines if line is not None]
+                    write_group_shard(args.shard_dir, group.name, entries, group_nodes.get(group.name, {}),
+                                      dry_run=args.dry_run, update=K8S_NODE_ATTRIBUTES)
+            metrics.set("groups", len(inventory.groups))
+        else:
+            # WRITE FILES (every group in one rewrite, skipped when nothing changed)
+            ini_changes = list(inventory.changes)
+            xml_changes = []
+            with metrics.phase("write_ini"):
+                if not inventory.write_ini(hosts_path, dry_run=args.dry_run):
+                    ini_changes = []
+            with metrics.phase("write_xml"):
+                added, updated = merge_nodes(xml_path, xml_nodes, replace=True, default_nodes=DEFAULT_XML_NODES,
+                                             changes=xml_changes, dry_run=args.dry_run, update=K8S_NODE_ATTRIBUTES)
+            metrics.set("groups", len(inventory.groups))
+            metrics.set("xml_nodes_added", added)
+            metrics.set("xml_nodes_updated", updated)
+
+            report_changes(hosts_path, ini_changes, args.dry_run)
+            report_changes(xml_path, xml_changes, args.dry_run)
 
 
 def main():
     args = parse_args()
+    metrics = RunMetrics("generate_inventory_Kube")
+
+    if uses_ranges(args):
+        if args.input:
+            print("❌ --ip_range_K8S_* cannot be combined with --input")
+            sys.exit(1)
+        try:
+            for suffix in SIDES.values():
+                range_spec(args, suffix)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
 
     # Paths
-    hosts_path = Path("/etc/ansible/hosts")
-    xml_path = Path("/etc/ansible/inventory.xml")
-
-    existing_ini = read_existing_ini(hosts_path)
-    final_ini = existing_ini[:]
-
-    xml_root = read_existing_xml(xml_path)
-
-    # MASTER
-    if all([args.ip_addresses_K8S_Master, args.usernames_K8S_Master, args.node_names_K8S_Master, args.infra_groupname_K8S_Master]):
-        master_ips = split_and_clean(args.ip_addresses_K8S_Master)
-        master_users = split_and_clean(args.usernames_K8S_Master)
-        master_nodes = split_and_clean(args.node_names_K8S_Master)
-        if len(master_ips) == len(master_users) == len(master_nodes):
-            master_entries = [
-                f"{name} ansible_host={ip} ansible_user={user}"
-                for name, ip, user in zip(master_nodes, master_ips, master_users)
-            ]
-            final_ini = insert_into_group(final_ini, args.infra_groupname_K8S_Master, master_entries)
-            for name, ip, user in zip(master_nodes, master_ips, master_users):
-                generate_xml_node(xml_root, name, ip, user, args.infra_groupname_K8S_Master, args.ssh_key_storage_path)
-        else:
-            print("Master node field count mismatch — skipping master section.")
-    else:
-        print("Incomplete master input — skipping master section.")
-
-    # SLAVE
-    if all([args.ip_addresses_K8S_Slave, args.usernames_K8S_Slave, args.node_names_K8S_Slave, args.infra_groupname_K8S_Slave]):
-        slave_ips = split_and_clean(args.ip_addresses_K8S_Slave)
-        slave_users = split_and_clean(args.usernames_K8S_Slave)
-        slave_nodes = split_and_clean(args.node_names_K8S_Slave)
-        if len(slave_ips) == len(slave_users) == len(slave_nodes):
-            slave_entries = [
-                f"{name} ansible_host={ip} ansible_user={user}"
-                for name, ip, user in zip(slave_nodes, slave_ips, slave_users)
-            ]
-            final_ini = insert_into_group(final_ini, args.infra_groupname_K8S_Slave, slave_entries)
-            for name, ip, user in zip(slave_nodes, slave_ips, slave_users):
-                generate_xml_node(xml_root, name, ip, user, args.infra_groupname_K8S_Slave, args.ssh_key_storage_path)
-        else:
-            print("Slave node field count mismatch — skipping slave section.")
-    else:
-        print("Incomplete slave input — skipping slave section.")
-
-    # WRITE FILES
-    hosts_path.write_text('\n'.join(final_ini) + '\n')
-    ElementTree(xml_root).write(xml_path, encoding="utf-8", xml_declaration=True)
-
-    print("Inventory files generated:")
-    print(f"  INI:  {hosts_path}")
-    print(f"  XML:  {xml_path}")
+    hosts_path = Path(HOSTS_PATH)
+    xml_path = Path(INVENTORY_PATH)
+
+    if args.journal or args.journal_wait:
+        if args.shard_dir or args.dry_run or args.probe_facts:
+            print("❌ --journal cannot be combined with --shard_dir, --dry_run or --probe_facts")
+            sys.exit(1)
+        operation = journal_operation(args)
+        if args.skip_validation or args.allow_conflicts:
+            operation["skip_validation"] = True
+        sys.exit(0 if submit([operation], wait=args.journal_wait, source="generate_inventory_Kube") else 1)
+
+    written = generate_files(args, metrics, hosts_path, xml_path)
+
+    if args.metrics:
+        metrics.emit(args.metrics, args.metrics_textfile_dir)
+    if written is False:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,84 +1,129 @@
 import os
 import argparse
 
+from inventory_api import apply_patch_records
+from inventory_diff import add_dry_run_arguments, report_changes
+from inventory_input import (add_input_arguments, add_range_arguments, check_input_argument, iter_list_records,
+                             iter_range_records, iter_records, range_spec, DEFAULT_CHUNK_SIZE)
+from inventory_journal import add_journal_arguments, inventory_lock, journal_records, submit
+from inventory_metrics import RunMetrics, add_metrics_arguments
+from inventory_model import HOSTS_PATH, INVENTORY_PATH, Inventory
+from inventory_shards import add_shard_arguments, write_group_shard
+from inventory_validate import FleetIndex, add_validate_arguments
+
 def generate_files(access_method, ip_addresses, usernames, ssh_password_storage_path,
                    infra_groupname, ssh_key_storage_path, node_names):
-    hosts_path = "/etc/ansible/hosts"
-    inventory_path = "/etc/ansible/inventory.xml"
-
-    # Check if both files exist
-    if not os.path.exists(hosts_path):
-        print(f"❌ ERROR: {hosts_path} does not exist.")
-        return
-    if not os.path.exists(inventory_path):
-        print(f"❌ ERROR: {inventory_path} does not exist.")
-        return
-
     # Check lists match in length
     if not (len(ip_addresses) == len(usernames) == len(node_names)):
         print("❌ ERROR: The number of IP addresses, usernames, and node names must be the same.")
         return
 
-    # Read current hosts file content
-    try:
-        with open(hosts_path, "r") as f:
-            existing_lines = f.readlines()
-    except Exception as e:
-        print(f"❌ Failed to read {hosts_path}: {e}")
-        return
-
-    # Prepare for insertion
-    group_header = f"[{infra_groupname}]"
-    new_hosts_lines = []
-    in_target_group = False
-    group_found = False
-    added_nodes = set(node_names)
-
-    for line in existing_lines:
-        stripped = line.strip()
-
-        if stripped.startswith('[') and stripped.endswith(']'):
-            in_target_group = (stripped == group_header)
-            if in_target_group:
-                group_found = True
-            new_hosts_lines.append(line)
-            continue
-
-        if in_target_group:
-            node_name = line.strip().split()[0] if line.strip() else ''
-            if node_name in added_nodes:
-                continue  # Avoid duplicate entries
-
-        new_hosts_lines.append(line)
+    generate_files_from_records(
+        access_method=access_method,
+        records=iter_list_records(ip_addresses, usernames, node_names),
+        ssh_password_storage_path=ssh_password_storage_path,
+        infra_groupname=infra_groupname,
+        ssh_key_storage_path=ssh_key_storage_path
+    )
 
-    # If group does not exist, add it at the end
-    if not group_found:
-        new_hosts_lines.append(f"\n{group_header}\n")
 
-    # Append new entries
-    for ip, user, node in zip(ip_addresses, usernames, node_names):
-        new_hosts_lines.append(f"{node} ansible_host={ip} ansible_user={user}\n")
+def generate_files_from_records(access_method, records, ssh_password_storage_path,
+                                infra_groupname, ssh_key_storage_path, chunk_size=DEFAULT_CHUNK_SIZE,
+                                shard_dir=None, metrics=None, dry_run=False, validator=None):
+    hosts_path = HOSTS_PATH
+    inventory_path = INVENTORY_PATH
+    metrics = metrics or RunMetrics("generate_inventory_Patch")
+
+    if shard_dir:
+        # Only the group's own shard is read and rewritten
+        with inventory_lock(not dry_run):
+            if validator is not None:
+                with metrics.phase("validate"):
+                    validator.load(shard_dir=shard_dir, xml=False)
+            # The group's lines are collected in memory, then replace its shard
+            inventory = Inventory()
+            with metrics.phase("apply"):
+                apply_patch_records(inventory, infra_groupname, records, chunk_size, validator, metrics)
+            entries = [line for line in inventory.groups[infra_groupname].lines if line is not None] \
+                if inventory.has_group(infra_groupname) else []
+            if validator is not None and not validator.report():
+                return False
+            metrics.set("groups", 1)
+            try:
+                with metrics.phase("write_shard"):
+                    hosts_path, _ = write_group_shard(shard_dir, infra_groupname, entries, dry_run=dry_run)
+                if not dry_run:
+                    print(f"✅ Successfully updated {hosts_path} under group [{infra_groupname}]")
+            except Exception as e:
+                print(f"❌ Failed to write shard for [{infra_groupname}]: {e}")
+                return False
+        return
 
-    # Write back updated hosts file
-    try:
-        with open(hosts_path, "w") as f:
-            f.writelines(new_hosts_lines)
-        print(f"✅ Successfully updated {hosts_path} under group [{infra_groupname}]")
-    except Exception as e:
-        print(f"❌ Failed to write to {hosts_path}: {e}")
+    # Check if both files exist
+    if not os.path.exists(hosts_path):
+        print(f"❌ ERROR: {hosts_path} does not exist.")
+        return False
+    if not os.path.exists(inventory_path):
+        print(f"❌ ERROR: {inventory_path} does not exist.")
+        return False
+
+    with inventory_lock(not dry_run):
+        # Read current hosts file content
+        try:
+            with metrics.phase("load"):
+                inventory = Inventory.load(hosts_path, dry_run=dry_run)
+        except Exception as e:
+            print(f"❌ Failed to read {hosts_path}: {e}")
+            return False
+
+        if validator is not None:
+            with metrics.phase("validate"):
+                validator.load(hosts_path, inventory=inventory, xml=False)
+
+        # Replace same-named entries in the group, append the rest
+        with metrics.phase("apply"):
+            apply_patch_records(inventory, infra_groupname, records, chunk_size, validator, metrics)
+        metrics.set("groups", len(inventory.groups))
+
+        # Nothing is written if a new node conflicts with the inventory
+        if validator is not None:
+            metrics.set("conflicts", len(validator.conflicts))
+            if not validator.report():
+                return False
+
+        # Write back updated hosts file (left untouched when nothing changed)
+        ini_changes = list(inventory.changes)
+        try:
+            with metrics.phase("write_ini"):
+                if not inventory.write_ini(hosts_path, dry_run=dry_run):
+                    ini_changes = []
+            report_changes(hosts_path, ini_changes, dry_run)
+            if ini_changes and not dry_run:
+                print(f"✅ Successfully updated {hosts_path} under group [{infra_groupname}]")
+        except Exception as e:
+            print(f"❌ Failed to write to {hosts_path}: {e}")
+            return False
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Append nodes to an existing Ansible hosts file under a specific group.")
     parser.add_argument("--access_method", type=str, required=True, choices=["password", "privatesshkey"], help="Access method: 'password' or 'privatesshkey'")
-    parser.add_argument("--ip_addresses", type=str, required=True, help="Comma-separated list of server IP addresses")
-    parser.add_argument("--usernames", type=str, required=True, help="Comma-separated list of usernames for access")
+    parser.add_argument("--ip_addresses", type=str, required=False, help="Comma-separated list of server IP addresses")
+    parser.add_argument("--usernames", type=str, required=False, help="Comma-separated list of usernames for access")
     parser.add_argument("--ssh_password_storage_path", type=str, required=False, help="Path to SSH password storage file (required for password method)")
     parser.add_argument("--ssh_key_storage_path", type=str, required=False, help="Path to SSH private key storage file (required for privatesshkey method)")
     parser.add_argument("--infra_groupname", type=str, required=True, help="Infrastructure group name to append entries to")
-    parser.add_argument("--node_names", type=str, required=True, help="Comma-separated list of node names (hostnames)")
+    parser.add_argument("--node_names", type=str, required=False, help="Comma-separated list of node names (hostnames)")
+    add_input_arguments(parser)
+    add_range_arguments(parser)
+    add_shard_arguments(parser)
+    add_metrics_arguments(parser)
+    add_dry_run_arguments(parser)
+    add_journal_arguments(parser)
+    add_validate_arguments(parser)
 
     args = parser.parse_args()
+    metrics = RunMetrics("generate_inventory_Patch")
 
     # Validate access method requirements
     if args.access_method == "password" and not args.ssh_password_storage_path:
@@ -89,16 +134,51 @@ if __name__ == "__main__":
         exit(1)
 
     # Parse input lists
-    ip_addresses = args.ip_addresses.split(',')
-    usernames = args.usernames.split(',')
-    node_names = args.node_names.split(',')
-
-    generate_files(
+    spec = None
+    if args.ip_range:
+        if args.input or args.ip_addresses:
+            parser.error("--ip_range cannot be combined with --input or --ip_addresses")
+        try:
+            spec = range_spec(args)
+        except ValueError as e:
+            parser.error(str(e))
+        records = iter_range_records(spec)
+    elif args.input:
+        check_input_argument(parser, args)
+        records = iter_records(args.input, args.input_format)
+    else:
+        if not (args.ip_addresses and args.usernames and args.node_names):
+            parser.error("--ip_addresses, --usernames and --node_names are required unless --input or --ip_range is given")
+        ip_addresses = [ip.strip() for ip in args.ip_addresses.split(',')]
+        usernames = [u.strip() for u in args.usernames.split(',')]
+        node_names = [n.strip() for n in args.node_names.split(',')]
+        if not (len(ip_addresses) == len(usernames) == len(node_names)):
+            print("❌ ERROR: The number of IP addresses, usernames, and node names must be the same.")
+            exit(1)
+        records = iter_list_records(ip_addresses, usernames, node_names)
+
+    if args.journal or args.journal_wait:
+        if args.shard_dir or args.dry_run:
+            parser.error("--journal cannot be combined with --shard_dir or --dry_run")
+        operation = {"op": "patch", "group": args.infra_groupname, "nodes": spec or journal_records(records)}
+        if args.skip_validation or args.allow_conflicts:
+            operation["skip_validation"] = True
+        exit(0 if submit([operation], wait=args.journal_wait, source="generate_inventory_Patch") else 1)
+
+    written = generate_files_from_records(
         access_method=args.access_method,
-        ip_addresses=ip_addresses,
-        usernames=usernames,
+        records=records,
         ssh_password_storage_path=args.ssh_password_storage_path,
         infra_groupname=args.infra_groupname,
         ssh_key_storage_path=args.ssh_key_storage_path,
-        node_names=node_names
+        chunk_size=args.chunk_size,
+        shard_dir=args.shard_dir,
+        metrics=metrics,
+        dry_run=args.dry_run,
+        validator=FleetIndex.from_args(args)
     )
+
+    if args.metrics:
+        metrics.emit(args.metrics, args.metrics_textfile_dir)
+    if written is False:
+        exit(1)
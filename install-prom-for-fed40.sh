@@ -44,6 +44,11 @@ scrape_configs:
     scrape_interval: 5s
     static_configs:
       - targets: ['localhost:9090']
+
+  # node_exporter, including the inventory_run_* metrics written by the generators (--metrics)
+  - job_name: 'node'
+    static_configs:
+      - targets: ['localhost:9100']
 EOL
 
 # Set ownership for the configuration file
@@ -73,4 +78,31 @@ EOL
 # Reload systemd daemon
 systemctl daemon-reload
 
+# Install node_exporter with the textfile collector used by generate_inventory*.py --metrics
+wget -P /home/onecloud https://github.com/prometheus/node_exporter/releases/download/v1.6.1/node_exporter-1.6.1.linux-amd64.tar.gz
+tar -xvf /home/onecloud/node_exporter-1.6.1.linux-amd64.tar.gz -C /home/onecloud
+cp /home/onecloud/node_exporter-1.6.1.linux-amd64/node_exporter /usr/local/bin/
+chown prometheus:prometheus /usr/local/bin/node_exporter
+
+mkdir -p /var/lib/node_exporter/textfile_collector
+chmod 755 /var/lib/node_exporter/textfile_collector
 
+cat <<EOL > /etc/systemd/system/node_exporter.service
+[Unit]
+Description=Prometheus Node Exporter
+Wants=network-online.target
+After=network-online.target
+
+[Service]
+User=prometheus
+Group=prometheus
+Type=simple
+ExecStart=/usr/local/bin/node_exporter \
+    --collector.textfile.directory=/var/lib/node_exporter/textfile_collector
+
+[Install]
+WantedBy=multi-user.target
+EOL
+
+systemctl daemon-reload
+systemctl enable --now node_exporter
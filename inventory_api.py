@@ -0,0 +1,190 @@
+"""Python API for the changes the generate_inventory*.py scripts make.
+
+    import inventory_api
+
+    inventory_api.add_nodes("MvmNode", [{"ip": "192.168.1.1", "username": "user1", "node_name": "node-11"}],
+                            ssh_key_storage_path="key/hobohobo")
+    inventory_api.patch_nodes("impacted_server", {"ip_range": "10.0.0.0/24", "node_pattern": "web-{}",
+                                                  "username": "ubuntu"})
+    inventory_api.set_k8s_nodes("k8s-master-data-plane", "k8s-worker-data-plane",
+                                masters=[...], workers=[...], ssh_key_storage_path="key/hobohobo")
+
+add_nodes does what generate_inventory_mutiple.py does, patch_nodes
+generate_inventory_Patch.py and set_k8s_nodes generate_inventory_Kube.py;
+apply() takes any list of inventory_batch.py operations. Nodes are a list of
+records (ip, username, node_name) or a range spec as in inventory_input.range_spec.
+
+Each call holds the inventory lock, checks the new nodes against the whole
+inventory (inventory_validate.py) and writes hosts and inventory.xml once.
+It returns {"ini_changes": [...], "xml_changes": [...]} as taken by
+inventory_diff.report_changes, and raises ValueError for conflicts and
+invalid operations. inventory_daemon.py does the same with both files kept
+in memory between calls. The modules doing the work are imported on first
+use, so importing this one costs next to nothing.
+
+apply_add_records, apply_patch_records and apply_k8s_records apply records
+to an in-memory Inventory; the scripts, inventory_batch.py and the daemon
+all go through them.
+"""
+
+import os
+
+# Where inventory_daemon.py listens, under the same root as inventory_model.ANSIBLE_DIR
+SOCKET_PATH = os.path.join(os.environ.get("INVENTORY_ANSIBLE_DIR", "/etc/ansible"), ".inventory.sock")
+
+# Seeded into a new inventory.xml, the same way the first run always did
+DEFAULT_XML_NODES = [{
+    "name": "rundeck",
+    "hostname": "localhost",
+    "username": "rundeck",
+    "ssh-password": "*******",
+    "ssh-become-password": "********",
+    "tags": "mylocal",
+    "osFamily": "unix"
+}]
+
+
+# What generate_xml_node sets: a node that is already in inventory.xml only gets these overwritten, so the
+# attributes another generator gave it (description, ssh-key-storage-path, ssh-authentication, OS facts) stay
+K8S_NODE_ATTRIBUTES = ("hostname", "username", "tags", "ssh-keypath")
+
+
+def mylocal_entry():
+    """The [mylocal] line every hosts file starts with: this machine, reached as localhost."""
+    from inventory_model import format_host_line
+    return (format_host_line(os.uname()[1], "localhost", "rundeck")
+            + " ansible_password=rundeck ansible_become_password=rundeck")
+
+
+def add_mylocal(inventory):
+    # Write [mylocal] once
+    if not inventory.has_group("mylocal"):
+        inventory.add_group("mylocal", blank_line=False)
+        inventory.add_host("mylocal", mylocal_entry())
+
+
+def generate_xml_node(xml_nodes, name, ip, user, tag, ssh_key_path=None):
+    node = {
+        "name": name,
+        "hostname": ip,
+        "username": user,
+        "tags": tag,
+        "osFamily": "unix"
+    }
+    if ssh_key_path:
+        node["ssh-keypath"] = ssh_key_path
+    xml_nodes[name] = node
+
+
+# === Applying records to the model (shared by the scripts, inventory_batch.py and the daemon) ===
+def apply_add_records(inventory, group, records, xml_nodes, access_method="privatesshkey", ssh_key_storage_path="",
+                      ssh_password_storage_path="", chunk_size=None, validator=None, metrics=None):
+    """Add each valid record's line to group (kept if already there) and its node to xml_nodes unless named there.
+
+    Records are validated in chunks, and checked against the inventory when
+    a validator is given (generate_inventory_mutiple.py, "add").
+    """
+    from inventory_input import DEFAULT_CHUNK_SIZE, iter_valid_chunks
+    from inventory_model import format_host_line
+    from inventory_validate import check_chunks
+    from inventory_xml import node_attributes
+
+    inventory.add_group(group)
+    for chunk in check_chunks(validator, iter_valid_chunks(records, chunk_size or DEFAULT_CHUNK_SIZE), group):
+        if metrics is not None:
+            metrics.count("nodes", len(chunk))
+        for r in chunk:
+            if inventory.add_host(group, format_host_line(r["node_name"], r["ip"], r["username"])) and metrics is not None:
+                metrics.count("hosts_added")
+            if r["node_name"] not in xml_nodes:
+                xml_nodes[r["node_name"]] = node_attributes(r["node_name"], r["ip"], r["username"], access_method,
+                                                            ssh_key_storage_path, ssh_password_storage_path)
+
+
+def apply_patch_records(inventory, group, records, chunk_size=None, validator=None, metrics=None):
+    """Replace the same-named lines of group with each valid record's line and append the rest (generate_inventory_Patch.py, "patch")."""
+    from inventory_input import DEFAULT_CHUNK_SIZE, iter_valid_chunks
+    from inventory_model import format_host_line
+    from inventory_validate import check_chunks
+
+    for chunk in check_chunks(validator, iter_valid_chunks(records, chunk_size or DEFAULT_CHUNK_SIZE), group, replace=True):
+        if metrics is not None:
+            metrics.count("nodes", len(chunk))
+        for r in chunk:
+            if inventory.upsert_host(group, format_host_line(r["node_name"], r["ip"], r["username"])) \
+                    and metrics is not None:
+                metrics.count("hosts_changed")
+
+
+def apply_k8s_records(inventory, groups, records, xml_nodes, ssh_key_storage_path="", chunk_size=None, validator=None,
+                      metrics=None, group_nodes=None):
+    """Upsert each valid record's line in the group of its role (groups: role -> group) and its node in xml_nodes.
+
+    Roles without a group are rejected record by record
+    (generate_inventory_Kube.py, "k8s"). xml_nodes keeps one node per name,
+    tagged with its last role; group_nodes, when given, gets group ->
+    {name: node} with each role's own node, for per-group shards.
+    """
+    from inventory_input import DEFAULT_CHUNK_SIZE, iter_valid_chunks
+    from inventory_model import format_host_line
+
+    groups = {role: group for role, group in groups.items() if group}
+    for chunk in iter_valid_chunks(records, chunk_size or DEFAULT_CHUNK_SIZE, set(groups)):
+        if metrics is not None:
+            metrics.count("nodes", len(chunk))
+        for r in chunk:
+            group = groups[r["role"]]
+            if validator is not None:
+                validator.check_record(group, r, replace=True)
+            # Upsert by node name: reruns replace a node's line instead of duplicating it
+            if inventory.upsert_host(group, format_host_line(r["node_name"], r["ip"], r["username"])) \
+                    and metrics is not None:
+                metrics.count("hosts_changed")
+            generate_xml_node(xml_nodes, r["node_name"], r["ip"], r["username"], group, ssh_key_storage_path)
+            if group_nodes is not None:
+                group_nodes.setdefault(group, {})[r["node_name"]] = xml_nodes[r["node_name"]]
+
+
+# === Operations (see inventory_batch.py) ===
+def add_operation(group, nodes, access_method="privatesshkey", ssh_key_storage_path="", ssh_password_storage_path=""):
+    return {"op": "add", "group": group, "nodes": nodes, "access_method": access_method,
+            "ssh_key_storage_path": ssh_key_storage_path, "ssh_password_storage_path": ssh_password_storage_path}
+
+
+def patch_operation(group, nodes):
+    return {"op": "patch", "group": group, "nodes": nodes}
+
+
+def k8s_operation(master_group, worker_group, masters=(), workers=(), ssh_key_storage_path=""):
+    return {"op": "k8s", "master_group": master_group, "worker_group": worker_group,
+            "masters": masters, "workers": workers, "ssh_key_storage_path": ssh_key_storage_path}
+
+
+# === Applying ===
+def apply(operations, hosts_path=None, inventory_path=None, dry_run=False, validate=True, allow_conflicts=False):
+    """Apply inventory_batch.py operations in one parse/write cycle. Returns the changes made (or planned)."""
+    from inventory_batch import apply_manifest, check_operations
+    from inventory_model import HOSTS_PATH, INVENTORY_PATH
+    from inventory_validate import FleetIndex
+
+    _, ini_changes, xml_changes = apply_manifest(
+        check_operations(list(operations)), hosts_path or HOSTS_PATH, inventory_path or INVENTORY_PATH,
+        dry_run=dry_run, validator=FleetIndex(allow_conflicts) if validate else None)
+    return {"ini_changes": ini_changes, "xml_changes": xml_changes}
+
+
+def add_nodes(group, nodes, access_method="privatesshkey", ssh_key_storage_path="", ssh_password_storage_path="",
+              **options):
+    """Add nodes to a group and to inventory.xml, keeping nodes already there (generate_inventory_mutiple.py)."""
+    return apply([add_operation(group, nodes, access_method, ssh_key_storage_path, ssh_password_storage_path)],
+                 **options)
+
+
+def patch_nodes(group, nodes, **options):
+    """Replace the group's lines of these nodes, or append them; inventory.xml is left alone (generate_inventory_Patch.py)."""
+    return apply([patch_operation(group, nodes)], **options)
+
+
+def set_k8s_nodes(master_group, worker_group, masters=(), workers=(), ssh_key_storage_path="", **options):
+    """Upsert master and worker nodes in their groups and in inventory.xml (generate_inventory_Kube.py)."""
+    return apply([k8s_operation(master_group, worker_group, masters, workers, ssh_key_storage_path)], **options)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Apply many inventory operations in one parse/write cycle.
+
+The manifest is JSON (a file or '-' for stdin):
+
+    {"operations": [
+        {"op": "add", "group": "MvmNode", "access_method": "privatesshkey",
+         "ssh_key_storage_path": "key/hobohobo",
+         "nodes": [{"ip": "192.168.1.1", "username": "user1", "node_name": "node-11"}]},
+        {"op": "patch", "group": "impacted_server", "input": "impacted.csv"},
+        {"op": "k8s", "ssh_key_storage_path": "key/hobohobo",
+         "master_group": "k8s-master-data-plane", "worker_group": "k8s-worker-data-plane",
+         "masters": [...], "workers": [...]}
+    ]}
+
+"add" behaves like generate_inventory_mutiple.py, "patch" like
+generate_inventory_Patch.py and "k8s" like generate_inventory_Kube.py;
+"remove", "move" and "retag" take the same keys as inventory_bulk.py.
+Nodes come from "nodes" (list of records, or a range such as
+{"ip_range": "10.0.0.0/22", "node_pattern": "worker-{:04d}", "username": "ubuntu"}),
+"input" (CSV/JSONL file) or the comma-separated "ip_addresses"/"usernames"/
+"node_names" strings; "masters"/"workers" take a list or a range too. Both
+files are written once, after every operation has been applied.
+"""
+
+import argparse
+import json
+import os
+import sys
+from itertools import chain
+
+from inventory_api import DEFAULT_XML_NODES, K8S_NODE_ATTRIBUTES, add_mylocal, apply_add_records, apply_k8s_records, apply_patch_records
+from inventory_bulk import BULK_OPERATIONS, apply_bulk_operation
+from inventory_diff import add_dry_run_arguments, report_changes
+from inventory_input import check_range_spec, iter_list_records, iter_range_records, iter_records, normalize
+from inventory_journal import add_journal_arguments, inventory_lock, submit
+from inventory_metrics import RunMetrics, add_metrics_arguments
+from inventory_model import ANSIBLE_DIR, HOSTS_PATH, INVENTORY_PATH, Inventory
+from inventory_validate import FleetIndex, add_validate_arguments
+from inventory_xml import merge_nodes
+
+OPERATIONS = ("add", "patch", "k8s") + BULK_OPERATIONS
+
+
+class XmlPlan:
+    """Pending inventory.xml changes: upserts win over add-if-missing nodes."""
+
+    def __init__(self):
+        self.replace = {}
+        self.add_only = {}
+        self.needs_default = False
+        self.transforms = []
+
+    def upsert(self, name, attrs):
+        self.add_only.pop(name, None)
+        self.replace[name] = attrs
+
+    def add(self, name, attrs):
+        if name not in self.replace:
+            self.add_only.setdefault(name, attrs)
+
+    def transform(self, transform):
+        """Apply a bulk operation to the pending nodes now and to the existing ones at write time."""
+        for pending in (self.replace, self.add_only):
+            for name, attrs in list(pending.items()):
+                attrs = transform(dict(attrs))
+                if attrs is None:
+                    del pending[name]
+                else:
+                    pending[name] = attrs
+        self.transforms.append(transform)
+
+    def apply_transforms(self, attrs):
+        for transform in self.transforms:
+            attrs = transform(attrs)
+            if attrs is None:
+                return None
+        return attrs
+
+    def __bool__(self):
+        return bool(self.replace or self.add_only or self.transforms)
+
+
+def iter_operation_records(operation, key="nodes", role=None):
+    if isinstance(operation.get(key), dict):
+        # {"ip_range": ..., "node_pattern": ..., "username": ...}, expanded as it is read
+        check_range_spec(operation[key])
+        yield from iter_range_records(operation[key], role)
+    elif operation.get(key):
+        for raw in operation[key]:
+            record = normalize(raw)
+            if role:
+                record.setdefault("role", role)
+            yield record
+    elif operation.get("input") and key == "nodes":
+        yield from iter_records(operation["input"], operation.get("input_format"))
+    elif operation.get("ip_addresses") and key == "nodes":
+        split = lambda value: [x.strip() for x in value.split(",") if x.strip()]
+        yield from iter_list_records(split(operation["ip_addresses"]), split(operation["usernames"]),
+                                     split(operation["node_names"]))
+
+
+def apply_operation(inventory, plan, operation, metrics, validator=None):
+    op = operation.get("op")
+    if operation.get("skip_validation"):
+        validator = None
+    if op == "add":
+        add_mylocal(inventory)
+        nodes = {}
+        apply_add_records(inventory, operation["group"], iter_operation_records(operation), nodes,
+                          operation.get("access_method", "privatesshkey"), operation.get("ssh_key_storage_path", ""),
+                          operation.get("ssh_password_storage_path", ""), validator=validator, metrics=metrics)
+        for name, attrs in nodes.items():
+            plan.add(name, attrs)
+    elif op == "patch":
+        apply_patch_records(inventory, operation["group"], iter_operation_records(operation), validator=validator,
+                            metrics=metrics)
+    elif op == "k8s":
+        groups = {"master": operation.get("master_group"), "slave": operation.get("worker_group"),
+                  "worker": operation.get("worker_group")}
+        records = []
+        if operation.get("masters") or operation.get("workers"):
+            records = chain(iter_operation_records(operation, "masters", "master"),
+                            iter_operation_records(operation, "workers", "worker"))
+        elif operation.get("input"):
+            records = iter_records(operation["input"], operation.get("input_format"))
+        nodes = {}
+        apply_k8s_records(inventory, groups, records, nodes, operation.get("ssh_key_storage_path"),
+                          validator=validator, metrics=metrics)
+        for name, attrs in nodes.items():
+            plan.upsert(name, attrs)
+        plan.needs_default = True
+    elif op in BULK_OPERATIONS:
+        changed, transform = apply_bulk_operation(inventory, operation)
+        metrics.count("hosts_changed", changed)
+        plan.transform(transform)
+        if validator is not None:
+            # The files no longer describe the inventory: later records are only checked against each other
+            validator.forget_existing()
+    else:
+        raise ValueError(f"unknown op '{op}' (expected one of {', '.join(OPERATIONS)})")
+
+
+def apply_operations(inventory, plan, operations, metrics, validator=None):
+    """apply_operation() for each operation; errors are raised as ValueError naming the operation."""
+    for number, operation in enumerate(operations, start=1):
+        try:
+            apply_operation(inventory, plan, operation, metrics, validator)
+        except KeyError as e:
+            raise ValueError(f"operation {number} ({operation.get('op')}): missing key {e}") from e
+        except (OSError, ValueError) as e:
+            raise ValueError(f"operation {number} ({operation.get('op')}): {e}") from e
+        metrics.count("operations")
+
+
+def apply_manifest(operations, hosts_path=HOSTS_PATH, inventory_path=INVENTORY_PATH, metrics=None, dry_run=False,
+                   validator=None):
+    """Apply every operation to one in-memory inventory, then write hosts and inventory.xml once.
+
+    Files whose content does not change are not rewritten. With a validator
+    (an inventory_validate.FleetIndex) the new nodes are checked against the
+    inventory first, and ValueError is raised instead of writing if one
+    conflicts. Returns (inventory, ini_changes, xml_changes).
+    """
+    metrics = metrics or RunMetrics("inventory_batch")
+    if not dry_run:
+        os.makedirs(os.path.dirname(os.path.abspath(hosts_path)), exist_ok=True)
+    with inventory_lock(not dry_run):
+        with metrics.phase("load"):
+            inventory = Inventory.load(hosts_path, dry_run=dry_run)
+
+        if validator is not None:
+            with metrics.phase("validate"):
+                validator.load(hosts_path, inventory_path, inventory=inventory)
+
+        plan = XmlPlan()
+        with metrics.phase("apply"):
+            apply_operations(inventory, plan, operations, metrics, validator)
+
+        if validator is not None:
+            metrics.set("conflicts", len(validator.conflicts))
+            if not validator.report():
+                raise ValueError(f"{len(validator.conflicts)} conflict(s) in the new nodes")
+
+        ini_changes, xml_changes = list(inventory.changes), []
+        with metrics.phase("write_xml"):
+            if plan or not os.path.exists(inventory_path):
+                default_nodes = DEFAULT_XML_NODES if plan.needs_default else ()
+                merge_nodes(inventory_path, plan.replace, replace=True, default_nodes=default_nodes,
+                            add_only=plan.add_only, transform=plan.apply_transforms if plan.transforms else None,
+                            changes=xml_changes, dry_run=dry_run, update=K8S_NODE_ATTRIBUTES)
+        with metrics.phase("write_ini"):
+            if not inventory.write_ini(hosts_path, dry_run=dry_run):
+                ini_changes = []
+        metrics.set("groups", len(inventory.groups))
+    return inventory, ini_changes, xml_changes
+
+
+def load_manifest(path):
+    if path == "-":
+        manifest = json.load(sys.stdin)
+    else:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    return check_operations(manifest["operations"] if isinstance(manifest, dict) else manifest)
+
+
+def check_operations(operations):
+    """Raise ValueError for an operation that cannot be applied, before anything is applied."""
+    for number, operation in enumerate(operations, start=1):
+        if not isinstance(operation, dict):
+            raise ValueError(f"operation {number}: expected a JSON object")
+        op = operation.get("op")
+        if op not in OPERATIONS:
+            raise ValueError(f"operation {number}: unknown op '{op}'")
+        try:
+            if op in ("add", "patch"):
+                if not operation.get("group"):
+                    raise ValueError(f"'group' is required for {op}")
+                check_node_fields(operation)
+            elif op == "k8s":
+                if not operation.get("master_group") and not operation.get("worker_group"):
+                    raise ValueError("'master_group' or 'worker_group' is required for k8s")
+                if "masters" in operation or "workers" in operation:
+                    check_node_fields(operation, "masters", required=False)
+                    check_node_fields(operation, "workers", required=False)
+                else:
+                    check_input_field(operation)
+        except ValueError as e:
+            raise ValueError(f"operation {number}: {e}")
+    return operations
+
+
+def check_node_fields(operation, key="nodes", required=True):
+    """Raise ValueError unless the operation's nodes come from exactly one valid source."""
+    if key in operation:
+        nodes = operation[key]
+        if isinstance(nodes, dict):
+            check_range_spec(nodes)
+        elif not isinstance(nodes, list) or not all(isinstance(raw, dict) for raw in nodes):
+            raise ValueError(f"'{key}' must be a list of records or a range spec")
+    elif key == "nodes" and "input" in operation:
+        check_input_field(operation)
+    elif key == "nodes" and any(field in operation for field in ("ip_addresses", "usernames", "node_names")):
+        lists = []
+        for field in ("ip_addresses", "usernames", "node_names"):
+            if not isinstance(operation.get(field), str):
+                raise ValueError(f"'{field}' is required with the other comma-separated fields")
+            lists.append([x for x in operation[field].split(",") if x.strip()])
+        if not len(lists[0]) == len(lists[1]) == len(lists[2]):
+            raise ValueError("the number of ip_addresses, usernames and node_names must be the same")
+    elif required:
+        raise ValueError(f"no nodes: give '{key}', 'input' or 'ip_addresses'/'usernames'/'node_names'")
+
+
+def check_input_field(operation):
+    """Raise ValueError for an "input" file that cannot be read."""
+    path = operation.get("input")
+    if not isinstance(path, str) or not path:
+        raise ValueError("'input' must be a file path")
+    if path != "-":
+        try:
+            with open(path, "rb"):
+                pass
+        except OSError as e:
+            raise ValueError(f"cannot read input {path}: {e.strerror}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a manifest of inventory operations in one parse/write cycle.")
+    parser.add_argument("manifest", help="JSON manifest file, '-' for stdin")
+    add_metrics_arguments(parser)
+    add_dry_run_arguments(parser)
+    add_journal_arguments(parser)
+    add_validate_arguments(parser)
+    args = parser.parse_args()
+    metrics = RunMetrics("inventory_batch")
+
+    try:
+        operations = load_manifest(args.manifest)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Invalid manifest: {e}")
+        sys.exit(1)
+
+    if args.journal or args.journal_wait:
+        if args.skip_validation or args.allow_conflicts:
+            for operation in operations:
+                operation["skip_validation"] = True
+        sys.exit(0 if submit(operations, wait=args.journal_wait, source="inventory_batch") else 1)
+
+    if not args.dry_run:
+        os.makedirs(ANSIBLE_DIR, exist_ok=True)
+    try:
+        _, ini_changes, xml_changes = apply_manifest(operations, metrics=metrics, dry_run=args.dry_run,
+                                                     validator=FleetIndex.from_args(args))
+    except (ValueError, KeyError, OSError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"{'🔎 Planned' if args.dry_run else '✅ Applied'} {len(operations)} operation(s):")
+    report_changes(INVENTORY_PATH, xml_changes, args.dry_run)
+    report_changes(HOSTS_PATH, ini_changes, args.dry_run)
+
+    if args.metrics:
+        metrics.emit(args.metrics, args.metrics_textfile_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Bulk remove / move / retag of nodes in the hosts INI and inventory.xml.
+
+Nodes are selected by name, IP address or CIDR. Each file is rewritten in
+a single pass whatever the number of selected nodes:
+
+    inventory_bulk.py remove --cidr 10.20.30.0/24
+    inventory_bulk.py remove --groups impacted_server --node_names node-11,node-12
+    inventory_bulk.py move --to_group decommissioned --select_file rack-7.txt
+    inventory_bulk.py retag --ip_addresses 192.168.1.1 --add_tags maintenance
+"""
+
+import argparse
+import ipaddress
+import os
+import sys
+
+from inventory_diff import add_dry_run_arguments, report_changes
+from inventory_journal import add_journal_arguments, inventory_lock, submit
+from inventory_metrics import RunMetrics, add_metrics_arguments
+from inventory_model import HOSTS_PATH, INVENTORY_PATH, Inventory
+from inventory_xml import filter_nodes
+
+BULK_OPERATIONS = ("remove", "move", "retag")
+
+
+class NodeSelector:
+    """Matches nodes by name or address: set lookups, plus a containment check per CIDR."""
+
+    def __init__(self, names=(), addresses=(), networks=()):
+        self.names = set(names)
+        self.addresses = set(addresses)
+        self.networks = [ipaddress.ip_network(network, strict=False) for network in networks]
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """Sort free-form tokens (as in a --select_file) into CIDRs, IP addresses and node names."""
+        names, addresses, networks = [], [], []
+        for token in tokens:
+            if "/" in token:
+                networks.append(token)
+                continue
+            try:
+                ipaddress.ip_address(token)
+                addresses.append(token)
+            except ValueError:
+                names.append(token)
+        return cls(names, addresses, networks)
+
+    @property
+    def needs_address(self):
+        return bool(self.addresses or self.networks)
+
+    def __bool__(self):
+        return bool(self.names or self.addresses or self.networks)
+
+    def matches(self, name, address=None):
+        if name in self.names:
+            return True
+        if not address:
+            return False
+        if address in self.addresses:
+            return True
+        if self.networks:
+            try:
+                ip = ipaddress.ip_address(address)
+            except ValueError:
+                return False
+            return any(ip in network for network in self.networks)
+        return False
+
+
+def split_list(value):
+    """Accept a list or a comma-separated string (CLI and manifest style)."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [item.strip() for item in value if item and item.strip()]
+
+
+def selector_from_operation(operation):
+    selector = NodeSelector(split_list(operation.get("node_names")), split_list(operation.get("ip_addresses")),
+                            split_list(operation.get("cidr")))
+    tokens = list(operation.get("select") or ())
+    if operation.get("select_file"):
+        with open(operation["select_file"], "r") as f:
+            tokens += [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
+    if tokens:
+        extra = NodeSelector.from_tokens(tokens)
+        selector.names |= extra.names
+        selector.addresses |= extra.addresses
+        selector.networks += extra.networks
+    return selector
+
+
+def replace_tag(tags, old, new):
+    items = split_list(tags)
+    if old not in items:
+        return tags
+    return ", ".join(new if item == old else item for item in items if item != new or old == new)
+
+
+def apply_bulk_operation(inventory, operation):
+    """Apply a remove/move/retag operation to the INI model.
+
+    Returns (changed_lines, transform) where transform rewrites the XML
+    attributes of one node (None drops the node), for merge_nodes/filter_nodes.
+    """
+    op = operation["op"]
+    selector = selector_from_operation(operation)
+    if not selector:
+        raise ValueError(f"{op}: select nodes with node_names, ip_addresses, cidr or select_file")
+    groups = split_list(operation.get("groups")) or None
+
+    if op == "remove":
+        removed = inventory.remove_matching(selector, groups)
+        if groups is None:
+            return len(removed), lambda attrs: None if selector.matches(attrs.get("name"), attrs.get("hostname")) else attrs
+        # Only drop Rundeck nodes that are no longer in any group
+        gone = {name for _, name, _ in removed if name not in inventory.nodes}
+        return len(removed), lambda attrs: None if attrs.get("name") in gone else attrs
+
+    if op == "move":
+        target = operation.get("to_group")
+        if not target:
+            raise ValueError("move: to_group is required")
+        removed = inventory.remove_matching(selector, [g for g in (groups or inventory.groups) if g != target])
+        sources = {}
+        for group_name, name, entry in removed:
+            inventory.add_host(target, entry)
+            sources.setdefault(name, set()).add(group_name)
+
+        def retag_moved(attrs):
+            # generate_inventory_Kube.py tags nodes with their group name
+            for source in sources.get(attrs.get("name"), ()):
+                attrs["tags"] = replace_tag(attrs.get("tags", ""), source, target)
+            return attrs
+
+        return len(removed), retag_moved
+
+    if op == "retag":
+        new_tags = operation.get("tags")
+        add_tags, remove_tags = split_list(operation.get("add_tags")), set(split_list(operation.get("remove_tags")))
+        if new_tags is None and not add_tags and not remove_tags:
+            raise ValueError("retag: give tags, add_tags or remove_tags")
+
+        def retag(attrs):
+            if not selector.matches(attrs.get("name"), attrs.get("hostname")):
+                return attrs
+            items = split_list(new_tags) if new_tags is not None else split_list(attrs.get("tags", ""))
+            items = [item for item in items if item not in remove_tags]
+            items += [tag for tag in add_tags if tag not in items]
+            attrs["tags"] = ", ".join(items)
+            return attrs
+
+        return 0, retag
+
+    raise ValueError(f"unknown op '{op}' (expected one of {', '.join(BULK_OPERATIONS)})")
+
+
+def run_bulk_operation(operation, hosts_path=HOSTS_PATH, inventory_path=INVENTORY_PATH, metrics=None, dry_run=False):
+    """Load, apply and write back both files once (only if they change). Returns (ini_lines_changed, xml_removed, xml_changed)."""
+    metrics = metrics or RunMetrics("inventory_bulk")
+    with inventory_lock(not dry_run):
+        return _run_bulk_operation(operation, hosts_path, inventory_path, metrics, dry_run)
+
+
+def _run_bulk_operation(operation, hosts_path, inventory_path, metrics, dry_run):
+    with metrics.phase("load"):
+        inventory = Inventory.load(hosts_path, dry_run=dry_run)
+    with metrics.phase("apply"):
+        changed, transform = apply_bulk_operation(inventory, operation)
+    ini_changes, xml_changes = list(inventory.changes), []
+    with metrics.phase("write_ini"):
+        if os.path.exists(hosts_path):
+            if not inventory.write_ini(hosts_path, dry_run=dry_run):
+                ini_changes = []
+    xml_removed = xml_changed = 0
+    with metrics.phase("write_xml"):
+        if os.path.exists(inventory_path):
+            xml_removed, xml_changed = filter_nodes(inventory_path, transform, xml_changes, dry_run)
+    report_changes(hosts_path, ini_changes, dry_run)
+    report_changes(inventory_path, xml_changes, dry_run)
+    metrics.set("hosts_changed", changed)
+    metrics.set("xml_nodes_removed", xml_removed)
+    metrics.set("xml_nodes_changed", xml_changed)
+    return changed, xml_removed, xml_changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove, move or retag many nodes in the hosts file and inventory.xml at once.")
+    parser.add_argument("op", choices=BULK_OPERATIONS, help="Operation to apply to the selected nodes")
+    parser.add_argument("--node_names", type=str, required=False, help="Comma-separated list of node names to select")
+    parser.add_argument("--ip_addresses", type=str, required=False, help="Comma-separated list of IP addresses to select")
+    parser.add_argument("--cidr", type=str, required=False, help="Comma-separated list of networks to select, e.g. 10.20.30.0/24")
+    parser.add_argument("--select_file", type=str, required=False, help="File with one node name, IP address or CIDR per line")
+    parser.add_argument("--groups", type=str, required=False, help="Comma-separated list of groups to act on (default: all groups)")
+    parser.add_argument("--to_group", type=str, required=False, help="Destination group for move")
+    parser.add_argument("--tags", type=str, required=False, help="retag: replace the Rundeck tags of the selected nodes")
+    parser.add_argument("--add_tags", type=str, required=False, help="retag: comma-separated tags to add")
+    parser.add_argument("--remove_tags", type=str, required=False, help="retag: comma-separated tags to remove")
+    add_metrics_arguments(parser)
+    add_dry_run_arguments(parser)
+    add_journal_arguments(parser)
+    args = parser.parse_args()
+    metrics = RunMetrics("inventory_bulk")
+
+    if args.journal or args.journal_wait:
+        keys = ("op", "node_names", "ip_addresses", "cidr", "groups", "to_group", "tags", "add_tags", "remove_tags")
+        operation = {key: getattr(args, key) for key in keys if getattr(args, key) is not None}
+        if args.select_file:
+            # The journal may be applied after the file is gone: queue its content
+            with open(args.select_file, "r") as f:
+                operation["select"] = [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
+        sys.exit(0 if submit([operation], wait=args.journal_wait, source="inventory_bulk") else 1)
+
+    try:
+        run_bulk_operation(vars(args), metrics=metrics, dry_run=args.dry_run)
+    except (OSError, ValueError) as e:
+        print(f"❌ {args.op} failed: {e}")
+        sys.exit(1)
+
+    if args.metrics:
+        metrics.emit(args.metrics, args.metrics_textfile_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Send one inventory change to inventory_daemon.py, or apply it here when no daemon runs.
+
+    inventory_client.py add --infra_groupname MvmNode --access_method privatesshkey \\
+        --ssh_key_storage_path key/hobohobo --ip_addresses 192.168.1.1 --usernames user1 --node_names node-11
+    inventory_client.py patch --infra_groupname impacted_server --input impacted.csv
+    inventory_client.py patch --infra_groupname web --ip_range 10.0.0.0/28 --node_pattern web-{} --username ubuntu
+    inventory_client.py batch manifest.json
+
+"add" takes the options of generate_inventory_mutiple.py, "patch" those of
+generate_inventory_Patch.py and "batch" an inventory_batch.py manifest
+('-' for stdin). --dry_run, --skip_validation and --allow_conflicts work
+as in the scripts; --socket PATH picks the daemon and --no_daemon applies
+the change in this process (through inventory_api.py).
+
+Options are read by hand and only json and socket are imported before the
+request is sent: the heavy modules are only loaded for the in-process
+fallback.
+"""
+
+import json
+import os
+import socket
+import sys
+
+from inventory_api import SOCKET_PATH
+
+COMMANDS = ("add", "patch", "batch")
+FLAGS = ("dry_run", "skip_validation", "allow_conflicts", "no_daemon")
+OPTIONS = ("infra_groupname", "access_method", "ssh_key_storage_path", "ssh_password_storage_path",
+           "ip_addresses", "usernames", "node_names", "input", "input_format",
+           "ip_range", "node_pattern", "node_start", "username", "socket")
+
+
+def usage(message):
+    print(f"❌ {message}")
+    print(f"usage: {os.path.basename(sys.argv[0])} {{{','.join(COMMANDS)}}} [--option value ...] "
+          f"[{' '.join('--' + flag for flag in FLAGS)}]")
+    sys.exit(2)
+
+
+def parse_argv(argv):
+    """(command, manifest path, {option: value}) from argv, argparse-free."""
+    if not argv or argv[0] not in COMMANDS:
+        usage(f"expected one of {', '.join(COMMANDS)}")
+    command, options, manifest = argv[0], {}, None
+    rest = iter(argv[1:])
+    for arg in rest:
+        key, sep, value = arg[2:].partition("=") if arg.startswith("--") else (None, "", arg)
+        if key in FLAGS and not sep:
+            options[key] = True
+        elif key in OPTIONS:
+            options[key] = value if sep else next(rest, None)
+            if options[key] is None:
+                usage(f"--{key} needs a value")
+        elif key is None and command == "batch" and manifest is None:
+            manifest = value
+        else:
+            usage(f"unexpected argument {arg}")
+    if command == "batch" and manifest is None:
+        usage("batch needs a manifest file ('-' for stdin)")
+    if command != "batch" and not options.get("infra_groupname"):
+        usage(f"{command} needs --infra_groupname")
+    return command, manifest, options
+
+
+def build_operation(command, options):
+    """The inventory_batch.py operation the generator would apply with these options."""
+    operation = {"op": command, "group": options["infra_groupname"]}
+    if command == "add":
+        operation["access_method"] = options.get("access_method", "privatesshkey")
+        operation["ssh_key_storage_path"] = options.get("ssh_key_storage_path", "")
+        operation["ssh_password_storage_path"] = options.get("ssh_password_storage_path", "")
+    if options.get("ip_range"):
+        operation["nodes"] = {"ip_range": options["ip_range"], "node_pattern": options.get("node_pattern"),
+                              "node_start": int(options.get("node_start", 1)), "username": options.get("username")}
+    elif options.get("input") == "-":
+        # The daemon has no access to this stdin: send the records themselves
+        from inventory_input import iter_records
+        operation["nodes"] = [{key: value for key, value in record.items() if key != "_line"}
+                              for record in iter_records("-", options.get("input_format"))]
+    elif options.get("input"):
+        operation["input"] = os.path.abspath(options["input"])
+        if options.get("input_format"):
+            operation["input_format"] = options["input_format"]
+    elif options.get("ip_addresses"):
+        for key in ("ip_addresses", "usernames", "node_names"):
+            operation[key] = options.get(key, "")
+    else:
+        usage("give --ip_addresses/--usernames/--node_names, --input or --ip_range")
+    return operation
+
+
+def send(socket_path, request):
+    """The daemon's answer, or None if no daemon listens on socket_path."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            client.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with client.makefile("rb") as reply:
+            line = reply.readline()
+    finally:
+        client.close()
+    if not line:
+        return {"ok": False, "error": "the daemon closed the connection without answering"}
+    return json.loads(line)
+
+
+def apply_here(request):
+    from inventory_api import apply
+    from inventory_model import HOSTS_PATH, INVENTORY_PATH
+    try:
+        changes = apply(request["operations"], dry_run=request["dry_run"], validate=not request["skip_validation"],
+                        allow_conflicts=request["allow_conflicts"])
+    except (ValueError, KeyError, OSError) as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "hosts_path": HOSTS_PATH, "inventory_path": INVENTORY_PATH, **changes}
+
+
+def main():
+    command, manifest, options = parse_argv(sys.argv[1:])
+    if command == "batch":
+        try:
+            if manifest == "-":
+                operations = json.load(sys.stdin)
+            else:
+                with open(manifest, "r") as f:
+                    operations = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ Invalid manifest: {e}")
+            sys.exit(1)
+        operations = operations.get("operations") if isinstance(operations, dict) else operations
+        if not isinstance(operations, list):
+            print("❌ Invalid manifest: expected {\"operations\": [...]} or a list of operations")
+            sys.exit(1)
+        for operation in operations:
+            if isinstance(operation, dict) and operation.get("input") and operation["input"] != "-":
+                operation["input"] = os.path.abspath(operation["input"])
+    else:
+        try:
+            operations = [build_operation(command, options)]
+        except ValueError as e:
+            usage(str(e))
+    request = {"operations": operations, "dry_run": bool(options.get("dry_run")),
+               "skip_validation": bool(options.get("skip_validation")),
+               "allow_conflicts": bool(options.get("allow_conflicts"))}
+
+    socket_path = options.get("socket", SOCKET_PATH)
+    response = None if options.get("no_daemon") else send(socket_path, request)
+    if response is None:
+        if not options.get("no_daemon"):
+            print(f"ℹ️ No daemon on {socket_path}: applying in this process")
+        response = apply_here(request)
+    if not response["ok"]:
+        print(f"❌ {response['error']}")
+        sys.exit(1)
+
+    from inventory_diff import report_changes
+    dry_run = request["dry_run"]
+    print(f"{'🔎 Planned' if dry_run else '✅ Applied'} {len(operations)} operation(s)"
+          + (f" in {response['seconds'] * 1000:.1f} ms" if "seconds" in response else "") + ":")
+    report_changes(response["inventory_path"], response["xml_changes"], dry_run)
+    report_changes(response["hosts_path"], response["ini_changes"], dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Keep the inventory in memory and apply changes sent over a Unix socket.
+
+Starting a generator costs an interpreter, its imports and a parse of both
+files before the first line is changed. This daemon pays that once:
+
+    inventory_daemon.py                  # listens on /etc/ansible/.inventory.sock
+    inventory_client.py patch --infra_groupname impacted_server --ip_addresses 10.0.0.5 \\
+        --usernames ubuntu --node_names web-05
+
+Each connection sends one JSON line, {"operations": [...]} with
+inventory_batch.py operations and optionally "dry_run", "skip_validation"
+and "allow_conflicts", and gets one back: {"ok": true, "ini_changes": [...],
+"xml_changes": [...]} or {"ok": false, "error": "..."}.
+
+Requests are applied one at a time under the inventory lock. The hosts file
+is kept as an Inventory (only the groups a request touches get parsed),
+inventory.xml as its bytes, small changes are spliced into it, and the
+conflict index (inventory_validate.py) is kept up to date instead of being
+rebuilt. A file that something else rewrote is reloaded on the next request
+(inode, size and mtime are compared), so the generators, the journal and
+inventory_sync.py can still be used next to the daemon.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+from inventory_api import DEFAULT_XML_NODES, K8S_NODE_ATTRIBUTES, SOCKET_PATH
+from inventory_batch import XmlPlan, apply_operations, check_operations
+from inventory_journal import inventory_lock
+from inventory_metrics import RunMetrics
+from inventory_model import HOSTS_PATH, INVENTORY_PATH, Inventory, atomic_open
+from inventory_sync import _read, splice_nodes
+from inventory_validate import FleetIndex
+from inventory_xml import merge_nodes
+
+# More nodes than this are merged in one streaming rewrite instead of being spliced one by one
+SPLICE_LIMIT = 64
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class InventoryService:
+    """Both files and the conflict index as last written, and the changes applied to them."""
+
+    def __init__(self, hosts_path=HOSTS_PATH, inventory_path=INVENTORY_PATH, validate=True):
+        self.hosts_path = hosts_path
+        self.inventory_path = inventory_path
+        self.validate = validate
+        self.lock = threading.Lock()
+        self.forget()
+
+    # === Reading ===
+    def refresh(self, dry_run=False):
+        """Reload whatever changed on disk since it was last read or written."""
+        signature = _signature(self.hosts_path)
+        if signature != self.hosts_signature:
+            self.inventory, self.hosts_signature = None, signature
+            self.validator = None
+        if self.inventory is None:
+            self.inventory = Inventory.load(self.hosts_path, dry_run=dry_run)
+        if _signature(self.inventory_path) != self.xml_signature:
+            self.xml, self.xml_signature = _read(self.inventory_path)
+            self.validator = None
+        if self.validate and self.validator is None:
+            self.validator = FleetIndex().load(self.hosts_path, self.inventory_path, inventory=self.inventory)
+            # Kept for many requests: index everything now rather than during the first one
+            self.validator.index_deferred()
+
+    def forget(self):
+        """Drop the in-memory copies, e.g. after a change that was not written. Signatures are None for a missing file."""
+        self.inventory, self.hosts_signature = None, False
+        self.xml, self.xml_signature = b"", False
+        self.validator = None
+
+    # === Applying ===
+    def apply(self, operations, dry_run=False, validate=True, allow_conflicts=False):
+        """Apply inventory_batch.py operations and write both files once. Returns the changes."""
+        check_operations(operations)
+        with self.lock, inventory_lock(not dry_run):
+            self.refresh(dry_run)
+            validator = self.validator if validate else None
+            # Bulk operations and unchecked nodes leave the index behind the files: rebuild it next time
+            keeps_index = validator is not None and not any(
+                operation.get("skip_validation") or operation["op"] not in ("add", "patch", "k8s")
+                for operation in operations)
+            plan = XmlPlan()
+            try:
+                metrics = RunMetrics("inventory_daemon")
+                apply_operations(self.inventory, plan, operations, metrics, validator)
+                if validator is not None and validator.conflicts and not allow_conflicts:
+                    raise ValueError(f"{len(validator.conflicts)} conflict(s) in the new nodes, nothing was written:\n"
+                                     + "\n".join(f" - {message}" for message in validator.conflicts))
+                result = self._write(plan, dry_run=True) if dry_run else None
+            except BaseException:
+                self._discard(keeps_index)
+                raise
+            if dry_run:
+                self._discard(keeps_index)
+                return result
+            try:
+                result = self._write(plan, dry_run=False)
+            except BaseException:
+                self.forget()
+                raise
+            if keeps_index and not self.validator.conflicts:
+                self.validator.commit(os.path.basename(self.hosts_path))
+            else:
+                self.validator = None
+            return result
+
+    def _discard(self, keeps_index):
+        """Throw away changes that were not written: the hosts file is reloaded, the index keeps only the files."""
+        self.inventory = None
+        if keeps_index:
+            self.validator.rollback()
+        else:
+            self.validator = None
+
+    def _write(self, plan, dry_run):
+        if not dry_run:
+            os.makedirs(os.path.dirname(os.path.abspath(self.hosts_path)), exist_ok=True)
+        ini_changes = list(self.inventory.changes)
+        xml_changes = self._write_xml(plan, dry_run)
+        if not self.inventory.write_ini(self.hosts_path, dry_run=dry_run):
+            ini_changes = []
+        self.hosts_signature = _signature(self.hosts_path)
+        return {"ini_changes": ini_changes, "xml_changes": xml_changes,
+                "hosts_path": self.hosts_path, "inventory_path": self.inventory_path}
+
+    def _write_xml(self, plan, dry_run):
+        changes = []
+        if not plan and self.xml_signature is not None:
+            return changes
+        data = None
+        if self.xml_signature is not None and not plan.transforms and \
+                len(plan.replace) + len(plan.add_only) <= SPLICE_LIMIT:
+            data = splice_nodes(self.xml, plan.replace, (), add_only=plan.add_only, changes=changes, update=K8S_NODE_ATTRIBUTES)
+        if data is None:
+            # New file, bulk operation, many nodes or a hand-formatted file: one streaming rewrite
+            del changes[:]
+            merge_nodes(self.inventory_path, plan.replace, replace=True,
+                        default_nodes=DEFAULT_XML_NODES if plan.needs_default else (), add_only=plan.add_only,
+                        transform=plan.apply_transforms if plan.transforms else None, changes=changes, dry_run=dry_run,
+                        update=K8S_NODE_ATTRIBUTES)
+            if not dry_run:
+                self.xml, self.xml_signature = _read(self.inventory_path)
+        elif changes and not dry_run:
+            with atomic_open(self.inventory_path, "wb") as f:
+                f.write(data)
+            self.xml, self.xml_signature = data, _signature(self.inventory_path)
+        return changes
+
+
+# === Socket server ===
+class RequestHandler(socketserver.StreamRequestHandler):
+    timeout = 30
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # A connection that sends nothing, such as another daemon checking the socket
+            return
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+            operations = request.get("operations") if isinstance(request, dict) else None
+            if not isinstance(operations, list):
+                raise ValueError("expected {\"operations\": [...]}")
+            response = {"ok": True, **self.server.service.apply(
+                operations, dry_run=bool(request.get("dry_run")), validate=not request.get("skip_validation"),
+                allow_conflicts=bool(request.get("allow_conflicts")))}
+        except (ValueError, KeyError, OSError) as e:
+            response = {"ok": False, "error": str(e)}
+        except Exception as e:
+            traceback.print_exc()
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        response["seconds"] = round(time.perf_counter() - start, 6)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        if response["ok"]:
+            print(f"✅ {len(operations)} operation(s), {len(response['ini_changes'])} hosts and "
+                  f"{len(response['xml_changes'])} inventory.xml change(s) in {response['seconds'] * 1000:.1f} ms")
+        else:
+            print(f"❌ {response['error']}")
+
+
+class InventoryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, service):
+        self.service = service
+        if os.path.exists(socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                # Left behind by a daemon that did not shut down cleanly
+                os.unlink(socket_path)
+            else:
+                raise OSError(f"another daemon is already listening on {socket_path}")
+            finally:
+                probe.close()
+        umask = os.umask(0o117)  # rw for owner and group only: whoever can connect can rewrite the inventory
+        try:
+            super().__init__(socket_path, RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the inventory in memory and apply changes sent over a Unix socket.")
+    parser.add_argument("--socket", type=str, default=SOCKET_PATH, help="Unix socket to listen on")
+    parser.add_argument("--hosts_path", type=str, default=HOSTS_PATH)
+    parser.add_argument("--inventory_path", type=str, default=INVENTORY_PATH)
+    parser.add_argument("--skip_validation", action="store_true",
+                        help="Do not check new nodes against the inventory (no conflict index is kept)")
+    args = parser.parse_args()
+
+    service = InventoryService(args.hosts_path, args.inventory_path, validate=not args.skip_validation)
+    start = time.perf_counter()
+    with service.lock, inventory_lock():
+        service.refresh()
+    print(f"ℹ️ Loaded {args.hosts_path} and {args.inventory_path} in {time.perf_counter() - start:.2f}s")
+    try:
+        server = InventoryServer(args.socket, service)
+    except OSError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ Listening on {args.socket}")
+    # Stopped by systemd or kill: still remove the socket on the way out
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from collections import Counter
+
+SUMMARY_WORDS = {"+": "added", "~": "changed", "-": "removed"}
+
+
+def add_dry_run_arguments(parser):
+    parser.add_argument("--dry_run", action="store_true",
+                        help="Print what would change in the hosts file and inventory.xml without writing anything")
+
+
+def summarize(changes):
+    counts = Counter(change[0] for change in changes)
+    return ", ".join(f"{counts[op]} {word}" for op, word in SUMMARY_WORDS.items())
+
+
+def report_changes(path, changes, dry_run=False):
+    """Print the changes planned for one file: every line with dry_run, a one-line summary otherwise.
+
+    INI changes are (op, group, entry) from Inventory.changes, XML changes (op, name) from merge_nodes.
+    """
+    if not changes:
+        print(f"ℹ️ {path}: no changes{'' if dry_run else ', not rewritten'}")
+        return
+    if not dry_run:
+        print(f"✅ {path}: {summarize(changes)}")
+        return
+    print(f"🔎 {path}: {summarize(changes)} (dry run, not written)")
+    for change in changes:
+        if len(change) == 2:
+            print(f"  {change[0]} node {change[1]}")
+        elif change[2] is None:
+            print(f"  {change[0]} [{change[1]}]")
+        else:
+            print(f"  {change[0]} [{change[1]}] {change[2]}")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Ansible dynamic inventory backed by the generators' hosts file.
+
+    ansible-inventory -i inventory_dynamic.py --list
+    ansible-playbook -i inventory_dynamic.py site.yml
+
+--list includes _meta.hostvars so Ansible never calls --host per node. The
+JSON is cached next to the hosts file and only rebuilt when the hosts file
+changes (size, mtime and content hash). Variable values are typed the way
+Ansible's INI loader types them (22 is an int, True a bool), so --list gives
+the same variables as `ansible-inventory -i hosts --list`.
+"""
+
+import argparse
+import ast
+import json
+import os
+import shlex
+import sys
+
+from inventory_model import HOSTS_PATH, Inventory, atomic_open, content_digest, parse_host_line
+
+
+# Bumped when build_inventory's output changes, so older cached copies are rebuilt
+CACHE_FORMAT = 2
+
+
+def dynamic_cache_path(hosts_path):
+    return os.path.join(os.path.dirname(hosts_path), f".{os.path.basename(hosts_path)}.inventory.json")
+
+
+def parse_value(value):
+    """A variable value as Ansible's INI loader reads it: a Python literal if it is one, else the string."""
+    try:
+        parsed = ast.literal_eval(value)
+        json.dumps(parsed)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return value
+    return parsed
+
+
+def parse_host_vars(line):
+    """The typed variables of an INI host line, split with shell quoting as Ansible does."""
+    try:
+        parts = shlex.split(line, comments=True)
+    except ValueError:
+        parts = line.split()
+    host_vars = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition("=")
+        if sep:
+            host_vars[key] = parse_value(value)
+    return host_vars
+
+
+def build_inventory(inventory):
+    """Turn the INI model into Ansible's --list structure."""
+    result = {"_meta": {"hostvars": {}}, "all": {"children": ["ungrouped"]}, "ungrouped": {"hosts": []}}
+    hostvars = result["_meta"]["hostvars"]
+
+    for line in inventory.preamble.lines:
+        name, _ = parse_host_line(line)
+        if name is not None:
+            result["ungrouped"]["hosts"].append(name)
+            hostvars.setdefault(name, {}).update(parse_host_vars(line))
+
+    for group in inventory.groups.values():
+        name, _, kind = group.name.partition(":")
+        entry = result.setdefault(name, {})
+        if kind == "vars":
+            for line in group.lines:
+                if line is None or line.lstrip().startswith(("#", ";")):
+                    continue
+                key, sep, value = line.strip().partition("=")
+                if sep:
+                    entry.setdefault("vars", {})[key.strip()] = parse_value(value.strip())
+        elif kind == "children":
+            for line in group.lines:
+                child = line.split()[0] if line and line.strip() else None
+                if child and not child.startswith(("#", ";")):
+                    entry.setdefault("children", []).append(child)
+                    result.setdefault(child, {})
+        else:
+            hosts = entry.setdefault("hosts", [])
+            for host, position in group.hosts.items():
+                hosts.append(host)
+                hostvars.setdefault(host, {}).update(parse_host_vars(group.lines[position]))
+
+    child_groups = {c for entry in result.values() if isinstance(entry, dict) for c in entry.get("children", ())}
+    for name in result:
+        if name not in ("_meta", "all", "ungrouped") and name not in child_groups:
+            result["all"]["children"].append(name)
+    return result
+
+
+def load_dynamic_inventory(hosts_path=HOSTS_PATH):
+    """Return the --list JSON text, rebuilding the cached copy only if the hosts file changed."""
+    cache_path = dynamic_cache_path(hosts_path)
+    with open(hosts_path, "rb") as f:
+        data = f.read()
+        st = os.fstat(f.fileno())
+    fingerprint = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "digest": content_digest(data),
+                   "format": CACHE_FORMAT}
+
+    try:
+        with open(cache_path, "r") as f:
+            header = f.readline()
+            if json.loads(header) == fingerprint:
+                return f.read()
+    except (OSError, ValueError):
+        pass
+
+    body = json.dumps(build_inventory(Inventory.load(hosts_path)), separators=(",", ":"))
+    try:
+        with atomic_open(cache_path) as f:
+            f.write(json.dumps(fingerprint) + "\n")
+            f.write(body)
+    except OSError:
+        pass  # read-only inventory dir: serve without caching
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ansible dynamic inventory for the generated hosts file.")
+    parser.add_argument("--list", action="store_true", help="Print all groups and _meta.hostvars")
+    parser.add_argument("--host", type=str, help="Print the variables of a single host")
+    parser.add_argument("--hosts_path", type=str, default=HOSTS_PATH, help="INI hosts file to serve")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.hosts_path):
+        body = json.dumps({"_meta": {"hostvars": {}}})
+    else:
+        body = load_dynamic_inventory(args.hosts_path)
+
+    if args.host:
+        print(json.dumps(json.loads(body).get("_meta", {}).get("hostvars", {}).get(args.host, {})))
+    elif args.list:
+        sys.stdout.write(body + "\n")
+    else:
+        parser.error("one of --list or --host is required")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Probe nodes over SSH for the Rundeck osArch/osFamily/osName/osVersion attributes.
+
+Hosts are probed concurrently with asyncio (bounded by --probe_concurrency,
+each one limited to --probe_timeout seconds). Results are cached per host
+in /etc/ansible/.facts_cache.json for --probe_ttl seconds, so reruns only
+probe hosts that are new or whose facts expired.
+
+The generators take --probe_facts to fill the attributes of the nodes they
+add. On its own this script enriches the nodes already in inventory.xml:
+
+    inventory_facts.py --node_names node-11,node-12
+    inventory_facts.py --probe_command "python3 fake_probe.py {host}"
+
+--probe_command replaces ssh; it gets {host}, {user}, {name}, {key},
+{password_file} and {timeout} filled in and the probe script appended as
+its last argument, so a local stand-in can answer for the hosts.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import signal
+import sys
+import time
+
+from inventory_model import ANSIBLE_DIR, INVENTORY_PATH, atomic_open
+
+FACTS_CACHE_PATH = os.path.join(ANSIBLE_DIR, ".facts_cache.json")
+DEFAULT_CONCURRENCY = 32
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_TTL = 24 * 3600
+
+# Three uname lines, then /etc/os-release as KEY=VALUE lines
+PROBE_SCRIPT = "uname -m; uname -s; uname -r; cat /etc/os-release 2>/dev/null || true"
+
+FACT_ATTRIBUTES = ("osArch", "osFamily", "osName", "osVersion")
+
+
+def add_probe_arguments(parser):
+    parser.add_argument("--probe_facts", action="store_true",
+                        help="Probe new nodes over SSH and fill osArch/osFamily/osName/osVersion")
+    parser.add_argument("--probe_concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum number of hosts probed at the same time")
+    parser.add_argument("--probe_timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Seconds allowed per host")
+    parser.add_argument("--probe_ttl", type=int, default=DEFAULT_TTL,
+                        help=f"Seconds a host's cached facts stay valid ({FACTS_CACHE_PATH})")
+    parser.add_argument("--probe_command", type=str, required=False,
+                        help="Command template used instead of ssh, e.g. \"ssh -F ~/.ssh/rundeck {user}@{host}\"")
+
+
+def parse_probe_output(output):
+    """Turn the probe script's output into Rundeck attributes plus the distribution details."""
+    lines = output.splitlines()
+    if len(lines) < 3:
+        raise ValueError(f"unexpected probe output: {output.strip()[:200]!r}")
+    arch, kernel, release = (line.strip() for line in lines[:3])
+    os_release = {}
+    for line in lines[3:]:
+        key, sep, value = line.partition("=")
+        if sep and key.strip():
+            try:
+                os_release[key.strip()] = " ".join(shlex.split(value))
+            except ValueError:
+                os_release[key.strip()] = value.strip().strip("\"'")
+    return {
+        "osArch": arch,
+        "osFamily": "windows" if kernel.lower().startswith(("cygwin", "mingw", "msys", "windows")) else "unix",
+        "osName": os_release.get("NAME") or kernel,
+        "osVersion": os_release.get("VERSION_ID") or release,
+        "distribution": os_release.get("ID", "").lower(),
+        "distribution_like": os_release.get("ID_LIKE", "").lower(),
+        "kernel": kernel,
+        "kernel_release": release,
+    }
+
+
+def load_facts_cache(path=FACTS_CACHE_PATH):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_facts_cache(cache, path=FACTS_CACHE_PATH):
+    try:
+        with atomic_open(path) as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+    except OSError as e:
+        print(f"⚠️ Could not write facts cache {path}: {e}", file=sys.stderr)
+
+
+def cached_facts(host, cache=None, ttl=DEFAULT_TTL, path=FACTS_CACHE_PATH):
+    """Facts for a host from the cache, or None when missing or older than ttl."""
+    cache = load_facts_cache(path) if cache is None else cache
+    entry = cache.get(host)
+    if entry and time.time() - entry.get("probed", 0) <= ttl:
+        return entry["facts"]
+    return None
+
+
+# Fields a command template may use instead of ssh (see ssh_command)
+TEMPLATE_FIELDS = ("host", "user", "name", "key", "password_file", "timeout")
+
+
+def check_command_template(template):
+    """Raise ValueError if template does not split like a command or uses a field ssh_command does not fill in."""
+    try:
+        for token in shlex.split(template):
+            token.format(**{field: "" for field in TEMPLATE_FIELDS})
+    except KeyError as e:
+        raise ValueError(f"unknown field {{{e.args[0]}}} in {template!r} "
+                         f"(expected {', '.join('{' + field + '}' for field in TEMPLATE_FIELDS)})") from e
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"invalid command template {template!r}: {e}") from e
+
+
+def ssh_command(target, remote_command, timeout, template=None):
+    """argv running remote_command on target (dict with name, host, user, key, password_file).
+
+    template replaces ssh: its {host}, {user}, {name}, {key}, {password_file} and
+    {timeout} fields are filled in and remote_command is appended as the last argument.
+    """
+    # Rundeck key storage paths only double as local files when such a file exists
+    key = target.get("key") if target.get("key") and os.path.isfile(target["key"]) else ""
+    password_file = target.get("password_file") if target.get("password_file") and os.path.isfile(target["password_file"]) else ""
+    values = {"host": target["host"], "user": target.get("user") or "", "name": target["name"],
+              "key": key, "password_file": password_file, "timeout": int(timeout)}
+    if template:
+        return [token.format(**values) for token in shlex.split(template)] + [remote_command]
+    argv = ["ssh", "-o", f"ConnectTimeout={min(int(timeout), 30)}", "-o", "StrictHostKeyChecking=accept-new"]
+    if password_file:
+        argv = ["sshpass", "-f", password_file] + argv
+    else:
+        argv += ["-o", "BatchMode=yes"]
+    if key:
+        argv += ["-i", key]
+    destination = f"{values['user']}@{values['host']}" if values["user"] else values["host"]
+    return argv + [destination, remote_command]
+
+
+async def run_process(argv, timeout, input_data=None):
+    """Run argv with a timeout; returns (returncode, stdout, stderr), raises asyncio.TimeoutError."""
+    proc = await asyncio.create_subprocess_exec(
+        *argv, stdin=asyncio.subprocess.DEVNULL if input_data is None else asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True)
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(input_data), timeout)
+    except asyncio.TimeoutError:
+        # Kill the whole session: a ProxyCommand or wrapper child would keep the pipes open
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+        raise
+    return proc.returncode, stdout, stderr
+
+
+class FactProber:
+    """Concurrent SSH (or stand-in command) probes with a per-host timeout and a TTL cache."""
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, ttl=DEFAULT_TTL,
+                 command=None, cache_path=FACTS_CACHE_PATH):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.ttl = ttl
+        self.command = command
+        self.cache_path = cache_path
+        self.errors = {}
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(args.probe_concurrency, args.probe_timeout, args.probe_ttl, args.probe_command)
+
+    def build_command(self, target):
+        return ssh_command(target, PROBE_SCRIPT, self.timeout, self.command)
+
+    async def _probe_one(self, semaphore, target):
+        async with semaphore:
+            try:
+                returncode, stdout, stderr = await run_process(self.build_command(target), self.timeout)
+            except asyncio.TimeoutError:
+                self.errors[target["name"]] = f"timed out after {self.timeout:g}s"
+                return target, None
+            except OSError as e:
+                self.errors[target["name"]] = str(e)
+                return target, None
+            if returncode != 0:
+                self.errors[target["name"]] = stderr.decode("utf-8", "replace").strip()[:200] or f"exit {returncode}"
+                return target, None
+            try:
+                return target, parse_probe_output(stdout.decode("utf-8", "replace"))
+            except ValueError as e:
+                self.errors[target["name"]] = str(e)
+                return target, None
+
+    async def _probe_all(self, targets):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self._probe_one(semaphore, target) for target in targets))
+
+    def probe(self, targets, refresh=False):
+        """Return {name: facts} for targets (dicts with name, host, user, key, password_file).
+
+        Hosts with fresh cached facts are not contacted unless refresh is set.
+        Hosts that fail are left out and listed in self.errors.
+        """
+        cache = load_facts_cache(self.cache_path)
+        results, pending = {}, []
+        for target in targets:
+            facts = None if refresh else cached_facts(target["host"], cache, self.ttl)
+            if facts is not None:
+                results[target["name"]] = facts
+            else:
+                pending.append(target)
+
+        if pending:
+            start = time.perf_counter()
+            now = time.time()
+            for target, facts in asyncio.run(self._probe_all(pending)):
+                if facts is not None:
+                    results[target["name"]] = facts
+                    cache[target["host"]] = {"probed": now, "facts": facts}
+            save_facts_cache(cache, self.cache_path)
+            print(f"🔎 Probed {len(pending)} host(s) in {time.perf_counter() - start:.1f}s "
+                  f"({len(pending) - len(self.errors)} ok, {len(self.errors)} failed, "
+                  f"{len(targets) - len(pending)} from cache)")
+            for name, error in sorted(self.errors.items()):
+                print(f"⚠️ Could not probe {name}: {error}")
+        return results
+
+
+def apply_facts(attrs, facts):
+    """Copy the Rundeck OS attributes into a node's attributes, keeping its attribute order."""
+    for key in FACT_ATTRIBUTES:
+        if facts.get(key):
+            attrs[key] = facts[key]
+    return attrs
+
+
+def known_node_names(inventory_path):
+    """Names of the nodes already in a Rundeck resource file (from its node index when fresh)."""
+    if not os.path.exists(inventory_path):
+        return set()
+    from inventory_xml import read_node_index
+    known = read_node_index(inventory_path)
+    if known is None:
+        from inventory_model import load_xml_index
+        known = load_xml_index(inventory_path)
+    return set(known)
+
+
+def probe_nodes(prober, xml_nodes, key_path=None, password_path=None, only=None):
+    """Probe the nodes of a generator run (name -> attributes) and fill their OS attributes in place."""
+    targets = [
+        {"name": name, "host": attrs["hostname"], "user": attrs.get("username"),
+         "key": key_path, "password_file": password_path}
+        for name, attrs in xml_nodes.items() if attrs.get("hostname") and (only is None or name in only)
+    ]
+    for name, facts in prober.probe(targets).items():
+        apply_facts(xml_nodes[name], facts)
+    return xml_nodes
+
+
+def main():
+    from inventory_bulk import NodeSelector, split_list
+    from inventory_journal import inventory_lock
+    from inventory_xml import filter_nodes, iter_nodes
+
+    parser = argparse.ArgumentParser(description="Fill the OS attributes of the nodes in inventory.xml by probing them over SSH.")
+    parser.add_argument("--node_names", type=str, required=False, help="Comma-separated list of node names to probe (default: all)")
+    parser.add_argument("--ip_addresses", type=str, required=False, help="Comma-separated list of IP addresses to probe")
+    parser.add_argument("--cidr", type=str, required=False, help="Comma-separated list of networks to probe")
+    parser.add_argument("--ssh_key_storage_path", type=str, required=False, help="Local private key file used for the probes")
+    parser.add_argument("--ssh_password_storage_path", type=str, required=False, help="Local password file used with sshpass")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached facts")
+    parser.add_argument("--inventory_path", type=str, default=INVENTORY_PATH, help="Rundeck inventory.xml to update")
+    add_probe_arguments(parser)
+    args = parser.parse_args()
+
+    selector = NodeSelector(split_list(args.node_names), split_list(args.ip_addresses), split_list(args.cidr))
+    if not os.path.exists(args.inventory_path):
+        print(f"❌ ERROR: {args.inventory_path} does not exist.")
+        sys.exit(1)
+
+    targets = []
+    for elem in iter_nodes(args.inventory_path):
+        name, host = elem.get("name"), elem.get("hostname")
+        if elem.tag != "node" or not name or not host or host == "localhost":
+            continue
+        if selector and not selector.matches(name, host):
+            continue
+        targets.append({"name": name, "host": host, "user": elem.get("username"),
+                        "key": args.ssh_key_storage_path or elem.get("ssh-key-storage-path") or elem.get("ssh-keypath"),
+                        "password_file": args.ssh_password_storage_path or elem.get("ssh-password-storage-path")})
+
+    facts = FactProber.from_args(args).probe(targets, refresh=args.refresh)
+    with inventory_lock():
+        _, changed = filter_nodes(args.inventory_path,
+                                  lambda attrs: apply_facts(attrs, facts[attrs["name"]]) if attrs.get("name") in facts else attrs)
+    print(f"✅ {len(facts)} node(s) with facts, {changed} updated in {args.inventory_path}")
+
+
+if __name__ == "__main__":
+    main()
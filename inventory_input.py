@@ -0,0 +1,220 @@
+import csv
+import ipaddress
+import json
+import re
+import sys
+from itertools import islice
+
+DEFAULT_CHUNK_SIZE = 1000
+
+FIELD_ALIASES = {
+    "ip": ("ip", "ip_address", "ansible_host", "hostname"),
+    "username": ("username", "user", "ansible_user"),
+    "node_name": ("node_name", "name", "node"),
+    "role": ("role",),
+}
+
+HOSTNAME_RE = re.compile(r"^(?=.{1,253}$)[A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?(\.[A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?)*$")
+TOKEN_RE = re.compile(r"^[^\s,\[\]=\"'<>&]+$")
+# Characters XML 1.0 cannot carry at all, not even escaped
+XML_UNSAFE_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+def add_input_arguments(parser):
+    parser.add_argument("--input", type=str, required=False,
+                        help="Read node records from a CSV/JSONL file ('-' for stdin) instead of comma-separated lists")
+    parser.add_argument("--input_format", type=str, choices=["csv", "jsonl"], required=False,
+                        help="Format of --input (default: guessed from the file extension, csv for stdin)")
+    parser.add_argument("--chunk_size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Number of records processed per chunk")
+
+
+def check_input_argument(parser, args):
+    """Fail through parser.error() on an --input file that cannot be read, before anything is locked or loaded."""
+    if args.input and args.input != "-":
+        try:
+            with open(args.input, "rb"):
+                pass
+        except OSError as e:
+            parser.error(f"--input {args.input}: {e.strerror}")
+
+
+def normalize(raw):
+    record = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            value = raw.get(alias)
+            if value not in (None, ""):
+                record[field] = str(value).strip()
+                break
+    return record
+
+
+def iter_records(source, input_format=None):
+    """Yield one normalized record per CSV row / JSON line, without reading the whole input."""
+    if input_format is None:
+        input_format = "jsonl" if source.endswith((".jsonl", ".json", ".ndjson")) else "csv"
+    stream = sys.stdin if source == "-" else open(source, "r", newline="")
+    try:
+        if input_format == "csv":
+            for line_no, row in enumerate(csv.DictReader(stream), start=2):
+                record = normalize(row)
+                record["_line"] = line_no
+                yield record
+        else:
+            for line_no, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    raw = json.loads(line)
+                except ValueError as e:
+                    yield {"_line": line_no, "_error": f"invalid JSON ({e})"}
+                    continue
+                if not isinstance(raw, dict):
+                    yield {"_line": line_no, "_error": "expected a JSON object"}
+                    continue
+                record = normalize(raw)
+                record["_line"] = line_no
+                yield record
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def iter_list_records(ip_addresses, usernames, node_names, role=None):
+    for ip, user, node in zip(ip_addresses, usernames, node_names):
+        record = {"ip": ip, "username": user, "node_name": node}
+        if role:
+            record["role"] = role
+        yield record
+
+
+def add_range_arguments(parser, suffix=""):
+    """--ip_range/--node_pattern/--node_start/--username, for one side when suffix is given (e.g. _K8S_Master)."""
+    parser.add_argument(f"--ip_range{suffix}", type=str, required=False,
+                        help="IP addresses as a CIDR (10.0.0.0/22: its usable addresses), a range (10.0.0.10-10.0.0.99 "
+                             "or 10.0.0.10-99), or a comma-separated mix of those")
+    parser.add_argument(f"--node_pattern{suffix}", type=str, required=False,
+                        help="Node name template for --ip_range, filled with a running number and {ip}, e.g. worker-{:04d}")
+    parser.add_argument(f"--node_start{suffix}", type=int, default=1, help="First number of --node_pattern")
+    parser.add_argument(f"--username{suffix}", type=str, required=False, help="Username of every node of --ip_range")
+
+
+def parse_ip_range(spec):
+    """Check an --ip_range spec and turn it into (first, last, version) integer ranges, without expanding it."""
+    ranges = []
+    for part in (part.strip() for part in spec.split(",")):
+        if not part:
+            continue
+        if "/" in part:
+            network = ipaddress.ip_network(part, strict=False)
+            first, last = int(network.network_address), int(network.broadcast_address)
+            # Same addresses as network.hosts(): no network/broadcast address below /31 (/127)
+            if network.num_addresses > 2:
+                first, last = first + 1, last - (network.version == 4)
+            ranges.append((first, last, network.version))
+        elif "-" in part:
+            start, end = (value.strip() for value in part.split("-", 1))
+            first = ipaddress.ip_address(start)
+            if first.version == 4 and end.isdigit():
+                end = start.rsplit(".", 1)[0] + "." + end
+            last = ipaddress.ip_address(end)
+            if last.version != first.version or last < first:
+                raise ValueError(f"invalid IP range '{part}'")
+            ranges.append((int(first), int(last), first.version))
+        else:
+            address = ipaddress.ip_address(part)
+            ranges.append((int(address), int(address), address.version))
+    if not ranges:
+        raise ValueError(f"empty IP range '{spec}'")
+    return ranges
+
+
+def iter_ip_range(ranges):
+    factories = {4: ipaddress.IPv4Address, 6: ipaddress.IPv6Address}
+    for first, last, version in ranges:
+        for value in range(first, last + 1):
+            yield str(factories[version](value))
+
+
+def range_spec(args, suffix=""):
+    """The --ip_range{suffix} options as a dict (as kept in a journal or manifest), or None if not given."""
+    ip_range = getattr(args, f"ip_range{suffix}", None)
+    if not ip_range:
+        return None
+    spec = {"ip_range": ip_range, "node_pattern": getattr(args, f"node_pattern{suffix}"),
+            "node_start": getattr(args, f"node_start{suffix}"), "username": getattr(args, f"username{suffix}")}
+    check_range_spec(spec, suffix)
+    return spec
+
+
+def check_range_spec(spec, suffix=""):
+    """Raise ValueError for a range spec that cannot be expanded, before anything is written."""
+    if not spec.get("node_pattern") or not spec.get("username"):
+        raise ValueError(f"--ip_range{suffix} needs --node_pattern{suffix} and --username{suffix}")
+    ranges = parse_ip_range(spec["ip_range"])
+    try:
+        names = {spec["node_pattern"].format(index, ip="ip") for index in (1, 2)}
+    except (IndexError, KeyError, ValueError) as e:
+        raise ValueError(f"invalid --node_pattern{suffix} '{spec['node_pattern']}': {e}")
+    if len(names) == 1 and "{ip" not in spec["node_pattern"]:
+        raise ValueError(f"--node_pattern{suffix} '{spec['node_pattern']}' gives every node the same name")
+    return ranges
+
+
+def iter_range_records(spec, role=None):
+    """Yield one record per address of the spec, named from its pattern; nothing is built up front."""
+    pattern, username = spec["node_pattern"], spec["username"]
+    for index, ip in enumerate(iter_ip_range(parse_ip_range(spec["ip_range"])), spec.get("node_start", 1)):
+        record = {"ip": ip, "username": username, "node_name": pattern.format(index, ip=ip)}
+        if role:
+            record["role"] = role
+        yield record
+
+
+def validate_record(record, roles=None):
+    """Return an error message for a record that must not be written, or None."""
+    if "_error" in record:
+        return record["_error"]
+    for field in ("ip", "username", "node_name"):
+        if not record.get(field):
+            return f"missing {field}"
+    for field in ("ip", "username", "node_name"):
+        if XML_UNSAFE_RE.search(record[field]):
+            return f"XML-unsafe character in {field} {record[field]!r}"
+    ip = record["ip"]
+    try:
+        ipaddress.ip_address(ip)
+    except ValueError:
+        if not HOSTNAME_RE.match(ip):
+            return f"invalid IP address or hostname '{ip}'"
+    for field in ("username", "node_name"):
+        if not TOKEN_RE.match(record[field]):
+            return f"invalid characters in {field} '{record[field]}'"
+    if roles is not None and record.get("role") not in roles:
+        return f"role must be one of {', '.join(sorted(roles))}"
+    return None
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_valid_chunks(records, chunk_size=DEFAULT_CHUNK_SIZE, roles=None):
+    """Validate records and yield them in lists of at most chunk_size, skipping bad ones."""
+    for chunk in chunked(records, max(1, chunk_size)):
+        valid = []
+        for record in chunk:
+            error = validate_record(record, roles)
+            if error:
+                where = f"line {record['_line']}" if "_line" in record else record.get("node_name", "?")
+                print(f"⚠️ Skipping record ({where}): {error}")
+                continue
+            valid.append(record)
+        if valid:
+            yield valid
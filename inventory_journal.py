@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Inventory lock and write-ahead journal for concurrent generator runs.
+
+Every run that rewrites hosts/inventory.xml holds an exclusive flock on
+/etc/ansible/.inventory.lock, so parallel jobs can no longer lose each
+other's entries.
+
+With --journal a generator does not wait for that lock: it appends its
+change (an inventory_batch.py operation) to /etc/ansible/.journal and
+returns. Whoever holds the lock applies every queued change in a single
+rewrite when it is done, and checks the journal again after releasing it,
+so no queued change is left behind. --journal_wait queues the change too,
+but blocks until it has been applied.
+
+    inventory_journal.py --status
+    inventory_journal.py --drain
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from inventory_input import iter_valid_chunks
+from inventory_model import ANSIBLE_DIR, atomic_open
+
+LOCK_PATH = os.path.join(ANSIBLE_DIR, ".inventory.lock")
+JOURNAL_DIR = os.path.join(ANSIBLE_DIR, ".journal")
+FAILED_DIR = os.path.join(JOURNAL_DIR, "failed")
+
+# flock is per open file: nested inventory_lock() calls in one process must not lock again
+_lock_depth = [0]
+
+
+def add_journal_arguments(parser):
+    parser.add_argument("--journal", action="store_true",
+                        help="Queue the change in the inventory journal and return at once; "
+                             "the job holding the inventory lock applies all queued changes in one rewrite")
+    parser.add_argument("--journal_wait", action="store_true",
+                        help="Like --journal, but wait until the queued changes have been applied")
+
+
+def _acquire(block):
+    os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+    fd = os.open(LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | (0 if block else fcntl.LOCK_NB))
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    _lock_depth[0] = 1
+    return fd
+
+
+def _release(fd):
+    _lock_depth[0] = 0
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+@contextmanager
+def inventory_lock(enabled=True):
+    """Hold the inventory lock for a read-modify-write; reentrant within a process.
+
+    The outermost holder applies the changes queued in the journal while it held the lock.
+    """
+    if not enabled or _lock_depth[0]:
+        yield
+        return
+    fd = _acquire(block=True)
+    try:
+        yield
+    finally:
+        _release(fd)
+    drain_journal()
+
+
+def pending_entries():
+    try:
+        names = os.listdir(JOURNAL_DIR)
+    except FileNotFoundError:
+        return []
+    # Entries are renamed into place complete; ".tmp-*" files are still being written
+    return [os.path.join(JOURNAL_DIR, name) for name in sorted(names)
+            if name.endswith(".json") and not name.startswith(".")]
+
+
+def _move_to_failed(path, error):
+    os.makedirs(FAILED_DIR, exist_ok=True)
+    print(f"❌ Journal entry {os.path.basename(path)} failed ({error}), moved to {FAILED_DIR}", file=sys.stderr)
+    os.replace(path, os.path.join(FAILED_DIR, os.path.basename(path)))
+
+
+def _apply_entries(paths):
+    """Apply journal entries in one rewrite; fall back to one by one if the batch fails. Returns the count applied."""
+    from inventory_batch import apply_manifest
+    from inventory_validate import FleetIndex
+
+    entries = []
+    for path in paths:
+        try:
+            with open(path, "r") as f:
+                entries.append((path, json.load(f)["operations"]))
+        except (OSError, ValueError, KeyError) as e:
+            _move_to_failed(path, e)
+    if not entries:
+        return 0
+
+    try:
+        apply_manifest([operation for _, operations in entries for operation in operations], validator=FleetIndex())
+    except Exception:
+        applied = 0
+        for path, operations in entries:
+            try:
+                apply_manifest(operations, validator=FleetIndex())
+            except Exception as e:
+                _move_to_failed(path, e)
+                continue
+            os.unlink(path)
+            applied += 1
+        return applied
+    for path, _ in entries:
+        os.unlink(path)
+    return len(entries)
+
+
+def drain_journal(block=False):
+    """Apply every queued change if the lock is free (or, with block, once it is). Returns the entries applied."""
+    applied = 0
+    while pending_entries():
+        fd = _acquire(block)
+        if fd is None:
+            break  # the holder drains again after it releases the lock
+        try:
+            applied += _apply_entries(pending_entries())
+        finally:
+            _release(fd)
+        block = False
+    return applied
+
+
+def submit(operations, wait=False, source=None):
+    """Queue operations in the journal, then apply the queue unless another job holds the lock.
+
+    Returns True once the change is applied or handed over to the lock holder.
+    """
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    name = f"{time.time_ns():020d}-{os.getpid()}-{os.urandom(4).hex()}.json"
+    path = os.path.join(JOURNAL_DIR, name)
+    with atomic_open(path) as f:
+        json.dump({"source": source, "submitted": time.time(), "operations": operations}, f)
+
+    applied = drain_journal(block=wait)
+    if os.path.exists(path):
+        print(f"✅ Queued {name}: the job holding {LOCK_PATH} will apply it")
+        return True
+    if os.path.exists(os.path.join(FAILED_DIR, name)):
+        return False
+    print(f"✅ Applied {applied} queued change(s) in one rewrite" if applied else f"✅ {name} applied")
+    return True
+
+
+def journal_records(records):
+    """Validated records as plain dicts for a journal operation."""
+    return [{key: value for key, value in record.items() if not key.startswith("_")}
+            for chunk in iter_valid_chunks(records) for record in chunk]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or apply the queued inventory changes.")
+    parser.add_argument("--drain", action="store_true", help="Wait for the inventory lock and apply every queued change")
+    parser.add_argument("--status", action="store_true", help="Print the queued and failed journal entries")
+    args = parser.parse_args()
+
+    if args.drain:
+        print(f"✅ Applied {drain_journal(block=True)} queued change(s)")
+    elif args.status:
+        print(json.dumps({
+            "pending": [os.path.basename(path) for path in pending_entries()],
+            "failed": sorted(os.listdir(FAILED_DIR)) if os.path.isdir(FAILED_DIR) else [],
+        }, indent=2))
+    else:
+        parser.error("one of --drain or --status is required")
+
+
+if __name__ == "__main__":
+    # Run the imported module so inventory_batch sees the same lock state
+    from inventory_journal import main
+    main()
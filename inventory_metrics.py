@@ -0,0 +1,118 @@
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+from inventory_model import IO_STATS, atomic_open
+
+TEXTFILE_DIR = "/var/lib/node_exporter/textfile_collector"
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics", type=str, required=False, nargs="?", const="-",
+                        help="Write a JSON run summary (phase timings, counts, bytes, peak memory) to this file, '-' for stdout")
+    parser.add_argument("--metrics_textfile_dir", type=str, default=TEXTFILE_DIR,
+                        help="node_exporter textfile collector directory for the Prometheus metrics written with --metrics")
+
+
+def read_proc_io():
+    """Bytes read/written by this process through syscalls (Linux /proc), zeros elsewhere."""
+    counters = {"rchar": 0, "wchar": 0}
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in counters:
+                    counters[key] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+class RunMetrics:
+    """Per-phase timings and counters for one generator run."""
+
+    def __init__(self, script):
+        self.script = script
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._io_start = read_proc_io()
+        self._fsync_start = dict(IO_STATS)
+        self.phases = {}
+        self.counts = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def set(self, name, value):
+        self.counts[name] = value
+
+    def summary(self):
+        io = read_proc_io()
+        phases = {name: round(seconds, 6) for name, seconds in self.phases.items()}
+        phases["fsync"] = round(IO_STATS["fsync_seconds"] - self._fsync_start["fsync_seconds"], 6)
+        return {
+            "script": self.script,
+            "timestamp": round(self.started, 3),
+            "duration_seconds": round(time.perf_counter() - self._start, 6),
+            "phases_seconds": phases,
+            "counts": dict(self.counts),
+            "bytes_read": io["rchar"] - self._io_start["rchar"],
+            "bytes_written": io["wchar"] - self._io_start["wchar"],
+            "fsync_calls": IO_STATS["fsync_calls"] - self._fsync_start["fsync_calls"],
+            # ru_maxrss is in KiB on Linux
+            "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        }
+
+    def to_prometheus(self, summary):
+        label = f'script="{self.script}"'
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{{{labels}}} {value}")
+
+        metric("inventory_run_duration_seconds", "Wall time of the last inventory run.",
+               [(label, summary["duration_seconds"])])
+        metric("inventory_run_phase_seconds", "Time spent per phase in the last inventory run.",
+               [(f'{label},phase="{phase}"', seconds) for phase, seconds in summary["phases_seconds"].items()])
+        metric("inventory_run_count", "Node and group counts of the last inventory run.",
+               [(f'{label},kind="{kind}"', value) for kind, value in summary["counts"].items()])
+        metric("inventory_run_bytes_read", "Bytes read by the last inventory run.", [(label, summary["bytes_read"])])
+        metric("inventory_run_bytes_written", "Bytes written by the last inventory run.",
+               [(label, summary["bytes_written"])])
+        metric("inventory_run_peak_rss_bytes", "Peak resident memory of the last inventory run.",
+               [(label, summary["peak_rss_bytes"])])
+        metric("inventory_run_last_timestamp_seconds", "Start time of the last inventory run.",
+               [(label, summary["timestamp"])])
+        return "\n".join(lines) + "\n"
+
+    def emit(self, json_path="-", textfile_dir=TEXTFILE_DIR):
+        summary = self.summary()
+        body = json.dumps(summary, indent=2)
+        if json_path == "-":
+            print(body)
+        else:
+            with open(json_path, "w") as f:
+                f.write(body + "\n")
+        if textfile_dir:
+            try:
+                os.makedirs(textfile_dir, exist_ok=True)
+                # node_exporter only reads *.prom, and needs the file replaced atomically
+                with atomic_open(os.path.join(textfile_dir, f"inventory_{self.script}.prom")) as f:
+                    f.write(self.to_prometheus(summary))
+            except OSError as e:
+                print(f"⚠️ Could not write Prometheus textfile in {textfile_dir}: {e}", file=sys.stderr)
+        return summary
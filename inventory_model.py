@@ -0,0 +1,527 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from xml.etree.ElementTree import iterparse
+
+# INVENTORY_ANSIBLE_DIR points the generators at another root (benchmarks, dry runs)
+ANSIBLE_DIR = os.environ.get("INVENTORY_ANSIBLE_DIR", "/etc/ansible")
+HOSTS_PATH = os.path.join(ANSIBLE_DIR, "hosts")
+INVENTORY_PATH = os.path.join(ANSIBLE_DIR, "inventory.xml")
+
+INDEX_CACHE_VERSION = 1
+SECTION_RE = re.compile(r"^[^\S\n]*\[(.*)\][^\S\n]*$", re.M)
+
+# Cumulative fsync cost of atomic_open, reported by inventory_metrics
+IO_STATS = {"fsync_seconds": 0.0, "fsync_calls": 0}
+
+
+def parse_host_line(line):
+    """Split an INI host line into (name, vars). Returns (None, {}) for blanks and comments."""
+    parts = line.split()
+    if not parts or parts[0].startswith(("#", ";")):
+        return None, {}
+    host_vars = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition("=")
+        if sep:
+            host_vars[key] = value
+    return parts[0], host_vars
+
+
+def format_host_line(name, ip, user):
+    return f"{name} ansible_host={ip} ansible_user={user}"
+
+
+class Host:
+    __slots__ = ("name", "vars", "groups")
+
+    def __init__(self, name):
+        self.name = name
+        self.vars = {}
+        self.groups = []
+
+
+class Group:
+    """One INI section: raw lines kept verbatim plus an index of host name -> line position.
+
+    A section loaded from disk keeps its text as-is and is only split into
+    lines the first time something reads or changes it.
+    """
+
+    def __init__(self, name, header=None, body=""):
+        self.name = name
+        self.header = header
+        self.inventory = None
+        self._body = body
+        self._lines = []
+        self._trailer = []  # blank lines / comments after the last entry
+        self._hosts = {}
+        self._shadowed = {}  # earlier duplicate lines for a host name
+
+    @property
+    def is_host_section(self):
+        return self.name is not None and ":" not in self.name
+
+    @property
+    def parsed(self):
+        return self._body is None
+
+    @property
+    def lines(self):
+        if self._body is not None:
+            self._parse()
+        return self._lines
+
+    @property
+    def trailer(self):
+        if self._body is not None:
+            self._parse()
+        return self._trailer
+
+    @trailer.setter
+    def trailer(self, value):
+        self._trailer = value
+
+    @property
+    def hosts(self):
+        if self._body is not None:
+            self._parse()
+        return self._hosts
+
+    @property
+    def shadowed(self):
+        if self._body is not None:
+            self._parse()
+        return self._shadowed
+
+    def _parse(self):
+        body, self._body = self._body, None
+        lines = body.split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        pending = []
+        for line in lines:
+            line += "\n"
+            stripped = line.strip()
+            if not stripped or stripped.startswith(("#", ";")):
+                pending.append(line)
+                continue
+            self._lines.extend(pending)
+            pending = []
+            self._lines.append(line)
+            if self.is_host_section:
+                name, host_vars = parse_host_line(stripped)
+                self.inventory._index(self, name, host_vars, len(self._lines) - 1)
+        self._trailer.extend(pending)
+
+    def render(self):
+        out = [self.header] if self.header is not None else []
+        if self._body is not None:
+            out.append(self._body)
+        else:
+            out.extend(line for line in self._lines if line is not None)
+            out.extend(self._trailer)
+        return out
+
+
+class Inventory:
+    """Indexed view of /etc/ansible/hosts (and the node names in inventory.xml).
+
+    Groups are kept in file order with their raw lines, so an unchanged
+    inventory renders back byte for byte. Lookups by node name, by
+    ansible_host and by group name are dict hits instead of file scans.
+
+    Section boundaries are remembered in a sidecar index next to the hosts
+    file (see read_index_cache), so a run that touches one group only
+    parses that group; the node indexes are built on first use.
+    """
+
+    def __init__(self):
+        self.preamble = self._attach(Group(None))
+        self.groups = {}
+        self._nodes = None
+        self._by_address = None
+        self.xml_nodes = {}
+        self._last = self.preamble
+        self.source_path = None
+        self.source_digest = None
+        self.changes = []  # (op, group, entry) with op "+", "~" or "-", in the order applied
+
+    def _attach(self, group):
+        group.inventory = self
+        return group
+
+    # === Loading ===
+    @classmethod
+    def load(cls, hosts_path=HOSTS_PATH, inventory_path=None, use_cache=True, dry_run=False):
+        """Parse hosts_path; with dry_run the index cache is still read but never written."""
+        inventory = cls()
+        if hosts_path and os.path.exists(hosts_path):
+            with open(hosts_path, "rb") as f:
+                data = f.read()
+                st = os.fstat(f.fileno())
+            text = normalize_text(data.decode("utf-8"))
+            digest = content_digest(data)
+            sections = read_index_cache(hosts_path, st, digest) if use_cache else None
+            if sections is None:
+                sections = split_sections(text)
+                if use_cache and not dry_run:
+                    write_index_cache(hosts_path, st, digest, sections)
+            inventory._load_sections(text, sections)
+            inventory.source_path = os.path.abspath(hosts_path)
+            inventory.source_digest = digest
+        if inventory_path and os.path.exists(inventory_path):
+            inventory.xml_nodes = load_xml_index(inventory_path)
+        return inventory
+
+    def parse_ini(self, lines):
+        text = normalize_text("".join(lines))
+        self._load_sections(text, split_sections(text))
+
+    def _load_sections(self, text, sections):
+        start, end = sections["preamble"]
+        self.preamble = self._attach(Group(None, None, text[start:end]))
+        self._last = self.preamble
+        for name, header, ranges in sections["sections"]:
+            body = "".join(text[start:end] for start, end in ranges)
+            group = self._attach(Group(name, header, body))
+            self.groups[name] = group
+            self._last = group
+
+    # === Indexes ===
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._build_indexes()
+        return self._nodes
+
+    @property
+    def by_address(self):
+        if self._by_address is None:
+            self._build_indexes()
+        return self._by_address
+
+    def _build_indexes(self):
+        self._nodes, self._by_address = {}, {}
+        for group in self.groups.values():
+            if not group.parsed:
+                group._parse()
+                continue
+            for name, position in group.hosts.items():
+                _, host_vars = parse_host_line(group.lines[position])
+                self._register(group, name, host_vars)
+
+    def _index(self, group, name, host_vars, position):
+        old = group.hosts.get(name)
+        if old is not None and group.lines[old] is not None:
+            if self._nodes is not None:
+                _, old_vars = parse_host_line(group.lines[old])
+                self._unindex_address(group, name, old_vars)
+            if old != position:
+                group.shadowed.setdefault(name, []).append(old)
+        group.hosts[name] = position
+        if self._nodes is not None:
+            self._register(group, name, host_vars)
+
+    def _register(self, group, name, host_vars):
+        host = self._nodes.get(name)
+        if host is None:
+            host = self._nodes[name] = Host(name)
+        host.vars = host_vars
+        if group.name not in host.groups:
+            host.groups.append(group.name)
+        address = host_vars.get("ansible_host")
+        if address:
+            self._by_address.setdefault(address, set()).add((group.name, name))
+
+    def _unindex_address(self, group, name, host_vars):
+        address = host_vars.get("ansible_host")
+        members = self._by_address.get(address)
+        if members:
+            members.discard((group.name, name))
+            if not members:
+                del self._by_address[address]
+
+    # === Queries ===
+    def has_group(self, name):
+        return name in self.groups
+
+    def get_entry(self, group_name, node_name):
+        group = self.groups.get(group_name)
+        if group is None:
+            return None
+        position = group.hosts.get(node_name)
+        if position is None:
+            return None
+        line = group.lines[position]
+        return line.strip() if line is not None else None
+
+    def names_at(self, address):
+        return {name for _, name in self.by_address.get(address, ())}
+
+    def has_xml_node(self, name):
+        return name in self.xml_nodes
+
+    # === Mutation ===
+    def add_group(self, name, blank_line=True):
+        group = self.groups.get(name)
+        if group is not None:
+            return group
+        if blank_line:
+            self._last.trailer.append("\n")
+        group = self._attach(Group(name, f"[{name}]\n"))
+        self.groups[name] = group
+        self._last = group
+        self.changes.append(("+", name, None))
+        return group
+
+    def add_host(self, group_name, entry):
+        """Append an entry to a group unless the exact same entry is already there."""
+        group = self.add_group(group_name)
+        name, host_vars = parse_host_line(entry)
+        if name is None or self.get_entry(group_name, name) == entry.strip():
+            return False
+        if group is self._last and group.trailer:
+            # Same bytes as appending to the end of the file
+            group.lines.extend(group.trailer)
+            group.trailer = []
+        group.lines.append(entry.rstrip("\n") + "\n")
+        self._index(group, name, host_vars, len(group.lines) - 1)
+        self.changes.append(("+", group_name, entry.strip()))
+        return True
+
+    def upsert_host(self, group_name, entry):
+        """Replace the group's line for this node in place, or append it."""
+        group = self.add_group(group_name)
+        name, host_vars = parse_host_line(entry)
+        if name is None:
+            return False
+        position = group.hosts.get(name)
+        if position is None:
+            return self.add_host(group_name, entry)
+        changed = False
+        for old in group.shadowed.pop(name, ()):
+            group.lines[old] = None
+            changed = True
+        line = entry.rstrip("\n") + "\n"
+        if group.lines[position] != line:
+            self._index(group, name, host_vars, position)
+            group.lines[position] = line
+            changed = True
+        if changed:
+            self.changes.append(("~", group_name, entry.strip()))
+        return changed
+
+    def remove_host(self, group_name, name):
+        """Drop a node's line (and any earlier duplicates) from a group. Returns the removed entry."""
+        group = self.groups.get(group_name)
+        if group is None or name not in group.hosts:
+            return None
+        position = group.hosts.pop(name)
+        for old in group.shadowed.pop(name, ()):
+            group.lines[old] = None
+        line = group.lines[position]
+        group.lines[position] = None
+        if line is None:
+            return None
+        self.changes.append(("-", group_name, line.strip()))
+        if self._nodes is not None:
+            _, host_vars = parse_host_line(line)
+            self._unindex_address(group, name, host_vars)
+            host = self._nodes.get(name)
+            if host is not None and group.name in host.groups:
+                host.groups.remove(group.name)
+                if not host.groups:
+                    del self._nodes[name]
+        return line.strip()
+
+    def remove_matching(self, selector, group_names=None):
+        """Remove every host line the selector matches in one pass over the host sections.
+
+        selector.matches(name, address) is called once per host line.
+        Returns a list of (group, name, entry) for the removed lines.
+        """
+        removed = []
+        groups = self.groups.values() if group_names is None else \
+            [self.groups[name] for name in group_names if name in self.groups]
+        for group in groups:
+            if not group.is_host_section:
+                continue
+            for name, position in list(group.hosts.items()):
+                line = group.lines[position]
+                if line is None:
+                    continue
+                address = parse_host_line(line)[1].get("ansible_host") if selector.needs_address else None
+                if selector.matches(name, address):
+                    removed.append((group.name, name, self.remove_host(group.name, name)))
+        return removed
+
+    # === Output ===
+    def render(self):
+        return self._render_with_index()[0]
+
+    def _render_with_index(self):
+        out = ["".join(self.preamble.render())]
+        position = len(out[0])
+        sections = {"preamble": [0, position], "sections": []}
+        for group in self.groups.values():
+            pieces = group.render()
+            header, body = pieces[0], "".join(pieces[1:])
+            out.append(header)
+            out.append(body)
+            start = position + len(header)
+            position = start + len(body)
+            sections["sections"].append([group.name, header, [[start, position]]])
+        return "".join(out), sections
+
+    def write_ini(self, hosts_path=HOSTS_PATH, use_cache=True, dry_run=False):
+        """Write the hosts file unless it is the one loaded and its content did not change.
+
+        Changes that cancel out (removed then re-added, ...) are caught by
+        comparing content hashes. Returns whether the file (would have) changed.
+        """
+        same_file = self.source_path == os.path.abspath(hosts_path) and os.path.exists(hosts_path)
+        if same_file and not self.changes:
+            return False
+        text, sections = self._render_with_index()
+        data = text.encode("utf-8")
+        digest = content_digest(data)
+        if same_file and digest == self.source_digest:
+            self.changes = []
+            return False
+        if dry_run:
+            return True
+        with atomic_open(hosts_path, "wb") as f:
+            f.write(data)
+        if use_cache:
+            write_index_cache(hosts_path, os.stat(hosts_path), digest, sections)
+        self.changes = []
+        self.source_path = os.path.abspath(hosts_path)
+        self.source_digest = digest
+        return True
+
+
+@contextmanager
+def atomic_open(path, mode="w", encoding="utf-8"):
+    """Write to a temp file next to path and rename it into place on success.
+
+    Setting f.discard = True inside the block drops the temp file instead, leaving path untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        try:
+            file_mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            file_mode = 0o644
+        os.chmod(tmp_path, file_mode)
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else encoding) as f:
+            yield f
+            if getattr(f, "discard", False):
+                f.close()
+                os.unlink(tmp_path)
+                return
+            f.flush()
+            start = time.perf_counter()
+            os.fsync(f.fileno())
+            IO_STATS["fsync_seconds"] += time.perf_counter() - start
+            IO_STATS["fsync_calls"] += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def normalize_text(text):
+    # Same newline handling as reading the file in text mode, plus a final newline
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if text and not text.endswith("\n"):
+        text += "\n"
+    return text
+
+
+def content_digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_digest(path, block_size=1 << 20):
+    """(content_digest of the file, its os.stat_result), hashed block by block instead of read whole."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+        return digest.hexdigest(), os.fstat(f.fileno())
+
+
+def split_sections(text):
+    """Locate every [section] header; a repeated header continues the first section."""
+    preamble = None
+    sections = []
+    seen = {}
+    current = None
+    start = 0
+    for match in SECTION_RE.finditer(text):
+        if current is None:
+            preamble = [start, match.start()]
+        else:
+            current[2].append([start, match.start()])
+        header_end = match.end() + 1
+        name = match.group(1).strip()
+        current = seen.get(name)
+        if current is None:
+            current = seen[name] = [name, text[match.start():header_end], []]
+            sections.append(current)
+        start = header_end
+    if current is None:
+        preamble = [start, len(text)]
+    else:
+        current[2].append([start, len(text)])
+    return {"preamble": preamble, "sections": sections}
+
+
+def index_cache_path(hosts_path, kind="index"):
+    hosts_path = os.fspath(hosts_path)
+    return os.path.join(os.path.dirname(hosts_path), f".{os.path.basename(hosts_path)}.{kind}")
+
+
+def read_index_cache(hosts_path, st, digest, key="sections", kind="index"):
+    """Return the cached section table (or other `key` payload) if it still describes the file (size, mtime and hash)."""
+    try:
+        with open(index_cache_path(hosts_path, kind), "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (cache.get("version") != INDEX_CACHE_VERSION or cache.get("size") != st.st_size
+            or cache.get("mtime_ns") != st.st_mtime_ns or cache.get("digest") != digest):
+        return None
+    return cache.get(key)
+
+
+def write_index_cache(hosts_path, st, digest, sections, key="sections", kind="index"):
+    cache = {
+        "version": INDEX_CACHE_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "digest": digest,
+        key: sections,
+    }
+    try:
+        with atomic_open(index_cache_path(hosts_path, kind)) as f:
+            f.write(json.dumps(cache, separators=(",", ":")))
+    except OSError:
+        pass  # the cache is an optimisation only
+
+
+def load_xml_index(inventory_path):
+    """Map Rundeck node name -> hostname without keeping the document in memory."""
+    nodes = {}
+    for _, elem in iterparse(inventory_path, events=("end",)):
+        if elem.tag == "node":
+            nodes[elem.get("name")] = elem.get("hostname")
+            elem.clear()
+    return nodes
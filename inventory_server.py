@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Serve the Rundeck resource model over HTTP with strong ETags.
+
+Point a Rundeck "URL Source" at one of:
+
+    http://127.0.0.1:8090/resources.xml
+    http://127.0.0.1:8090/resources.json
+    http://127.0.0.1:8090/resources.yaml
+
+Responses are serialized once per change of inventory.xml and kept in
+memory; the file is only stat()ed per request. Rundeck's If-None-Match
+gets a 304 while nothing changed.
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from inventory_model import INVENTORY_PATH, content_digest
+from inventory_xml import iter_nodes
+
+CONTENT_TYPES = {
+    "xml": "application/xml; charset=utf-8",
+    "json": "application/json",
+    "yaml": "application/yaml; charset=utf-8",
+}
+
+
+def rundeck_node(attrs):
+    """A node's attributes as Rundeck's JSON and YAML formats take them: "name" becomes "nodename"."""
+    node = {"nodename": attrs["name"]}
+    node.update((key, value) for key, value in attrs.items() if key != "name")
+    return node
+
+
+def nodes_to_json(nodes):
+    return json.dumps({attrs["name"]: rundeck_node(attrs) for attrs in nodes}, indent=2).encode("utf-8")
+
+
+PLAIN_KEY_RE = re.compile(r"^[A-Za-z][A-Za-z0-9_.-]*$")
+
+
+def yaml_key(key):
+    return key if PLAIN_KEY_RE.match(key) else json.dumps(key)
+
+
+def nodes_to_yaml(nodes):
+    # JSON strings are valid YAML scalars, which keeps this free of a YAML dependency
+    out = []
+    for attrs in nodes:
+        out.append(f"{yaml_key(attrs['name'])}:\n")
+        for key, value in rundeck_node(attrs).items():
+            out.append(f"  {yaml_key(key)}: {json.dumps(value)}\n")
+    return "".join(out).encode("utf-8")
+
+
+class ResourceModel:
+    """Pre-serialized responses for one inventory.xml, rebuilt when the file changes."""
+
+    def __init__(self, inventory_path):
+        self.inventory_path = inventory_path
+        self.lock = threading.Lock()
+        self.signature = None
+        self.digest = None
+        self.responses = {}
+        self.source = b""
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.inventory_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def get(self, fmt):
+        """Return (etag, body) for a format, reloading the source only if it changed on disk."""
+        with self.lock:
+            signature = self._stat_signature()
+            if signature != self.signature:
+                self.signature = signature
+                self.responses = {}
+                if signature is None:
+                    self.source = b'<?xml version="1.0" ?>\n<project>\n</project>\n'
+                else:
+                    with open(self.inventory_path, "rb") as f:
+                        self.source = f.read()
+                self.digest = content_digest(self.source)
+            if fmt not in self.responses:
+                self.responses[fmt] = self._serialize(fmt)
+            return f'"{self.digest}-{fmt}"', self.responses[fmt]
+
+    def _serialize(self, fmt):
+        if fmt == "xml":
+            return self.source
+        if self.signature is None:
+            nodes = []
+        else:
+            # The bytes the ETag was computed from, not whatever is on disk by now
+            nodes = [dict(elem.attrib) for elem in iter_nodes(io.BytesIO(self.source))
+                     if elem.tag == "node" and elem.get("name")]
+        return nodes_to_json(nodes) if fmt == "json" else nodes_to_yaml(nodes)
+
+
+def pick_format(handler):
+    parsed = urlparse(handler.path)
+    fmt = parse_qs(parsed.query).get("format", [None])[0]
+    if fmt is None:
+        _, ext = os.path.splitext(parsed.path)
+        fmt = ext.lstrip(".") or None
+    if fmt is None:
+        accept = handler.headers.get("Accept", "")
+        fmt = "json" if "json" in accept else "yaml" if "yaml" in accept else "xml"
+    return {"yml": "yaml"}.get(fmt, fmt)
+
+
+class ResourceHandler(BaseHTTPRequestHandler):
+    model = None
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        fmt = pick_format(self)
+        if fmt not in CONTENT_TYPES:
+            self.send_error(404, f"Unknown format '{fmt}'")
+            return
+        etag, body = self.model.get(fmt)
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[fmt])
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(bind, port, inventory_path=INVENTORY_PATH):
+    handler = type("Handler", (ResourceHandler,), {"model": ResourceModel(inventory_path)})
+    return ThreadingHTTPServer((bind, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Rundeck resource model (XML/JSON/YAML) with ETag caching.")
+    parser.add_argument("--bind", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8090, help="Port to listen on")
+    parser.add_argument("--inventory_path", type=str, default=INVENTORY_PATH, help="Rundeck inventory.xml to serve")
+    args = parser.parse_args()
+
+    server = make_server(args.bind, args.port, args.inventory_path)
+    print(f"Serving {args.inventory_path} on http://{args.bind}:{args.port}/resources.(xml|json|yaml)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
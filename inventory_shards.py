@@ -0,0 +1,50 @@
+import os
+
+from inventory_diff import report_changes
+from inventory_model import ANSIBLE_DIR, Inventory
+from inventory_xml import merge_nodes
+
+SHARD_DIR = os.path.join(ANSIBLE_DIR, "inventory.d")
+
+
+def add_shard_arguments(parser):
+    parser.add_argument("--shard_dir", type=str, required=False, nargs="?", const=SHARD_DIR,
+                        help=f"Write one INI file and one Rundeck XML file per group under this directory "
+                             f"instead of the single hosts/inventory.xml (default when given without a value: {SHARD_DIR})")
+
+
+def shard_paths(shard_dir, group):
+    """Ansible reads <shard_dir>/hosts.d as a directory inventory, Rundeck reads <shard_dir>/resources.d."""
+    # No .ini suffix: Ansible skips *.ini files inside inventory directories
+    filename = group.replace(os.sep, "_").lstrip(".") or "_"
+    return (os.path.join(shard_dir, "hosts.d", filename),
+            os.path.join(shard_dir, "resources.d", f"{filename}.xml"))
+
+
+def write_group_shard(shard_dir, group, entries, xml_nodes=None, upsert=True, xml_replace=True, dry_run=False, update=None):
+    """Apply one group's changes to its own shard files; other groups are not read or rewritten.
+
+    Shard files whose content would not change are left untouched.
+    """
+    ini_path, xml_path = shard_paths(shard_dir, group)
+    if not dry_run:
+        os.makedirs(os.path.dirname(ini_path), exist_ok=True)
+        os.makedirs(os.path.dirname(xml_path), exist_ok=True)
+
+    inventory = Inventory.load(ini_path, dry_run=dry_run)
+    inventory.add_group(group, blank_line=False)
+    for entry in entries:
+        if upsert:
+            inventory.upsert_host(group, entry)
+        else:
+            inventory.add_host(group, entry)
+    ini_changes = list(inventory.changes)
+    if not inventory.write_ini(ini_path, dry_run=dry_run):
+        ini_changes = []
+    report_changes(ini_path, ini_changes, dry_run)
+
+    if xml_nodes is not None:
+        xml_changes = []
+        merge_nodes(xml_path, xml_nodes, replace=xml_replace, changes=xml_changes, dry_run=dry_run, update=update)
+        report_changes(xml_path, xml_changes, dry_run)
+    return ini_path, xml_path
@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""Keep the hosts file and inventory.xml in step, one changed node at a time.
+
+Watches /etc/ansible with inotify and, when either file changes, finds the
+byte range that changed since the last look (common prefix/suffix, compared
+in 64 KiB blocks), parses only the host lines or <node> elements in that
+range and carries the node-level difference over to the other file:
+
+- a host added, moved or re-addressed in hosts adds or updates its Rundeck node
+  (a host removed from every group removes the node; a node tagged with the
+  group its host left, e.g. a renamed [section], is retagged)
+- a node added, re-addressed or removed in inventory.xml updates the host
+  lines of that name (new nodes go to the group named by one of their tags,
+  or --default_group)
+
+inventory.xml is patched by splicing the changed nodes into the file, the
+hosts file through Inventory, which only parses the groups it touches. Both
+are still renamed into place whole. When both files changed, hosts wins.
+The watcher's own writes are recognised on the next event and ignored, so
+the two files never ping-pong. Each sync holds the inventory lock, so a
+generator's run is never seen half way through.
+
+    inventory_sync.py                  # watch
+    inventory_sync.py --initial_sync   # reconcile every node once, then watch
+    inventory_sync.py --once           # reconcile every node once and exit
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import time
+from itertools import chain
+from xml.etree.ElementTree import ParseError, fromstring
+
+from inventory_diff import report_changes
+from inventory_journal import inventory_lock
+from inventory_model import (HOSTS_PATH, INVENTORY_PATH, SECTION_RE, Inventory, atomic_open, format_host_line,
+                             parse_host_line)
+from inventory_xml import (ATTR_ESCAPES, XML_FOOTER, XML_HEADER, format_element, format_node, merge_nodes,
+                           node_attributes, node_digest, update_attributes, write_node_index)
+
+BLOCK_SIZE = 64 * 1024
+
+# SECTION_RE over the raw bytes of the hosts file
+SECTION_LINE_RE = re.compile(SECTION_RE.pattern.encode("utf-8"), re.M)
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+# === Finding what changed ===
+def _common_prefix(a, b, limit):
+    position = 0
+    while position < limit:
+        end = min(position + BLOCK_SIZE, limit)
+        if a[position:end] != b[position:end]:
+            break
+        position = end
+    else:
+        return limit
+    low, high = position, end  # a[position:low] equal, first difference in [low, high)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def _common_suffix(a, b, limit):
+    la, lb = len(a), len(b)
+    position = 0
+    while position < limit:
+        end = min(position + BLOCK_SIZE, limit)
+        if a[la - end:la - position] != b[lb - end:lb - position]:
+            break
+        position = end
+    else:
+        return limit
+    low, high = position, end
+    while high - low > 1:
+        middle = (low + high) // 2
+        if a[la - middle:la - low] == b[lb - middle:lb - low]:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def changed_span(old, new):
+    """(start, old_end, new_end) of the bytes that differ between old and new, or None if equal."""
+    if old == new:
+        return None
+    limit = min(len(old), len(new))
+    start = _common_prefix(old, new, limit)
+    suffix = _common_suffix(old, new, limit - start)
+    return start, len(old) - suffix, len(new) - suffix
+
+
+# === hosts ===
+def _section_at(data, position):
+    """Name of the INI section the line at position belongs to (None before the first header)."""
+    end = position
+    while True:
+        newline = data.rfind(b"\n[", 0, end)
+        start = newline + 1 if newline >= 0 else 0
+        if newline < 0 and not data.startswith(b"["):
+            return None
+        line_end = data.find(b"\n", start)
+        match = SECTION_RE.match(data[start:line_end if line_end >= 0 else len(data)].decode("utf-8").rstrip("\r"))
+        if match:
+            return match.group(1)
+        if newline < 0:
+            return None
+        end = newline
+
+
+def parse_ini_region(data, start, end):
+    """{(group, name): (ansible_host, ansible_user)} for the host lines in data[start:end] (start at a line start).
+
+    Hosts before the first header and in :vars/:children sections are not Rundeck nodes and are left out.
+    """
+    group = _section_at(data, start)
+    hosts = {}
+    for line in data[start:end].decode("utf-8").splitlines():
+        match = SECTION_RE.match(line.rstrip("\r"))
+        if match:
+            group = match.group(1)
+            continue
+        if group is None or ":" in group:
+            continue
+        name, host_vars = parse_host_line(line)
+        if name is not None:
+            hosts[(group, name)] = (host_vars.get("ansible_host", name), host_vars.get("ansible_user"))
+    return hosts
+
+
+def ini_regions(old, new):
+    """Whole lines around the changed bytes: (start, old_end, new_end), or None if nothing changed.
+
+    When a section header changed, the region runs on to the next header (or
+    the end of the file): the unchanged host lines below it moved group.
+    """
+    span = changed_span(old, new)
+    if span is None:
+        return None
+    start, old_end, _ = span
+    start = old.rfind(b"\n", 0, start) + 1
+    newline = old.find(b"\n", old_end)
+    end = len(old) if newline < 0 else newline + 1
+    shift = len(new) - len(old)
+    if SECTION_LINE_RE.search(old, start, end) or SECTION_LINE_RE.search(new, start, end + shift):
+        # The rest of the file is the same in both, and so is where its next header is
+        header = SECTION_LINE_RE.search(old, end)
+        end = len(old) if header is None else header.start()
+    return start, end, end + shift
+
+
+def set_host_vars(line, address, user):
+    """The host line with its ansible_host/ansible_user replaced, other variables kept."""
+    parts = line.split()
+    values = {"ansible_host": address, "ansible_user": user}
+    for index, part in enumerate(parts[1:], 1):
+        key = part.partition("=")[0]
+        if key in values:
+            parts[index] = f"{key}={values.pop(key)}" if values[key] else None
+    parts = [part for part in parts if part is not None]
+    parts[1:1] = [f"{key}={value}" for key, value in values.items() if value]
+    return " ".join(parts)
+
+
+# === inventory.xml ===
+def xml_regions(old, new):
+    """Whole <node> elements around the changed bytes: (start, old_end, new_end).
+
+    None if nothing changed; (0, len(old), len(new)) when the change reaches
+    the <project> element itself and the whole file has to be compared.
+    """
+    span = changed_span(old, new)
+    if span is None:
+        return None
+    start, old_end, _ = span
+    project = old.find(b"<project")
+    body = old.find(b">", project) + 1 if project >= 0 else 0
+    close = old.rfind(b"</project>")
+    if project < 0 or close < 0 or start < body or old_end > close:
+        return 0, len(old), len(new)
+    node_start = old.rfind(b"<node", body, start + 5)
+    while node_start > start:
+        node_start = old.rfind(b"<node", body, node_start + 4)
+    node_start = body if node_start < 0 else node_start
+    node_end = old.find(b"<node", old_end, close)
+    node_end = close if node_end < 0 else node_end
+    return node_start, node_end, node_end + len(new) - len(old)
+
+
+def parse_xml_region(data, start, end, whole=False):
+    """{name: element} for the <node> elements in data[start:end]; raises ParseError on a half-written file."""
+    root = fromstring(data if whole else b"<project>" + data[start:end] + b"</project>") if data.strip() else []
+    return {elem.get("name"): elem for elem in root if elem.tag == "node" and elem.get("name")}
+
+
+def _tag_end(data, position):
+    """Index just past the '>' closing the tag that starts at position, skipping quoted values."""
+    while True:
+        close = data.find(b">", position)
+        quotes = [index for index in (data.find(b'"', position), data.find(b"'", position)) if index >= 0]
+        quote = min(quotes) if quotes else -1
+        if close < 0 or quote < 0 or close < quote:
+            return close + 1 if close >= 0 else len(data)
+        position = data.find(data[quote:quote + 1], quote + 1) + 1
+        if position <= 0:
+            return len(data)
+
+
+def find_node_span(data, name):
+    """(start, end) of the <node> element named name, whole lines when it sits on its own lines; None if not found."""
+    needle = f'name="{name.translate(ATTR_ESCAPES)}"'.encode("utf-8")
+    position = data.find(needle)
+    while position >= 0:
+        tag = data.rfind(b"<", 0, position)
+        if data[position - 1:position].isspace() and data.startswith(b"<node", tag) and data[tag + 5:tag + 6].isspace():
+            end = _tag_end(data, tag)
+            if data[end - 2:end] != b"/>":
+                close = data.find(b"</node>", end)
+                end = close + len(b"</node>") if close >= 0 else end
+            line_start = data.rfind(b"\n", 0, tag) + 1
+            if data[line_start:tag].strip():
+                return tag, end
+            if data[end:end + 1] == b"\n":
+                end += 1
+            return line_start, end
+        position = data.find(needle, position + 1)
+    return None
+
+
+def splice_nodes(data, updates, removals, add_only=None, changes=None, update=None):
+    """data with the nodes in updates (name -> attributes) replaced or appended and removals dropped.
+
+    Nodes in add_only are only appended when missing, a replaced node keeps
+    is merged on its `update` attributes (see merge_nodes) and a node whose text would not
+    change is left as it is. With a changes list, every difference
+    is appended to it as (op, name), as merge_nodes does. Returns None when
+    a node cannot be located by its name="..." attribute.
+    """
+    changes = [] if changes is None else changes
+    add_only = {name: attrs for name, attrs in (add_only or {}).items() if name not in updates}
+    if not data or data.isspace():
+        nodes = {**updates, **add_only}
+        changes.extend(("+", name) for name in nodes)
+        return (XML_HEADER + "".join(format_node(attrs) for attrs in nodes.values()) + XML_FOOTER).encode("utf-8")
+    edits, appended = [], []
+    for name in removals:
+        span = find_node_span(data, name)
+        if span is None:
+            return None
+        edits.append((span[0], span[1], b""))
+        changes.append(("-", name))
+    for name, attrs in chain(updates.items(), add_only.items()):
+        span = find_node_span(data, name)
+        if span is not None and update is not None and name in updates:
+            try:
+                attrs = update_attributes(attrs, fromstring(data[span[0]:span[1]].strip()).attrib, update)
+            except ParseError:
+                return None
+        text = format_node(attrs).encode("utf-8")
+        if span is None:
+            appended.append(text)
+            changes.append(("+", name))
+        elif name in updates and data[span[0]:span[1]] != text:
+            edits.append((span[0], span[1], text))
+            changes.append(("~", name))
+    if appended:
+        close = data.rfind(b"</project>")
+        if close < 0:
+            return None
+        line_start = data.rfind(b"\n", 0, close) + 1
+        insert_at = line_start if not data[line_start:close].strip() else close
+        edits.append((insert_at, insert_at, b"".join(appended)))
+    pieces, position = [], 0
+    for start, end, text in sorted(edits, key=lambda edit: edit[:2]):
+        pieces += [data[position:start], text]
+        position = end
+    pieces.append(data[position:])
+    return b"".join(pieces)
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+            st = os.fstat(f.fileno())
+        return data, (st.st_ino, st.st_size, st.st_mtime_ns)
+    except FileNotFoundError:
+        return b"", None
+
+
+class InventorySync:
+    """Both files as last seen, with per-node state, and the incremental sync between them."""
+
+    def __init__(self, hosts_path=HOSTS_PATH, inventory_path=INVENTORY_PATH, access_method="privatesshkey",
+                 ssh_key_storage_path="", ssh_password_storage_path="", default_group="rundeck_nodes"):
+        self.hosts_path = hosts_path
+        self.inventory_path = inventory_path
+        self.access_method = access_method
+        self.ssh_key_storage_path = ssh_key_storage_path or ""
+        self.ssh_password_storage_path = ssh_password_storage_path or ""
+        self.default_group = default_group
+        self.ini, self.ini_signature = b"", None
+        self.xml, self.xml_signature = b"", None
+        self.memberships = {}  # host name -> {group: (ansible_host, ansible_user)}
+        self.nodes = {}        # node name -> attributes
+        self.digests = {}      # node name -> node_digest, the inventory.xml index
+        self.regrouped = {}    # host name -> (groups left, groups joined) in the last hosts change
+        self.index_dirty = False
+
+    # === Reading ===
+    def load(self):
+        """Parse both files in full, once."""
+        self.ini, self.ini_signature = _read(self.hosts_path)
+        self.memberships = {}
+        for (group, name), value in parse_ini_region(self.ini, 0, len(self.ini)).items():
+            self.memberships.setdefault(name, {})[group] = value
+        self.xml, self.xml_signature = _read(self.inventory_path)
+        elements = parse_xml_region(self.xml, 0, len(self.xml), whole=True)
+        self.nodes = {name: dict(elem.attrib) for name, elem in elements.items()}
+        self.digests = {name: node_digest(format_element(elem)) if len(elem) == 0 else None
+                        for name, elem in elements.items()}
+
+    def _ini_delta(self):
+        """Apply the hosts file's changes since last seen; returns the names whose groups or addresses changed."""
+        new, signature = _read(self.hosts_path)
+        self.regrouped = {}
+        if signature == self.ini_signature:
+            return set()
+        regions = ini_regions(self.ini, new)
+        self.ini_signature = signature
+        if regions is None:
+            return set()
+        start, old_end, new_end = regions
+        before = parse_ini_region(self.ini, start, old_end)
+        after = parse_ini_region(new, start, new_end)
+        self.ini = new
+        changed = set()
+        for (group, name) in before.keys() - after.keys():
+            self.memberships.get(name, {}).pop(group, None)
+            if not self.memberships.get(name):
+                self.memberships.pop(name, None)
+            self.regrouped.setdefault(name, ([], []))[0].append(group)
+            changed.add(name)
+        for (group, name), value in after.items():
+            if before.get((group, name)) != value:
+                self.memberships.setdefault(name, {})[group] = value
+                changed.add(name)
+            if (group, name) not in before:
+                self.regrouped.setdefault(name, ([], []))[1].append(group)
+        return changed
+
+    def _xml_delta(self):
+        """Apply inventory.xml's changes since last seen; returns the names of the nodes that changed."""
+        new, signature = _read(self.inventory_path)
+        if signature == self.xml_signature:
+            return set()
+        regions = xml_regions(self.xml, new)
+        if regions is None:
+            self.xml_signature = signature
+            return set()
+        start, old_end, new_end = regions
+        whole = (start, old_end, new_end) == (0, len(self.xml), len(new))
+        try:
+            before = parse_xml_region(self.xml, start, old_end, whole)
+            after = parse_xml_region(new, start, new_end, whole)
+        except ParseError as e:
+            # Keep the last good state: the next event compares against it again
+            print(f"⚠️ {self.inventory_path} is not well-formed ({e}), waiting for the next change")
+            return set()
+        self.xml, self.xml_signature = new, signature
+        changed = set()
+        for name in before.keys() - after.keys():
+            self.nodes.pop(name, None)
+            self.digests.pop(name, None)
+            changed.add(name)
+        for name, elem in after.items():
+            if name not in before or before[name].attrib != elem.attrib or len(elem) != len(before[name]):
+                self.nodes[name] = dict(elem.attrib)
+                self.digests[name] = node_digest(format_element(elem)) if len(elem) == 0 else None
+                changed.add(name)
+        return changed
+
+    # === Planning ===
+    def _node_for_host(self, name, node, members):
+        """Attributes inventory.xml should have for a host of the hosts file, or None if it already does."""
+        if node is not None and (node.get("hostname"), node.get("username") or None) in members.values():
+            tags = self._tags_for_host(name, node)
+            return None if tags is None else {**node, "tags": tags}
+        address, user = next(iter(members.values()))
+        if address == "localhost":
+            return None
+        if node is None:
+            return node_attributes(name, address, user or "", self.access_method,
+                                   self.ssh_key_storage_path, self.ssh_password_storage_path)
+        attrs = dict(node)
+        if attrs.get("description") == f"Server at {attrs.get('hostname')}":
+            attrs["description"] = f"Server at {address}"
+        attrs["hostname"] = address
+        attrs["username"] = user or ""
+        tags = self._tags_for_host(name, node)
+        if tags is not None:
+            attrs["tags"] = tags
+        return attrs
+
+    def _tags_for_host(self, name, node):
+        """The node's tags with the groups its host left (e.g. a renamed section) replaced by the ones it joined.
+
+        None if no tag names a group the host left.
+        """
+        left, joined = self.regrouped.get(name, ((), ()))
+        tags = [tag.strip() for tag in node.get("tags", "").split(",") if tag.strip()]
+        if not set(left) & set(tags):
+            return None
+        result = []
+        for tag in tags:
+            for group in (joined if tag in left else [tag]):
+                if group not in result:
+                    result.append(group)
+        return ", ".join(result)
+
+    def _group_for_node(self, node):
+        for tag in (tag.strip() for tag in node.get("tags", "").split(",")):
+            header = f"[{tag}]".encode("utf-8")
+            if tag and ":" not in tag and (self.ini.startswith(header) or b"\n" + header in self.ini):
+                return tag
+        return self.default_group
+
+    def plan(self, ini_changed, xml_changed):
+        """Turn changed names into (xml_updates, xml_removals, ini_sets, ini_removals); hosts wins on conflicts."""
+        xml_updates, xml_removals, ini_sets, ini_removals = {}, set(), [], []
+        for name in sorted(ini_changed):
+            members, node = self.memberships.get(name), self.nodes.get(name)
+            if not members:
+                if node is not None:
+                    xml_removals.add(name)
+                continue
+            attrs = self._node_for_host(name, node, members)
+            if attrs is not None:
+                xml_updates[name] = attrs
+        for name in sorted(xml_changed - ini_changed):
+            node, members = self.nodes.get(name), self.memberships.get(name, {})
+            if node is None:
+                ini_removals += [(group, name) for group in members]
+                continue
+            address, user = node.get("hostname"), node.get("username") or None
+            if not address or address == "localhost":
+                continue
+            if not members:
+                ini_sets.append((self._group_for_node(node), name, address, user))
+            ini_sets += [(group, name, address, user) for group, value in members.items() if value != (address, user)]
+        return xml_updates, xml_removals, ini_sets, ini_removals
+
+    # === Writing ===
+    def _write_xml(self, updates, removals):
+        changes = [("-", name) for name in sorted(removals)] + \
+                  [("~" if name in self.nodes else "+", name) for name in updates]
+        data = splice_nodes(self.xml, updates, removals)
+        if data is None:
+            # Hand-formatted file: fall back to one streaming rewrite
+            merge_nodes(self.inventory_path, updates, transform=lambda attrs: None if attrs.get("name") in removals else attrs)
+            with open(self.inventory_path, "rb") as f:
+                data = f.read()
+        else:
+            with atomic_open(self.inventory_path, "wb") as f:
+                f.write(data)
+        for name in removals:
+            self.nodes.pop(name, None)
+            self.digests.pop(name, None)
+        for name, attrs in updates.items():
+            self.nodes[name] = attrs
+            self.digests[name] = node_digest(format_node(attrs))
+        st = os.stat(self.inventory_path)
+        self.xml, self.xml_signature = data, (st.st_ino, st.st_size, st.st_mtime_ns)
+        self.index_dirty = True
+        return changes
+
+    def flush_index(self):
+        """Write the inventory.xml node index (see read_node_index) if inventory.xml is still as last seen.
+
+        Rewriting it costs time in the size of the fleet, so the watcher does it once things are quiet.
+        """
+        _, signature = _read(self.inventory_path)
+        if signature == self.xml_signature:
+            write_node_index(self.inventory_path, self.digests,
+                             {name: attrs.get("hostname", "") for name, attrs in self.nodes.items()})
+        self.index_dirty = False
+
+    def _write_ini(self, sets, removals):
+        inventory = Inventory.load(self.hosts_path)
+        for group, name in removals:
+            inventory.remove_host(group, name)
+            self.memberships.get(name, {}).pop(group, None)
+            if not self.memberships.get(name):
+                self.memberships.pop(name, None)
+        for group, name, address, user in sets:
+            line = inventory.get_entry(group, name)
+            inventory.upsert_host(group, set_host_vars(line, address, user) if line else
+                                  format_host_line(name, address, user) if user else f"{name} ansible_host={address}")
+            self.memberships.setdefault(name, {})[group] = (address, user)
+        changes = list(inventory.changes)
+        if not inventory.write_ini(self.hosts_path):
+            changes = []
+        self.ini, self.ini_signature = _read(self.hosts_path)
+        return changes
+
+    def sync(self, full=False):
+        """Carry the changes since the last call (every node with full) over to the other file.
+
+        Returns the number of names looked at.
+        """
+        ini_changed, xml_changed = self._ini_delta(), self._xml_delta()
+        if full:
+            ini_changed |= set(self.memberships)
+            xml_changed |= set(self.nodes)
+        if not ini_changed and not xml_changed:
+            return 0
+        xml_updates, xml_removals, ini_sets, ini_removals = self.plan(ini_changed, xml_changed)
+        if xml_updates or xml_removals:
+            report_changes(self.inventory_path, self._write_xml(xml_updates, xml_removals))
+        if ini_sets or ini_removals:
+            report_changes(self.hosts_path, self._write_ini(ini_sets, ini_removals))
+        return len(ini_changed | xml_changed)
+
+
+# === Watching ===
+class InotifyWatcher:
+    """inotify on a directory through libc (no third-party module), reporting the watched file names."""
+
+    def __init__(self, directory, names):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.names = {os.fsencode(name) for name in names}
+        self.fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # atomic_open renames a temp file over the target: watch the directory, not the inode
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch {directory} failed")
+
+    def wait(self, timeout=None):
+        """Names of watched files changed within timeout seconds (None: wait for one)."""
+        changed = set()
+        while not changed:
+            if not select.select([self.fd], [], [], timeout)[0]:
+                return changed
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset < len(buffer):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+                name = buffer[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b"\0")
+                offset += INOTIFY_EVENT.size + length
+                if name in self.names:
+                    changed.add(os.fsdecode(name))
+        return changed
+
+
+class PollingWatcher:
+    """stat() polling where inotify is not available."""
+
+    def __init__(self, directory, names, interval=1.0):
+        self.paths = {name: os.path.join(directory, name) for name in names}
+        self.interval = interval
+        self.signatures = self._signatures()
+
+    def _signatures(self):
+        signatures = {}
+        for name, path in self.paths.items():
+            try:
+                st = os.stat(path)
+                signatures[name] = (st.st_ino, st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                signatures[name] = None
+        return signatures
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._signatures()
+            changed = {name for name, signature in current.items() if signature != self.signatures[name]}
+            self.signatures = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(self.interval if deadline is None else max(0.0, min(self.interval, deadline - time.monotonic())))
+
+
+def make_watcher(paths, poll_interval=1.0):
+    directories = {os.path.dirname(os.path.abspath(path)) for path in paths}
+    if len(directories) != 1:
+        raise ValueError("the hosts file and inventory.xml must be in the same directory")
+    directory = directories.pop()
+    names = [os.path.basename(path) for path in paths]
+    try:
+        return InotifyWatcher(directory, names)
+    except (OSError, AttributeError) as e:
+        print(f"⚠️ inotify unavailable ({e}), polling every {poll_interval:g}s")
+        return PollingWatcher(directory, names, poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propagate node-level changes between the hosts file and inventory.xml.")
+    parser.add_argument("--once", action="store_true", help="Reconcile every node once and exit")
+    parser.add_argument("--initial_sync", action="store_true", help="Reconcile every node once before watching")
+    parser.add_argument("--access_method", choices=["password", "privatesshkey"], default="privatesshkey",
+                        help="Access method of Rundeck nodes created for new hosts")
+    parser.add_argument("--ssh_key_storage_path", type=str, default="", help="Key storage path of Rundeck nodes created for new hosts")
+    parser.add_argument("--ssh_password_storage_path", type=str, default="",
+                        help="Password storage path of Rundeck nodes created for new hosts")
+    parser.add_argument("--default_group", type=str, default="rundeck_nodes",
+                        help="hosts group for new Rundeck nodes whose tags name no existing group")
+    parser.add_argument("--debounce", type=float, default=0.2, help="Seconds of quiet to wait for after a change")
+    parser.add_argument("--index_delay", type=float, default=5.0,
+                        help="Seconds of quiet before the inventory.xml node index is rewritten after a sync")
+    parser.add_argument("--poll_interval", type=float, default=1.0, help="stat() interval where inotify is not available")
+    parser.add_argument("--hosts_path", type=str, default=HOSTS_PATH, help="Ansible hosts file")
+    parser.add_argument("--inventory_path", type=str, default=INVENTORY_PATH, help="Rundeck inventory.xml")
+    args = parser.parse_args()
+
+    sync = InventorySync(args.hosts_path, args.inventory_path, args.access_method, args.ssh_key_storage_path,
+                         args.ssh_password_storage_path, args.default_group)
+    os.makedirs(os.path.dirname(os.path.abspath(args.hosts_path)), exist_ok=True)
+    watcher = None if args.once else make_watcher([args.hosts_path, args.inventory_path], args.poll_interval)
+
+    with inventory_lock():
+        start = time.perf_counter()
+        sync.load()
+        print(f"ℹ️ Loaded {len(sync.memberships)} host(s) and {len(sync.nodes)} node(s) in {time.perf_counter() - start:.2f}s")
+        if args.once or args.initial_sync:
+            sync.sync(full=True)
+            if sync.index_dirty:
+                sync.flush_index()
+    if args.once:
+        return
+
+    print(f"🔎 Watching {args.hosts_path} and {args.inventory_path}")
+    try:
+        while True:
+            if not watcher.wait(args.index_delay if sync.index_dirty else None):
+                with inventory_lock():
+                    sync.flush_index()
+                continue
+            # Editors and generators write in bursts: act once things are quiet
+            while watcher.wait(args.debounce):
+                pass
+            with inventory_lock():
+                start = time.perf_counter()
+                count = sync.sync()
+            if count:
+                print(f"✅ Synced {count} node(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
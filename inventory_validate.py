@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""Fleet-wide validation of the inventory before anything is written.
+
+One pass over hosts, inventory.xml and the incoming records fills hash
+indexes by node name, by address and by (group, name), and collects every
+problem instead of stopping at the first one:
+
+- a node name reused with a different address (in another group, in
+  inventory.xml or elsewhere in the batch)
+- an address shared by differently named nodes
+- the same node listed twice in one group with different users
+
+Malformed addresses and XML-unsafe characters are rejected record by
+record (see inventory_input.validate_record).
+
+The generators check their records while applying them and write nothing
+if one conflicts (--allow_conflicts writes anyway, --skip_validation
+leaves the check out). Queued --journal changes are checked when they are
+applied. Conflicts that are already in the files are only counted there;
+this script lists them all:
+
+    inventory_validate.py
+    inventory_validate.py --input nodes.csv --infra_groupname MvmNode
+"""
+
+import argparse
+import html
+import os
+import re
+import sys
+from operator import eq
+
+from inventory_input import add_input_arguments, iter_records, validate_record
+from inventory_model import HOSTS_PATH, INVENTORY_PATH, normalize_text, parse_host_line
+from inventory_xml import read_node_hostnames
+
+# The localhost node every inventory starts with shares its address with the Rundeck server node
+LOCAL_ADDRESSES = frozenset(("localhost", "127.0.0.1", "::1"))
+
+# SECTION_RE, host lines as format_host_line writes them and any entry line, each anchored on
+# the newline before the line: a literal first character is much faster to scan for than ^ with re.M
+HEADER_RE = re.compile(r"\n[^\S\n]*\[(.*)\][^\S\n]*(?=\n)")
+HOST_LINE_RE = re.compile(r"\n([^\s#;\[]\S*) ansible_host=(\S+) ansible_user=(\S+)(?=\n)")
+ENTRY_LINE_RE = re.compile(r"\n[ \t]*[^\s#;]")
+
+# One scan per attribute when every <node> has both (as format_node writes them), else node by node
+XML_NAME_RE = re.compile(r'<node\s+name="([^"]*)"')
+XML_HOSTNAME_RE = re.compile(r'hostname="([^"]*)"')
+XML_NODE_RE = re.compile(r"<node\b([^>]*)>")
+XML_ATTR_RE = re.compile(r'\s(name|hostname)="([^"]*)"')
+
+# Records checked against the host sections that mention them before every deferred section is indexed
+DEFER_LIMIT = 16
+
+
+def add_validate_arguments(parser):
+    parser.add_argument("--skip_validation", action="store_true",
+                        help="Do not check the new nodes against the whole inventory before writing")
+    parser.add_argument("--allow_conflicts", action="store_true",
+                        help="Report nodes that conflict with the inventory but write them anyway")
+
+
+def _agrees(block, index):
+    """Whether every key block shares with index maps to the same value, in one C-level pass over block."""
+    # index.get(key, value) is value itself for keys the index does not have yet
+    return all(map(eq, block.values(), map(index.get, block.keys(), block.values())))
+
+
+def check_chunks(validator, chunks, group, replace=False):
+    """Pass chunks of valid records through, checking each record first when there is a validator."""
+    for chunk in chunks:
+        if validator is not None:
+            for record in chunk:
+                validator.check_record(group, record, replace)
+        yield chunk
+
+
+class FleetIndex:
+    """Name, address and (group, name) indexes over the inventory files and the incoming records.
+
+    The files are indexed a block (one INI section, one XML file) at a time
+    with plain dicts, so a block that agrees with what is indexed costs a
+    few dict operations in C however many nodes it has. Where an entry came
+    from is only looked up when a message needs it. Incoming records are
+    checked one by one against both; conflicts the files already had are
+    kept apart (existing_conflicts). Sections handed over by an already
+    loaded Inventory are only indexed once a record mentions them.
+    """
+
+    def __init__(self, allow_conflicts=False):
+        self.allow_conflicts = allow_conflicts
+        self.names = {}  # name -> address
+        self.addresses = {}  # address -> name
+        self.groups = {}  # group -> {name: user}
+        self.sources = []  # (where, group, {name: address}) per indexed block, in load order
+        self.deferred = []  # (group, body, label) host sections not indexed yet, see load_inventory
+        self.batch_names = {}  # name -> (address, where)
+        self.batch_addresses = {}  # address -> (name, where)
+        self.batch_members = {}  # (group, name) -> (user, where)
+        self.conflicts = []
+        self.existing_conflicts = []
+        self.checked = 0
+
+    @classmethod
+    def from_args(cls, args):
+        """None with --skip_validation, else an empty index honouring --allow_conflicts."""
+        if getattr(args, "skip_validation", False):
+            return None
+        return cls(getattr(args, "allow_conflicts", False))
+
+    def where_is(self, name, group=None, address=None):
+        """The first indexed block holding name (in group, at address, if given), host sections before inventory.xml."""
+        found = "?"
+        for where, block_group, by_name in self.sources:
+            if name in by_name and group in (None, block_group) and address in (None, by_name[name]):
+                if block_group is not None:
+                    return where
+                if found == "?":
+                    found = where
+        return found
+
+    # === Files ===
+    def add_existing(self, group, names, addresses, users, where):
+        """Index one block of file entries given as parallel lists (group None for inventory.xml)."""
+        by_name = dict(zip(names, addresses))
+        by_address = dict(zip(addresses, names))
+        members = self.groups.setdefault(group, {}) if group is not None else None
+        self.sources.append((where, group, by_name))
+        by_user = dict(zip(names, users)) if group is not None else {}
+        if (len(by_name) == len(by_address) == len(names) and _agrees(by_name, self.names)
+                and _agrees(by_address, self.addresses) and (group is None or _agrees(by_user, members))):
+            # Nothing to report: shared keys already hold the same values
+            self.names.update(by_name)
+            self.addresses.update(by_address)
+            if group is not None:
+                members.update(by_user)
+            return
+        for name, address, user in zip(names, addresses, users):
+            found = []
+            seen = self.names.setdefault(name, address)
+            if seen != address:
+                found.append(f"'{name}' is {address} in {where} but {seen} in {self.where_is(name)}")
+            owner = self.addresses.setdefault(address, name)
+            if owner != name and address not in LOCAL_ADDRESSES:
+                found.append(f"{address} of '{name}' in {where} is already used by '{owner}' in "
+                             f"{self.where_is(owner, address=address)}")
+            if group is not None:
+                known = members.setdefault(name, user)
+                if known != user:
+                    found.append(f"'{name}' is listed twice in [{group}] with users {known} and {user} ({where})")
+            self.existing_conflicts.extend(found)
+
+    def forget_existing(self):
+        """Stop comparing with the files, e.g. once a bulk operation has changed them in memory."""
+        self.names, self.addresses, self.groups, self.sources, self.deferred = {}, {}, {}, [], []
+
+    def index_deferred(self, name=None, address=None):
+        """Index the deferred sections whose text mentions name or address, or all of them.
+
+        A section that mentions neither cannot conflict with the record, so a
+        small run only indexes the few sections it touches. Past DEFER_LIMIT
+        checked records everything is indexed at once.
+        """
+        if name is None or self.checked > DEFER_LIMIT:
+            blocks, self.deferred = self.deferred, []
+        else:
+            blocks, rest = [], []
+            for block in self.deferred:
+                (blocks if name in block[1] or address in block[1] else rest).append(block)
+            self.deferred = rest
+        for group, body, label in blocks:
+            self._load_section(group, "\n" + body, label)
+
+    # === Incoming records ===
+    def check(self, group, name, address, user, where="input", replace=False):
+        """Index one incoming node and record its conflicts. Returns whether it had none.
+
+        replace is for runs that rewrite the node's line in its group (patch,
+        k8s) instead of adding one: a new address or user for a node already
+        in that group is then an update, not a conflict.
+        """
+        self.checked += 1
+        if self.deferred:
+            self.index_deferred(name, address)
+        found = []
+        members = self.groups.get(group, {})
+        supersedes = replace and name in members
+
+        seen, seen_where = self.batch_names.setdefault(name, (address, where))
+        if seen == address and not supersedes and self.names.get(name, address) != address:
+            seen, seen_where = self.names[name], self.where_is(name)
+        if seen != address:
+            found.append(f"'{name}' is {address} in {where} but {seen} in {seen_where}")
+
+        if address not in LOCAL_ADDRESSES:
+            owner, owner_where = self.batch_addresses.setdefault(address, (name, where))
+            if owner == name and self.addresses.get(address, name) != name:
+                owner = self.addresses[address]
+                owner_where = self.where_is(owner, address=address)
+            if owner != name:
+                found.append(f"{address} of '{name}' in {where} is already used by '{owner}' in {owner_where}")
+
+        known, known_where = self.batch_members.setdefault((group, name), (user, where))
+        if known == user and not supersedes and members.get(name, user) != user:
+            known, known_where = members[name], self.where_is(name, group)
+        if known != user:
+            found.append(f"'{name}' is listed twice in [{group}] with users {known} ({known_where}) and {user} ({where})")
+
+        self.conflicts.extend(found)
+        return not found
+
+    def check_record(self, group, record, replace=False, source="input"):
+        where = f"{source} line {record['_line']}" if "_line" in record else source
+        return self.check(group, record["node_name"], record["ip"], record["username"], where, replace)
+
+    # === Between runs (inventory_daemon.py keeps one index for many) ===
+    def commit(self, label):
+        """Index the incoming nodes as entries of the file labelled label, now that they are written."""
+        self.index_deferred()
+        blocks = {}
+        for (group, name), (user, _) in self.batch_members.items():
+            address = self.batch_names[name][0]
+            old = self.names.get(name)
+            if old is not None and old != address and self.addresses.get(old) == name:
+                del self.addresses[old]
+            self.names[name] = address
+            if address not in LOCAL_ADDRESSES:
+                self.addresses[address] = name
+            self.groups.setdefault(group, {})[name] = user
+            blocks.setdefault(group, {})[name] = address
+        # Newest first, so where_is finds a re-addressed node where it is now
+        self.sources[:0] = [(f"{label} [{group}]", group, by_name) for group, by_name in blocks.items()]
+        self.rollback()
+
+    def rollback(self):
+        """Drop the incoming nodes and their conflicts, keeping the file indexes."""
+        self.batch_names, self.batch_addresses, self.batch_members = {}, {}, {}
+        self.conflicts = []
+        self.checked = 0
+
+    # === Loading ===
+    def load(self, hosts_path=HOSTS_PATH, inventory_path=INVENTORY_PATH, shard_dir=None, inventory=None, xml=True):
+        """Index the hosts file and inventory.xml (or every shard under shard_dir).
+
+        A run that has already loaded the hosts file passes its Inventory so
+        the file is not read twice; xml=False leaves inventory.xml out, for
+        runs that only change the hosts file.
+        """
+        if shard_dir:
+            from inventory_shards import shard_paths
+            ini_dir, xml_dir = (os.path.dirname(path) for path in shard_paths(shard_dir, "_"))
+            loaders = [(ini_dir, self.load_hosts)] + ([(xml_dir, self.load_xml)] if xml else [])
+            for directory, loader in loaders:
+                if os.path.isdir(directory):
+                    for filename in sorted(os.listdir(directory)):
+                        if not filename.startswith("."):
+                            loader(os.path.join(directory, filename))
+            return self
+        if inventory is not None:
+            self.load_inventory(inventory, os.path.basename(inventory.source_path or hosts_path))
+        else:
+            self.load_hosts(hosts_path)
+        if xml:
+            self.load_xml(inventory_path)
+        return self
+
+    def load_hosts(self, path):
+        """Index every host line of an INI file; :vars/:children sections and the preamble are skipped."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = normalize_text(f.read())
+        except FileNotFoundError:
+            return
+        label = os.path.basename(path)
+        text = "\n" + text  # every line starts after a newline: the patterns above begin with a literal
+        headers = list(HEADER_RE.finditer(text))
+        for header, following in zip(headers, headers[1:] + [None]):
+            group = header.group(1).strip()
+            if ":" not in group:
+                self._load_section(group, text[header.end():following.start() + 1 if following else len(text)], label)
+
+    def load_inventory(self, inventory, label):
+        """Defer the host sections of an already loaded inventory_model.Inventory (see index_deferred).
+
+        Their text is taken as it is, without copying or splitting it.
+        """
+        for group in inventory.groups.values():
+            if group.is_host_section:
+                rendered = group.render()
+                self.deferred.append((group.name, "".join(rendered[1:] if group.header is not None else rendered),
+                                      label))
+
+    def _load_section(self, group, body, label):
+        """Index one section's body, given with the newline that ends its header line."""
+        entries = HOST_LINE_RE.findall(body)
+        if len(entries) != len(ENTRY_LINE_RE.findall(body)):
+            # Lines with other variables: split them one by one
+            entries = []
+            for line in body.splitlines():
+                name, host_vars = parse_host_line(line)
+                if name is not None:
+                    entries.append((name, host_vars.get("ansible_host", name), host_vars.get("ansible_user")))
+        if entries:
+            self.add_existing(group, *zip(*entries), f"{label} [{group}]")
+
+    def load_xml(self, path):
+        """Index the name and hostname of every <node>, from the node index when it is fresh.
+
+        Otherwise the file is scanned with regexes instead of a full XML parse.
+        """
+        known = read_node_hostnames(path)
+        if known is not None:
+            if known:
+                # A node has no group in inventory.xml: only its name and address are compared
+                self.add_existing(None, list(known), list(known.values()), [None] * len(known), os.path.basename(path))
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return
+        names = XML_NAME_RE.findall(text)
+        addresses = XML_HOSTNAME_RE.findall(text)
+        if not len(names) == len(addresses) == text.count("<node"):
+            # A node without hostname, or attributes in another order: read them node by node
+            names, addresses = [], []
+            for match in XML_NODE_RE.finditer(text):
+                attrs = dict(XML_ATTR_RE.findall(match.group(1)))
+                if "name" in attrs:
+                    names.append(attrs["name"])
+                    addresses.append(attrs.get("hostname", ""))
+        if "&" in text:
+            names = [html.unescape(name) if "&" in name else name for name in names]
+            addresses = [html.unescape(address) if "&" in address else address for address in addresses]
+        if names:
+            self.add_existing(None, names, addresses, [None] * len(names), os.path.basename(path))
+
+    # === Reporting ===
+    def report(self):
+        """Print the conflicts of the incoming nodes. Returns whether the run may write."""
+        if self.existing_conflicts:
+            print(f"ℹ️ {len(self.existing_conflicts)} conflict(s) already in the inventory "
+                  f"(run inventory_validate.py to list them)")
+        if not self.conflicts:
+            return True
+        print(f"❌ {len(self.conflicts)} conflict(s) in the new nodes:")
+        for message in self.conflicts:
+            print(f" - {message}")
+        if self.allow_conflicts:
+            print("⚠️ --allow_conflicts given: writing them anyway")
+            return True
+        print("❌ Nothing was written")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List conflicting nodes in the inventory, and in new records before adding them.")
+    parser.add_argument("--hosts_path", default=HOSTS_PATH)
+    parser.add_argument("--inventory_path", default=INVENTORY_PATH)
+    parser.add_argument("--shard_dir", default=None, help="Check the shards under this directory instead")
+    parser.add_argument("--infra_groupname", default=None, help="Group the --input records would be added to")
+    parser.add_argument("--replace", action="store_true",
+                        help="The records replace their group's lines (generate_inventory_Patch.py) instead of being added")
+    add_input_arguments(parser)
+    args = parser.parse_args()
+    if args.input and not args.infra_groupname:
+        parser.error("--input needs --infra_groupname")
+
+    index = FleetIndex().load(args.hosts_path, args.inventory_path, args.shard_dir)
+    invalid = []
+    if args.input:
+        for record in iter_records(args.input, args.input_format):
+            error = validate_record(record)
+            if error:
+                invalid.append(f"line {record.get('_line', '?')}: {error}")
+                continue
+            index.check_record(args.infra_groupname, record, args.replace, os.path.basename(args.input))
+
+    print(f"🔎 {len(index.names)} node name(s) and {len(index.addresses)} address(es) indexed, "
+          f"{index.checked} new record(s) checked")
+    problems = index.existing_conflicts + invalid + index.conflicts
+    for message in problems:
+        print(f" - {message}")
+    if problems:
+        print(f"❌ {len(index.existing_conflicts)} conflict(s) in the inventory, {len(invalid)} invalid and "
+              f"{len(index.conflicts)} conflicting new record(s)")
+        sys.exit(1)
+    print("✅ No conflicts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import hashlib
+import os
+from xml.etree.ElementTree import iterparse, tostring
+
+from inventory_model import atomic_open, file_digest, read_index_cache, write_index_cache
+
+XML_HEADER = '<?xml version="1.0" ?>\n<project>\n'
+XML_FOOTER = "</project>\n"
+
+# Same output as xml.sax.saxutils.escape with the attribute entities, in one C call
+ATTR_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;",
+                              "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"})
+
+
+def node_attributes(name, ip, user, access_method, ssh_key_storage_path="", ssh_password_storage_path="",
+                    tags="linux, server"):
+    """Attributes of a node as generate_inventory.py has always written them, in the same order."""
+    attrs = {
+        "name": name,
+        "description": f"Server at {ip}",
+        "tags": tags,
+        "hostname": ip,
+        "osArch": "",
+        "osFamily": "",
+        "osName": "",
+        "osVersion": "",
+        "username": user,
+    }
+    if access_method == "privatesshkey":
+        attrs["ssh-key-storage-path"] = ssh_key_storage_path or ""
+        attrs["ssh-authentication"] = "privateKey"
+    elif access_method == "password":
+        attrs["ssh-password-storage-path"] = ssh_password_storage_path or ""
+        attrs["ssh-authentication"] = "password"
+    return attrs
+
+
+def format_node(attrs):
+    lines = [f'{key}="{value.translate(ATTR_ESCAPES)}"' for key, value in attrs.items()]
+    return "  <node " + "\n        ".join(lines) + " />\n"
+
+
+def format_element(elem):
+    if elem.tag == "node" and len(elem) == 0:
+        return format_node(elem.attrib)
+    elem.tail = None
+    return "  " + tostring(elem, encoding="unicode").strip() + "\n"
+
+
+def node_digest(text):
+    """Hash of a node as format_node writes it, as kept in the XML node index."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def read_node_index(path):
+    """Map node name -> node_digest for path, or None if the sidecar is missing or stale.
+
+    Nodes with child elements map to None, so they never compare equal.
+    """
+    try:
+        digest, st = file_digest(path)
+    except OSError:
+        return None
+    return read_index_cache(path, st, digest, key="nodes")
+
+
+def read_node_hostnames(path):
+    """Map node name -> hostname from the sidecar written next to the node index, or None if missing or stale.
+
+    It is a file of its own so that reading the node index stays as cheap as it was.
+    """
+    try:
+        digest, st = file_digest(path)
+    except OSError:
+        return None
+    return read_index_cache(path, st, digest, key="hostnames", kind="hostnames")
+
+
+def write_node_index(path, digests, hostnames=None):
+    try:
+        digest, st = file_digest(path)
+    except OSError:
+        return
+    write_index_cache(path, st, digest, digests, key="nodes")
+    if hostnames is not None:
+        write_index_cache(path, st, digest, hostnames, key="hostnames", kind="hostnames")
+
+
+def update_attributes(attrs, existing, update):
+    """The existing node's attributes with only the `update` attributes that attrs has taken from attrs."""
+    merged = dict(existing)
+    merged.update((key, attrs[key]) for key in update if key in attrs)
+    return merged
+
+
+def has_pending_changes(known, pending, replace, add_only):
+    for name, attrs in pending.items():
+        if name not in known:
+            return True
+        if replace and name not in add_only and known[name] != node_digest(format_node(attrs)):
+            return True
+    return False
+
+
+def iter_nodes(path):
+    """Yield each top-level element of a Rundeck resource file, releasing it once consumed."""
+    depth = 0
+    root = None
+    for event, elem in iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield elem
+            root.clear()
+
+
+def merge_nodes(path, nodes, replace=True, default_nodes=(), add_only=None, transform=None, changes=None,
+                dry_run=False, update=None):
+    """Stream path's nodes into a new file, merging in `nodes` (name -> attributes).
+
+    Existing nodes are copied through one at a time. A node whose name is in
+    `nodes` is overwritten when replace is set and kept as-is otherwise; names
+    that were not seen are appended. With `update` (attribute names) an
+    overwritten node is merged instead: it keeps all its attributes (the OS
+    facts filled in by inventory_facts.py, the ssh settings of another
+    generator) and only the `update` ones are taken from `nodes`. `add_only` nodes are only appended when
+    missing, whatever replace says. `transform` is called with a copy of
+    each existing node's attributes and returns the attributes to keep, or
+    None to drop the node. The result is renamed over path, so readers
+    never see a half-written file.
+
+    Every difference is appended to `changes` as (op, name) with op "+", "~"
+    or "-". When there is none (or with dry_run) path is left untouched, so
+    its mtime only moves when the content does. A sidecar of per-node
+    hashes (see read_node_index) answers "nothing to do" without parsing
+    path. Returns (added, updated).
+    """
+    changes = [] if changes is None else changes
+    first_change = len(changes)
+    exists = os.path.exists(path)
+    pending = dict(nodes)
+    for name, attrs in (add_only or {}).items():
+        if name not in pending:
+            pending[name] = attrs
+    add_only = set(add_only or ()) - set(nodes)
+    if exists and transform is None:
+        known = read_node_index(path)
+        if known is not None and not has_pending_changes(known, pending, replace, add_only):
+            return 0, 0
+    digests, hostnames = {}, {}
+    updated = 0
+    with open(os.devnull, "w") if dry_run else atomic_open(path) as out:
+        out.write(XML_HEADER)
+        if exists:
+            for elem in iter_nodes(path):
+                name = elem.get("name") if elem.tag == "node" else None
+                if name is not None and transform is not None:
+                    attrs = transform(dict(elem.attrib))
+                    if attrs is None:
+                        changes.append(("-", name))
+                        continue
+                    if attrs != elem.attrib:
+                        elem.attrib.clear()
+                        elem.attrib.update(attrs)
+                        changes.append(("~", name))
+                if name is not None and name in pending:
+                    attrs = pending.pop(name)
+                    if replace and name not in add_only:
+                        if update is not None:
+                            attrs = update_attributes(attrs, elem.attrib, update)
+                        if attrs != elem.attrib or len(elem):
+                            updated += 1
+                            changes.append(("~", name))
+                        text = format_node(attrs)
+                        digests[name] = node_digest(text)
+                        hostnames[name] = attrs.get("hostname", "")
+                        out.write(text)
+                        continue
+                text = format_element(elem)
+                if name is not None:
+                    digests[name] = node_digest(text) if len(elem) == 0 else None
+                    hostnames[name] = elem.get("hostname", "")
+                out.write(text)
+        else:
+            for attrs in default_nodes:
+                if attrs["name"] not in pending:
+                    changes.append(("+", attrs["name"]))
+                    text = format_node(attrs)
+                    digests[attrs["name"]] = node_digest(text)
+                    hostnames[attrs["name"]] = attrs.get("hostname", "")
+                    out.write(text)
+        for name, attrs in pending.items():
+            changes.append(("+", name))
+            text = format_node(attrs)
+            digests[name] = node_digest(text)
+            hostnames[name] = attrs.get("hostname", "")
+            out.write(text)
+        out.write(XML_FOOTER)
+        out.discard = dry_run or (exists and len(changes) == first_change)
+    if not dry_run:
+        write_node_index(path, digests, hostnames)
+    return len(pending), updated
+
+
+def filter_nodes(path, transform, changes=None, dry_run=False):
+    """Rewrite path in one streaming pass through transform (see merge_nodes). Returns (removed, changed)."""
+    counts = {"removed": 0, "changed": 0}
+
+    def counted(attrs):
+        result = transform(dict(attrs))
+        if result is None:
+            counts["removed"] += 1
+        elif result != attrs:
+            counts["changed"] += 1
+        return result
+
+    merge_nodes(path, {}, transform=counted, changes=changes, dry_run=dry_run)
+    return counts["removed"], counts["changed"]
@@ -0,0 +1,25 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# The modules read INVENTORY_ANSIBLE_DIR when imported: point them at a scratch root before any of them is
+ANSIBLE_DIR = tempfile.mkdtemp(prefix="inventory-tests-")
+os.environ["INVENTORY_ANSIBLE_DIR"] = ANSIBLE_DIR
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+
+@pytest.fixture
+def ansible_dir():
+    """The scratch /etc/ansible the modules default to, emptied for each test."""
+    shutil.rmtree(ANSIBLE_DIR, ignore_errors=True)
+    os.makedirs(ANSIBLE_DIR)
+    return ANSIBLE_DIR
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(ANSIBLE_DIR, ignore_errors=True)
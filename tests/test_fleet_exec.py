@@ -0,0 +1,65 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_DIR
+from fleet_exec import FleetExecutor
+from inventory_facts import check_command_template
+
+HOSTS = """[web]
+web-1 ansible_host=10.0.0.1 ansible_user=ubuntu
+web-2 ansible_host=10.0.0.2 ansible_user=ubuntu
+"""
+
+
+def targets(count):
+    return [{"name": f"web-{n}", "host": f"10.0.0.{n}", "user": "ubuntu", "key": None, "group": "web"}
+            for n in range(1, count + 1)]
+
+
+def fleet_exec(tmp_path, *args):
+    (tmp_path / "hosts").write_text(HOSTS)
+    (tmp_path / "script.sh").write_text("echo hello\n")
+    return subprocess.run([sys.executable, "fleet_exec.py", "--groups", "web", "--hosts_path", str(tmp_path / "hosts"),
+                           "--family", "debian", "--script", str(tmp_path / "script.sh"), "--progress_interval", "60",
+                           *args], cwd=REPO_DIR, capture_output=True, text=True, timeout=30)
+
+
+@pytest.mark.parametrize("template", ["fake_ssh.sh {hostx}", "fake_ssh.sh {0}", "fake_ssh.sh '{host}"])
+def test_bad_templates_are_rejected(template):
+    with pytest.raises(ValueError):
+        check_command_template(template)
+
+
+def test_good_template_passes():
+    check_command_template("ssh -i {key} -o ConnectTimeout={timeout} {user}@{host} # {name} {password_file}")
+
+
+def test_bad_transport_command_exits_1_before_running(tmp_path):
+    result = fleet_exec(tmp_path, "--transport_command", "fake_ssh.sh {hostx}")
+    assert result.returncode == 1
+    assert "unknown field {hostx}" in result.stdout
+
+
+def test_failing_jobs_do_not_hang_the_pool(tmp_path):
+    # The template is only filled in per job: every job raises KeyError inside the worker
+    script = tmp_path / "script.sh"
+    script.write_text("echo hello\n")
+    executor = FleetExecutor(concurrency=2, transport_command="fake_ssh.sh {hostx}", progress_interval=60)
+    results = executor.run({"debian": (str(script), targets(5))})
+    assert [result["name"] for result in results] == [f"web-{n}" for n in range(1, 6)]
+    assert all(not result["ok"] and result["error"] == "KeyError: 'hostx'" for result in results)
+
+
+def test_script_runs_with_stdin_closed(tmp_path):
+    transport = tmp_path / "fake_ssh.sh"
+    transport.write_text('#!/bin/sh\nexec sh -c "$2"\n')
+    transport.chmod(0o755)
+    script = tmp_path / "script.sh"
+    script.write_text('echo "start $1"\nread answer && echo "swallowed $answer"\necho end\n')
+    executor = FleetExecutor(transport_command=f"{transport} {{host}}", remote_command="sh", log_dir=str(tmp_path / "logs"),
+                             progress_interval=60)
+    results = executor.run({"debian": (str(script), targets(1))}, ["a b"])
+    assert results[0]["ok"], results[0]["error"]
+    assert (tmp_path / "logs" / "web-1.log").read_text() == "start a b\nend\n"
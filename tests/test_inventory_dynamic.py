@@ -0,0 +1,34 @@
+from inventory_dynamic import build_inventory, parse_host_vars
+from inventory_model import Inventory
+
+HOSTS = """ungrouped-1 ansible_host=10.0.9.1
+
+[web]
+web-1 ansible_host=10.0.0.1 ansible_port=2222 use_sudo=True motd="hello world" # note
+web-2 ansible_host=10.0.0.2 weights=[1,2] version=1.10 port_name=0x10z
+
+[web:vars]
+http_port=80
+banner='up'
+
+[site:children]
+web
+"""
+
+
+def test_values_are_typed_like_the_ini_loader():
+    assert parse_host_vars(HOSTS.splitlines()[3]) == {
+        "ansible_host": "10.0.0.1", "ansible_port": 2222, "use_sudo": True, "motd": "hello world"}
+    assert parse_host_vars(HOSTS.splitlines()[4]) == {
+        "ansible_host": "10.0.0.2", "weights": [1, 2], "version": 1.1, "port_name": "0x10z"}
+
+
+def test_build_inventory(tmp_path):
+    path = tmp_path / "hosts"
+    path.write_text(HOSTS)
+    result = build_inventory(Inventory.load(str(path)))
+    assert result["ungrouped"]["hosts"] == ["ungrouped-1"]
+    assert result["web"] == {"hosts": ["web-1", "web-2"], "vars": {"http_port": 80, "banner": "up"}}
+    assert result["site"] == {"children": ["web"]}
+    assert result["all"]["children"] == ["ungrouped", "site"]
+    assert result["_meta"]["hostvars"]["web-1"]["ansible_port"] == 2222
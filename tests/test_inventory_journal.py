@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+from conftest import REPO_DIR
+from inventory_journal import FAILED_DIR, inventory_lock, pending_entries
+from inventory_model import HOSTS_PATH, Inventory
+
+SUBMIT = """
+import sys
+from inventory_journal import submit
+n = int(sys.argv[1])
+operation = {"op": "add", "group": "web", "access_method": "privatesshkey", "ssh_key_storage_path": "key/hobohobo",
+             "nodes": [{"ip": f"10.0.0.{n}", "username": "ubuntu", "node_name": f"web-{n}"}]}
+sys.exit(0 if submit([operation], wait="--wait" in sys.argv) else 1)
+"""
+
+
+def start_submits(count, *extra):
+    return [subprocess.Popen([sys.executable, "-c", SUBMIT, str(n), *extra], cwd=REPO_DIR,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            for n in range(1, count + 1)]
+
+
+def finish(processes):
+    for process in processes:
+        output, _ = process.communicate(timeout=60)
+        assert process.returncode == 0, output.decode()
+
+
+def web_hosts():
+    return set(Inventory.load(HOSTS_PATH).groups["web"].hosts)
+
+
+def test_changes_queued_behind_the_lock_are_applied_by_its_holder(ansible_dir):
+    with inventory_lock():
+        finish(start_submits(8))
+        # Every job queued its change and returned without waiting for the lock
+        assert len(pending_entries()) == 8
+        assert not os.path.exists(HOSTS_PATH)
+    assert pending_entries() == []
+    assert web_hosts() == {f"web-{n}" for n in range(1, 9)}
+
+
+def test_concurrent_submits_all_land(ansible_dir):
+    finish(start_submits(16) + start_submits(4, "--wait"))
+    assert pending_entries() == []
+    assert not os.path.exists(FAILED_DIR)
+    assert web_hosts() == {f"web-{n}" for n in range(1, 17)}
+    with open(HOSTS_PATH) as f:
+        assert sum(line.startswith("web-") for line in f) == 16
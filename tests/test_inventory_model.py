@@ -0,0 +1,97 @@
+from inventory_model import Inventory, format_host_line
+
+HOSTS = """# managed by the generators
+[mylocal]
+vm ansible_host=localhost ansible_user=rundeck
+
+[web]
+web-1 ansible_host=10.0.0.1 ansible_user=ubuntu
+; a comment
+web-2 ansible_host=10.0.0.2 ansible_user=ubuntu   ansible_port=2222
+
+[web:vars]
+http_port=80
+
+[db]
+db-1 ansible_host=10.0.1.1 ansible_user=postgres
+"""
+
+
+def write_hosts(tmp_path, text=HOSTS):
+    path = tmp_path / "hosts"
+    path.write_text(text)
+    return str(path)
+
+
+def test_round_trip_is_byte_for_byte(tmp_path):
+    path = write_hosts(tmp_path)
+    inventory = Inventory.load(path)
+    assert inventory.render() == HOSTS
+    assert list(inventory.groups) == ["mylocal", "web", "web:vars", "db"]
+    assert inventory.get_entry("web", "web-2").startswith("web-2 ansible_host=10.0.0.2")
+
+
+def test_unchanged_inventory_is_not_rewritten(tmp_path):
+    path = write_hosts(tmp_path)
+    mtime = (tmp_path / "hosts").stat().st_mtime_ns
+    inventory = Inventory.load(path)
+    assert not inventory.add_host("web", format_host_line("web-1", "10.0.0.1", "ubuntu"))
+    assert inventory.write_ini(path) is False
+    assert (tmp_path / "hosts").stat().st_mtime_ns == mtime
+
+
+def test_changes_that_cancel_out_are_not_written(tmp_path):
+    path = write_hosts(tmp_path)
+    inventory = Inventory.load(path)
+    entry = inventory.get_entry("db", "db-1")
+    inventory.remove_host("db", "db-1")
+    inventory.add_host("db", entry)
+    assert inventory.write_ini(path) is False
+    assert (tmp_path / "hosts").read_text() == HOSTS
+
+
+def test_upsert_replaces_the_line_in_place(tmp_path):
+    path = write_hosts(tmp_path)
+    inventory = Inventory.load(path)
+    assert inventory.upsert_host("web", format_host_line("web-1", "10.0.0.9", "ubuntu"))
+    assert not inventory.upsert_host("web", format_host_line("web-1", "10.0.0.9", "ubuntu"))
+    assert inventory.changes == [("~", "web", "web-1 ansible_host=10.0.0.9 ansible_user=ubuntu")]
+    assert inventory.write_ini(path) is True
+
+    text = (tmp_path / "hosts").read_text()
+    assert text == HOSTS.replace("web-1 ansible_host=10.0.0.1", "web-1 ansible_host=10.0.0.9")
+    reloaded = Inventory.load(path)
+    assert reloaded.get_entry("web", "web-1") == "web-1 ansible_host=10.0.0.9 ansible_user=ubuntu"
+    assert reloaded.names_at("10.0.0.9") and not reloaded.names_at("10.0.0.1")
+
+
+def test_upsert_appends_new_hosts_and_groups(tmp_path):
+    path = write_hosts(tmp_path)
+    inventory = Inventory.load(path)
+    assert inventory.upsert_host("web", format_host_line("web-3", "10.0.0.3", "ubuntu"))
+    assert inventory.upsert_host("cache", format_host_line("redis-1", "10.0.2.1", "redis"))
+    inventory.write_ini(path)
+
+    reloaded = Inventory.load(path)
+    assert list(reloaded.groups["web"].hosts) == ["web-1", "web-2", "web-3"]
+    assert list(reloaded.groups) == ["mylocal", "web", "web:vars", "db", "cache"]
+    assert reloaded.get_entry("cache", "redis-1") == "redis-1 ansible_host=10.0.2.1 ansible_user=redis"
+    # Everything that was there before is still there, in place
+    assert (tmp_path / "hosts").read_text().startswith(HOSTS.split("; a comment")[0])
+
+
+def test_upsert_drops_earlier_duplicates(tmp_path):
+    path = write_hosts(tmp_path, "[web]\nweb-1 ansible_host=10.0.0.1 ansible_user=a\nweb-1 ansible_host=10.0.0.1 ansible_user=b\n")
+    inventory = Inventory.load(path)
+    assert inventory.upsert_host("web", format_host_line("web-1", "10.0.0.5", "c"))
+    inventory.write_ini(path)
+    assert (tmp_path / "hosts").read_text() == "[web]\nweb-1 ansible_host=10.0.0.5 ansible_user=c\n"
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    path = write_hosts(tmp_path)
+    inventory = Inventory.load(path, dry_run=True)
+    inventory.upsert_host("web", format_host_line("web-1", "10.0.0.9", "ubuntu"))
+    assert inventory.write_ini(path, dry_run=True) is True
+    assert (tmp_path / "hosts").read_text() == HOSTS
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["hosts"]
@@ -0,0 +1,46 @@
+import re
+
+from inventory_model import format_host_line
+from inventory_sync import InventorySync, ini_regions
+from inventory_xml import merge_nodes, node_attributes
+
+HOSTS = b"[a]\nx1 ansible_host=1\n\n[b]\ny1 ansible_host=2\ny2 ansible_host=3\n\n[c]\nz1 ansible_host=4\n"
+
+
+def region(old, new):
+    start, old_end, new_end = ini_regions(old, new)
+    return old[start:old_end], new[start:new_end]
+
+
+def test_a_host_edit_covers_its_line_only():
+    assert region(HOSTS, HOSTS.replace(b"y2 ansible_host=3", b"y2 ansible_host=5")) == \
+        (b"y2 ansible_host=3\n", b"y2 ansible_host=5\n")
+
+
+def test_a_renamed_header_covers_its_whole_section():
+    old, new = region(HOSTS, HOSTS.replace(b"[b]", b"[b2]"))
+    assert old == b"[b]\ny1 ansible_host=2\ny2 ansible_host=3\n\n"
+    assert new == b"[b2]\ny1 ansible_host=2\ny2 ansible_host=3\n\n"
+
+
+def test_a_removed_header_covers_the_hosts_below_it():
+    old, new = region(HOSTS, HOSTS.replace(b"[c]\n", b""))
+    assert old == b"[c]\nz1 ansible_host=4\n" and new == b"z1 ansible_host=4\n"
+
+
+def test_renaming_a_section_moves_and_retags_its_hosts(tmp_path):
+    hosts_path, inventory_path = tmp_path / "hosts", tmp_path / "inventory.xml"
+    hosts_path.write_text("[web]\n" + "".join(format_host_line(f"w{n}", f"10.0.0.{n}", "u") + "\n" for n in (1, 2))
+                          + "\n[db]\n" + format_host_line("d1", "10.0.1.1", "u") + "\n")
+    merge_nodes(str(inventory_path), {
+        **{f"w{n}": node_attributes(f"w{n}", f"10.0.0.{n}", "u", "privatesshkey", tags="web") for n in (1, 2)},
+        "d1": node_attributes("d1", "10.0.1.1", "u", "privatesshkey", tags="db"),
+    })
+    sync = InventorySync(str(hosts_path), str(inventory_path))
+    sync.load()
+    hosts_path.write_text(hosts_path.read_text().replace("[web]", "[web2]"))
+    assert sync.sync() == 2
+    assert sync.memberships["w1"] == {"web2": ("10.0.0.1", "u")}
+    tags = dict(re.findall(r'name="(\w+)"[^>]*?tags="([^"]*)"', inventory_path.read_text(), re.S))
+    assert tags == {"w1": "web2", "w2": "web2", "d1": "db"}
+    assert sync.sync() == 0
@@ -0,0 +1,165 @@
+from inventory_model import Inventory
+from inventory_validate import DEFER_LIMIT, FleetIndex
+from inventory_xml import merge_nodes, node_attributes
+
+HOSTS = """[mylocal]
+vm ansible_host=localhost ansible_user=rundeck
+
+[web]
+web-1 ansible_host=10.0.0.1 ansible_user=ubuntu
+web-2 ansible_host=10.0.0.2 ansible_user=ubuntu
+
+[db]
+db-1 ansible_host=10.0.1.1 ansible_user=postgres
+"""
+
+
+def write_files(tmp_path, hosts=HOSTS, xml_nodes=()):
+    hosts_path, inventory_path = tmp_path / "hosts", tmp_path / "inventory.xml"
+    hosts_path.write_text(hosts)
+    merge_nodes(str(inventory_path), {name: node_attributes(name, ip, "ubuntu", "privatesshkey")
+                                      for name, ip in xml_nodes})
+    return str(hosts_path), str(inventory_path)
+
+
+def loaded(tmp_path, **kwargs):
+    return FleetIndex().load(*write_files(tmp_path, **kwargs))
+
+
+def test_consistent_records_pass(tmp_path):
+    index = loaded(tmp_path)
+    assert index.check("web", "web-3", "10.0.0.3", "ubuntu")
+    assert index.check("web", "web-1", "10.0.0.1", "ubuntu")
+    assert index.conflicts == [] and index.existing_conflicts == []
+
+
+def test_name_reused_with_another_address(tmp_path):
+    index = loaded(tmp_path)
+    assert not index.check("cache", "db-1", "10.0.9.9", "postgres")
+    assert index.conflicts == ["'db-1' is 10.0.9.9 in input but 10.0.1.1 in hosts [db]"]
+
+
+def test_address_shared_by_another_node(tmp_path):
+    index = loaded(tmp_path)
+    assert not index.check("web", "web-9", "10.0.1.1", "ubuntu")
+    assert index.conflicts == ["10.0.1.1 of 'web-9' in input is already used by 'db-1' in hosts [db]"]
+
+
+def test_same_node_twice_in_a_group_with_other_users(tmp_path):
+    index = loaded(tmp_path)
+    assert not index.check("web", "web-1", "10.0.0.1", "root")
+    assert "'web-1' is listed twice in [web] with users ubuntu (hosts [web]) and root (input)" in index.conflicts
+
+
+def test_replace_lets_a_group_rewrite_its_own_node(tmp_path):
+    index = loaded(tmp_path)
+    assert index.check("web", "web-1", "10.0.0.11", "root", replace=True)
+    # Only in its own group: elsewhere the name still belongs to 10.0.0.1
+    assert not index.check("db", "web-2", "10.0.0.12", "root", replace=True)
+
+
+def test_conflicts_within_the_batch(tmp_path):
+    index = loaded(tmp_path)
+    assert index.check("web", "web-3", "10.0.0.3", "ubuntu", where="input line 2")
+    assert not index.check("web", "web-4", "10.0.0.3", "ubuntu", where="input line 3")
+    assert not index.check("db", "web-3", "10.0.0.33", "ubuntu", where="input line 4")
+    assert index.conflicts == [
+        "10.0.0.3 of 'web-4' in input line 3 is already used by 'web-3' in input line 2",
+        "'web-3' is 10.0.0.33 in input line 4 but 10.0.0.3 in input line 2",
+    ]
+
+
+def test_inventory_xml_nodes_are_checked(tmp_path):
+    index = loaded(tmp_path, xml_nodes=[("legacy-1", "10.0.5.1")])
+    assert not index.check("web", "web-9", "10.0.5.1", "ubuntu")
+    assert not index.check("web", "legacy-1", "10.0.5.2", "ubuntu")
+    assert len(index.conflicts) == 2
+    assert all("inventory.xml" in message for message in index.conflicts)
+
+
+def test_conflicts_already_in_the_files_are_kept_apart(tmp_path):
+    index = loaded(tmp_path, hosts=HOSTS + "[cache]\nweb-1 ansible_host=10.0.7.1 ansible_user=ubuntu\n")
+    assert index.existing_conflicts == ["'web-1' is 10.0.7.1 in hosts [cache] but 10.0.0.1 in hosts [web]"]
+    assert index.check("web", "web-3", "10.0.0.3", "ubuntu")
+    assert index.conflicts == []
+
+
+def test_loaded_inventory_gives_the_same_answers(tmp_path):
+    hosts_path, inventory_path = write_files(tmp_path)
+    index = FleetIndex().load(hosts_path, inventory_path, inventory=Inventory.load(hosts_path))
+    assert not index.check("cache", "db-1", "10.0.9.9", "postgres")
+    assert not index.check("web", "web-9", "10.0.0.2", "ubuntu")
+    assert len(index.conflicts) == 2
+
+
+# === Deferred sections: an Inventory handed to load() is only indexed where records mention it ===
+def fleet_hosts(groups=40, per_group=5):
+    return "".join(f"[g{g:02d}]\n" + "".join(f"h{g:02d}-{n} ansible_host=10.{g}.0.{n} ansible_user=u{g}\n"
+                                            for n in range(per_group)) + "\n" for g in range(groups))
+
+
+def deferred_and_eager(tmp_path, hosts):
+    hosts_path, inventory_path = write_files(tmp_path, hosts=hosts)
+    deferred = FleetIndex().load(hosts_path, inventory_path, inventory=Inventory.load(hosts_path))
+    eager = FleetIndex().load(hosts_path, inventory_path)
+    return deferred, eager
+
+
+def test_sections_are_deferred_until_a_record_mentions_them(tmp_path):
+    index, _ = deferred_and_eager(tmp_path, fleet_hosts())
+    assert len(index.deferred) == 40
+    assert index.check("new", "new-1", "10.99.0.1", "u")
+    assert len(index.deferred) == 40
+    assert not index.check("new", "h37-2", "10.99.0.2", "u")
+    assert index.conflicts == ["'h37-2' is 10.99.0.2 in input but 10.37.0.2 in hosts [g37]"]
+    assert "g37" not in [group for group, _, _ in index.deferred]
+
+
+def test_deferred_sections_catch_every_kind_of_conflict(tmp_path):
+    index, _ = deferred_and_eager(tmp_path, fleet_hosts())
+    # Same name in another group with another address, an address reused, another user in the same group
+    assert not index.check("other", "h05-1", "10.99.0.1", "u5")
+    assert not index.check("new", "fresh-1", "10.25.0.3", "u")
+    assert not index.check("g30", "h30-4", "10.30.0.4", "root")
+    assert index.conflicts == [
+        "'h05-1' is 10.99.0.1 in input but 10.5.0.1 in hosts [g05]",
+        "10.25.0.3 of 'fresh-1' in input is already used by 'h25-3' in hosts [g25]",
+        "'h30-4' is listed twice in [g30] with users u30 (hosts [g30]) and root (input)",
+    ]
+
+
+def test_same_name_in_another_group_with_the_same_address_is_not_a_conflict(tmp_path):
+    index, _ = deferred_and_eager(tmp_path, fleet_hosts())
+    assert index.check("other", "h12-0", "10.12.0.0", "u12")
+
+
+def test_conflicts_past_the_defer_limit_are_still_caught(tmp_path):
+    index, _ = deferred_and_eager(tmp_path, fleet_hosts())
+    for n in range(DEFER_LIMIT + 4):
+        assert index.check("new", f"new-{n}", f"10.99.1.{n}", "u")
+    assert index.deferred == []
+    assert not index.check("new", "new-x", "10.39.0.4", "u")
+    assert not index.check("g02", "h02-1", "10.2.0.1", "other")
+    assert len(index.conflicts) == 2
+
+
+def test_deferred_and_eager_indexes_agree(tmp_path):
+    hosts = fleet_hosts() + "[dup]\nh07-1 ansible_host=10.77.0.1 ansible_user=u7\n"
+    records = [("new", f"n{i}", f"10.98.0.{i}", "u") for i in range(10)] + [
+        ("g07", "h07-1", "10.7.0.1", "other"),     # another user in its group
+        ("x", "h19-0", "10.19.0.0", "u19"),        # same node, other group: fine
+        ("x", "y", "10.33.0.2", "u"),              # address of h33-2
+        ("g11", "h11-3", "10.11.0.99", "u11"),     # re-addressed in place
+    ] + [("new", f"m{i}", f"10.97.0.{i}", "u") for i in range(10)] + [
+        ("new", "h38-0", "10.97.1.1", "u"),        # past DEFER_LIMIT
+        ("new", "m3", "10.97.0.4", "u"),           # batch conflict
+    ]
+    for replace in (False, True):
+        deferred, eager = deferred_and_eager(tmp_path, hosts)
+        results = [(deferred.check(*record, replace=replace), eager.check(*record, replace=replace))
+                   for record in records]
+        assert all(a == b for a, b in results)
+        assert deferred.conflicts == eager.conflicts and len(deferred.conflicts) >= 4
+        deferred.index_deferred()
+        assert sorted(deferred.existing_conflicts) == sorted(eager.existing_conflicts)
+        assert deferred.existing_conflicts
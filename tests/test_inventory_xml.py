@@ -0,0 +1,96 @@
+import os
+from xml.etree.ElementTree import parse
+
+from inventory_api import K8S_NODE_ATTRIBUTES
+from inventory_xml import merge_nodes, node_attributes, read_node_index
+
+
+def nodes_of(path):
+    return {elem.get("name"): dict(elem.attrib) for elem in parse(path).getroot()}
+
+
+def seed(tmp_path):
+    path = str(tmp_path / "inventory.xml")
+    nodes = {name: node_attributes(name, ip, "ubuntu", "privatesshkey", "key/hobohobo")
+             for name, ip in (("node-1", "10.0.0.1"), ("node-2", "10.0.0.2"))}
+    merge_nodes(path, nodes, default_nodes=[{"name": "rundeck", "hostname": "localhost"}])
+    return path
+
+
+def test_new_file_gets_default_and_new_nodes(tmp_path):
+    path = seed(tmp_path)
+    assert list(nodes_of(path)) == ["rundeck", "node-1", "node-2"]
+    assert read_node_index(path).keys() == {"rundeck", "node-1", "node-2"}
+
+
+def test_replace_overwrites_and_appends(tmp_path):
+    path = seed(tmp_path)
+    changes = []
+    added, updated = merge_nodes(path, {
+        "node-2": node_attributes("node-2", "10.0.0.22", "ubuntu", "password", ssh_password_storage_path="pw"),
+        "node-3": node_attributes("node-3", "10.0.0.3", "ubuntu", "privatesshkey"),
+    }, changes=changes)
+    assert (added, updated) == (1, 1)
+    assert changes == [("~", "node-2"), ("+", "node-3")]
+    nodes = nodes_of(path)
+    assert list(nodes) == ["rundeck", "node-1", "node-2", "node-3"]
+    assert nodes["node-2"]["hostname"] == "10.0.0.22"
+    assert nodes["node-2"]["ssh-authentication"] == "password"
+    assert "ssh-key-storage-path" not in nodes["node-2"]
+
+
+def test_without_replace_existing_nodes_stay(tmp_path):
+    path = seed(tmp_path)
+    merge_nodes(path, {"node-1": {"name": "node-1", "hostname": "10.9.9.9"}}, replace=False)
+    assert nodes_of(path)["node-1"]["hostname"] == "10.0.0.1"
+
+
+def test_update_keeps_the_attributes_it_does_not_manage(tmp_path):
+    path = seed(tmp_path)
+    with open(path) as f:
+        text = f.read()
+    with open(path, "w") as f:
+        f.write(text.replace('osName=""', 'osName="Ubuntu"', 1))
+    k8s = {"name": "node-1", "hostname": "10.0.0.1", "username": "root", "tags": "k8s-master", "osFamily": "unix",
+           "ssh-keypath": "key/k8s"}
+    merge_nodes(path, {"node-1": k8s}, update=K8S_NODE_ATTRIBUTES)
+    node = nodes_of(path)["node-1"]
+    assert node["username"] == "root" and node["tags"] == "k8s-master" and node["ssh-keypath"] == "key/k8s"
+    assert node["ssh-key-storage-path"] == "key/hobohobo"
+    assert node["ssh-authentication"] == "privateKey"
+    assert node["description"] == "Server at 10.0.0.1"
+    assert node["osName"] == "Ubuntu" and node["osFamily"] == ""
+
+
+def test_dry_run_reports_but_leaves_the_file(tmp_path):
+    path = seed(tmp_path)
+    with open(path, "rb") as f:
+        before = f.read()
+    index = tmp_path / ".inventory.xml.index"
+    index_before = index.read_bytes()
+    changes = []
+    merge_nodes(path, {"node-3": {"name": "node-3", "hostname": "10.0.0.3"}}, changes=changes, dry_run=True)
+    assert changes == [("+", "node-3")]
+    with open(path, "rb") as f:
+        assert f.read() == before
+    assert index.read_bytes() == index_before
+
+
+def test_dry_run_does_not_create_a_missing_file(tmp_path):
+    path = str(tmp_path / "inventory.xml")
+    changes = []
+    merge_nodes(path, {"node-1": {"name": "node-1", "hostname": "10.0.0.1"}}, changes=changes, dry_run=True)
+    assert changes == [("+", "node-1")]
+    assert not os.listdir(tmp_path)
+
+
+def test_no_op_merge_keeps_the_mtime(tmp_path):
+    path = seed(tmp_path)
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    inode = os.stat(path).st_ino
+    nodes = nodes_of(path)
+    changes = []
+    assert merge_nodes(path, {"node-1": nodes["node-1"]}, changes=changes) == (0, 0)
+    assert changes == []
+    assert os.stat(path).st_mtime_ns == 1_000_000_000
+    assert os.stat(path).st_ino == inode